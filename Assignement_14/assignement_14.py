@@ -1,12 +1,40 @@
 import streamlit as st
-import requests
 import json
 from datetime import datetime, timedelta
-from transformers import pipeline
-import torch
-from typing import List
-import re
 import os
+import time
+from news_dedup import cluster_articles, dedup_results
+from news_pipeline import (
+    NewsPipeline, SearchError, TIME_PERIODS, MAX_ARTICLES,
+    build_date_filter, build_bias_term, summary_input, fallback_summary
+)
+from news_extractive import fast_summary
+
+SUMMARY_MODE_LABELS = {
+    "Hybrid (TextRank + BART)": "hybrid",
+    "Full BART (slowest)": "full",
+    "Fast (TextRank only, no model)": "fast",
+}
+
+
+# One pipeline per server process: pooled HTTP session, caches and the loaded
+# model are shared by every Streamlit session
+@st.cache_resource
+def get_pipeline():
+    return NewsPipeline(extractor=os.getenv("NEWS_EXTRACTOR", "auto"))
+
+
+def format_timings(timings, running=None):
+    parts = [f"**{stage}:** {seconds:.1f}s" for stage, seconds in timings.items()]
+    if running:
+        parts.append(f"**{running}:** running...")
+    return " · ".join(parts)
+
+
+news_pipeline = get_pipeline()
+article_cache = news_pipeline.article_cache
+search_cache = news_pipeline.search_cache
+summary_cache = news_pipeline.summary_cache
 
 # Initialize session state
 if "results" not in st.session_state:
@@ -16,7 +44,7 @@ if "summary" not in st.session_state:
 if "search_error" not in st.session_state:
     st.session_state.search_error = ""
 if "search_history" not in st.session_state:
-    st.session_state.search_history = []
+    st.session_state.search_history = article_cache.load_history()
 
 # App title
 st.title("News Search & Summarizer")
@@ -30,7 +58,7 @@ with st.sidebar:
     # Time period selection
     time_period = st.selectbox(
         "Time period:",
-        ["Any time", "Today", "Yesterday", "This week", "This month", "This year"],
+        TIME_PERIODS,
         index=0
     )
 
@@ -51,6 +79,9 @@ with st.sidebar:
         step=10
     )
 
+    # Summary mode
+    summary_mode = SUMMARY_MODE_LABELS[st.selectbox("Summary mode:", list(SUMMARY_MODE_LABELS))]
+
     # Search history
     st.header("Search History")
     for i, search in enumerate(st.session_state.search_history):
@@ -62,6 +93,21 @@ with st.sidebar:
             time_period = search['time_period']
             political_bias = search['bias']
 
+    # Article cache instrumentation
+    st.header("Article Cache")
+    cache_stats = article_cache.stats
+    st.metric("Hit rate", f"{cache_stats.hit_rate:.0%}", help=f"{cache_stats.hits} hits / {cache_stats.lookups} lookups")
+    st.caption(
+        f"{len(article_cache)} articles cached ({article_cache.size_bytes() / 1024:.0f} KB), "
+        f"{cache_stats.revalidated} revalidated, {cache_stats.evictions} evicted"
+    )
+    for label, result_cache in (("Search", search_cache), ("Summary", summary_cache)):
+        stats = result_cache.stats
+        st.caption(
+            f"{label} cache: {stats.hit_rate:.0%} hit rate "
+            f"({stats.hits}/{stats.lookups}), {stats.saved_seconds:.1f}s saved"
+        )
+
 # Main content area
 if st.button("Search & Summarize"):
     # Reset previous results and errors
@@ -79,148 +125,88 @@ if st.button("Search & Summarize"):
         st.error(st.session_state.search_error)
         st.stop()
     else:
-        with st.spinner("Searching and summarizing news..."):
+        # Per-stage timings, updated as each stage finishes
+        timings = {}
+        timings_placeholder = st.empty()
+        with st.container():
             # Build date filters
-            date_filter = ""
             if use_custom_dates:
-                if start_date and end_date:
-                    date_filter = f"cdr:1,cd_min:{start_date.strftime('%m/%d/%Y')},cd_max:{end_date.strftime('%m/%d/%Y')}"
+                date_filter = build_date_filter(start_date=start_date, end_date=end_date)
             else:
-                period_map = {
-                    "Today": "d",
-                    "Yesterday": "d",
-                    "This week": "w",
-                    "This month": "m",
-                    "This year": "y"
-                }
-                if time_period != "Any time":
-                    tbs_val = f"qdr:{period_map[time_period]}"
-                    if time_period == "Yesterday":
-                        tbs_val = "cdr:1,cd_min:yesterday,cd_max:yesterday"
-                    date_filter = tbs_val
+                date_filter = build_date_filter(time_period)
 
             # Build search query with bias indicators
-            bias_term = ""
-            if political_bias < -30:
-                bias_term = " (liberal OR left OR progressive)"
-            elif political_bias > 30:
-                bias_term = " (conservative OR right OR libertarian)"
-
+            bias_term = build_bias_term(political_bias)
             search_query = f"{query}{bias_term}"
 
-            # Perform Google News search via Serper
-            headers = {
-                'X-API-KEY': serper_api_key,
-                'Content-Type': 'application/json'
-            }
-
-            # Use the news endpoint directly
-            search_payload = {
-                "q": search_query,
-                "gl": "US",  # Geographic location
-                "hl": "en",  # Language
-                "num": 20,   # Number of results
-            }
-
-            if date_filter:
-                search_payload["tbs"] = date_filter
-
             try:
                 st.info(f"Searching for: {search_query}")
                 st.info(f"Date filter: {date_filter}")
+                timings_placeholder.markdown(format_timings(timings, "Search"))
+                stage_start = time.perf_counter()
 
-                # Use the news-specific endpoint
-                search_response = requests.post(
-                    'https://google.serper.dev/news',
-                    headers=headers,
-                    data=json.dumps(search_payload)
-                )
-
-                if search_response.status_code != 200:
-                    st.session_state.search_error = f"Serper API error: {search_response.status_code} - {search_response.text}"
+                # Identical (query, bias, date filter) searches reuse a recent response
+                try:
+                    search_data = news_pipeline.search(query, bias_term, date_filter, serper_api_key)
+                except SearchError as e:
+                    st.session_state.search_error = str(e)
                     st.error(st.session_state.search_error)
                     st.stop()
 
-                search_data = search_response.json()
+                timings["Search"] = time.perf_counter() - stage_start
+                timings_placeholder.markdown(format_timings(timings, "Fetch"))
                 st.info(f"API Response: {json.dumps(search_data, indent=2)[:500]}...")  # First 500 chars
 
                 news_results = search_data.get("news", [])
+                # Drop near-identical titles/snippets before spending fetches on them
+                news_results, duplicate_results = dedup_results(news_results)
 
                 if not news_results:
                     st.session_state.search_error = "No news articles found for your query. This could be due to:\n- Restrictive search parameters\n- Serper API quota limits\n- Invalid API key\n- Query too specific"
                     st.warning(st.session_state.search_error)
                     st.stop()
 
-                st.info(f"Found {len(news_results)} articles")
-
-                # Extract article content
-                articles = []
-                for item in news_results[:10]:  # Limit to 10 articles
-                    try:
-                        article_response = requests.get(item["link"], timeout=10)
-                        from bs4 import BeautifulSoup
-                        soup = BeautifulSoup(article_response.content, "html.parser")
-
-                        # Extract text content (simplified approach)
-                        paragraphs = soup.find_all('p')
-                        content = " ".join([p.get_text() for p in paragraphs[:10]])  # First 10 paragraphs
-                        content = re.sub(r'\s+', ' ', content)[:2000]  # Limit length and clean whitespace
-
-                        articles.append({
-                            "title": item["title"],
-                            "snippet": item["snippet"],
-                            "date": item.get("date", "Unknown"),
-                            "source": item["source"],
-                            "content": content,
-                            "link": item["link"]  # Store the link
-                        })
-                    except Exception as e:
-                        # Fallback to snippet if content extraction fails
-                        articles.append({
-                            "title": item["title"],
-                            "snippet": item["snippet"],
-                            "date": item.get("date", "Unknown"),
-                            "source": item["source"],
-                            "content": item["snippet"],
-                            "link": item["link"]  # Store the link
-                        })
-
-                # Prepare content for summarization
-                all_content = "\n\n".join([
-                    f"Title: {a['title']}\nSource: {a['source']}\nDate: {a['date']}\nContent: {a['content'][:500]}"
-                    for a in articles
-                ])
-
-                # Sanitize content to prevent index errors
-                all_content = all_content.replace('\x00', '')  # Remove null bytes
-                all_content = all_content.replace('\ufffd', '')  # Remove replacement characters
-
-                # Initialize summarization pipeline with CPU only
+                st.info(f"Found {len(news_results)} articles ({duplicate_results} near-duplicate results skipped)")
+
+                # Extract article content, downloading articles concurrently
+                articles, timings["Fetch"], timings["Extract"] = news_pipeline.fetch_articles(
+                    news_results[:MAX_ARTICLES]
+                )
+                timings_placeholder.markdown(format_timings(timings, "Summarize"))
+
+                # Collapse syndicated copies of the same story to one representative
+                fetched = len(articles)
+                articles, _ = cluster_articles(articles)
+                if len(articles) < fetched:
+                    st.info(f"Merged {fetched - len(articles)} syndicated copies")
+
+                stage_start = time.perf_counter()
                 try:
-                    # Set environment to use CPU only
-                    os.environ["CUDA_VISIBLE_DEVICES"] = "-1"
-                    torch.cuda.is_available = lambda: False
-
-                    summarizer = pipeline(
-                        "summarization",
-                        model="facebook/bart-large-cnn",
-                        device='cpu'  # Explicitly use CPU
-                    )
-
-                    # Summarize content with error handling
-                    summary_result = summarizer(
-                        all_content,
-                        max_length=200,
-                        min_length=50,
-                        do_sample=False
-                    )
-
-                    st.session_state.summary = summary_result[0]['summary_text']
+                    if summary_mode == "fast":
+                        # Extractive only: no model to load, returns in milliseconds
+                        summary = fast_summary(articles)
+                    else:
+                        # Prepare content for summarization
+                        all_content = summary_input(articles, summary_mode)
+                        summary_key = news_pipeline.summary_key(all_content, streamed=True)
+                        summary = summary_cache.get(summary_key)
+                    if summary is None:
+                        # Stream tokens into the page as they are generated
+                        summary_placeholder = st.empty()
+                        summary = ""
+                        for piece in news_pipeline.stream_summary(all_content):
+                            summary += piece
+                            summary_placeholder.markdown(f"**Summary:** {summary}▌")
+                        summary = summary.strip()
+                        summary_cache.put(summary_key, summary, time.perf_counter() - stage_start)
+                        summary_placeholder.empty()
+                    st.session_state.summary = summary
                 except Exception as e:
                     # Fallback if summarization fails
-                    st.session_state.summary = f"Summarization failed due to: {str(e)}. Showing key points:\n\n"
-                    for i, article in enumerate(articles[:3]):  # Show first 3 articles
-                        st.session_state.summary += f"{i+1}. {article['title']} - {article['snippet']}\n\n"
+                    st.session_state.summary = fallback_summary(articles, e)
+
+                timings["Summarize"] = time.perf_counter() - stage_start
+                timings_placeholder.markdown(format_timings(timings))
 
                 st.session_state.results = articles
 
@@ -233,8 +219,8 @@ if st.button("Search & Summarize"):
                     "results": articles,
                     "summary": st.session_state.summary
                 }
-                st.session_state.search_history.insert(0, search_entry)
-                st.session_state.search_history = st.session_state.search_history[:5]  # Keep only last 5
+                article_cache.add_history(search_entry)
+                st.session_state.search_history = article_cache.load_history()  # Keeps only last 5
 
             except Exception as e:
                 st.session_state.search_error = f"An error occurred: {str(e)}"
@@ -251,6 +237,8 @@ elif st.session_state.results:
         with st.expander(f"{article['title']} ({article['source']}) - {article['date']}"):
             st.write(f"**Source:** {article['source']}")
             st.write(f"**Date:** {article['date']}")
+            if article.get('also_reported_by'):
+                st.write(f"**Also reported by:** {', '.join(article['also_reported_by'])}")
             st.write(f"**Summary:** {article['snippet']}")
             st.write(f"**Content Preview:** {article['content'][:300]}...")
             st.write(f"**[Read full article]({article['link']})**")  # Add link to source
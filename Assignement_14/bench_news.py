@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the News Search & Summarizer.
+
+Usage:
+  python bench_news.py extract --corpus saved_pages/
+  python bench_news.py extract --synthetic 200
+  python bench_news.py pipeline --queries 100 --concurrency 8
+  python bench_news.py dedup --corpus saved_articles/
+  python bench_news.py dedup --synthetic 500
+  python bench_news.py summarize --corpus saved_articles/ --group 8
+
+A corpus directory holds saved article pages as NAME.html, optionally with
+the hand-checked article text in NAME.txt. When gold text is present the
+extraction quality is reported as token-level F1 against it. The dedup
+benchmark reads extracted article text from NAME.txt files instead.
+"""
+
+import argparse
+import json
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from news_extract import BACKENDS, available_backends
+
+TOKEN = re.compile(r"\w+")
+
+
+def token_f1(predicted, gold):
+    """Bag-of-words F1 between extracted text and the gold article text."""
+    pred_tokens = TOKEN.findall(predicted.lower())
+    gold_tokens = TOKEN.findall(gold.lower())
+    if not pred_tokens or not gold_tokens:
+        return 0.0
+    gold_counts = {}
+    for token in gold_tokens:
+        gold_counts[token] = gold_counts.get(token, 0) + 1
+    overlap = 0
+    for token in pred_tokens:
+        if gold_counts.get(token, 0) > 0:
+            gold_counts[token] -= 1
+            overlap += 1
+    if overlap == 0:
+        return 0.0
+    precision = overlap / len(pred_tokens)
+    recall = overlap / len(gold_tokens)
+    return 2 * precision * recall / (precision + recall)
+
+
+WORDS = (
+    "government report market election climate energy company policy city court "
+    "minister research health school budget officials said would could after before "
+    "during percent million year week local national global new plan vote"
+).split()
+
+
+def synthetic_page(rng, paragraphs=12):
+    """Build a news-like page with navigation, cookie banner and footer boilerplate."""
+    def sentence(words):
+        return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+    body = [
+        " ".join(sentence(rng.randint(8, 20)) for _ in range(rng.randint(2, 4))).replace(".", ",", 1)
+        for _ in range(paragraphs)
+    ]
+    nav = "".join(f'<li><a href="/s{i}">{rng.choice(WORDS)}</a></li>' for i in range(40))
+    related = "".join(
+        f'<p><a href="/r{i}">{sentence(6)}</a></p>' for i in range(8)
+    )
+    html = (
+        "<html><head><title>News</title>"
+        + "<script>var x = {};</script>" * 20
+        + "</head><body>"
+        f'<nav class="site-nav"><ul>{nav}</ul></nav>'
+        '<div class="cookie-consent"><p>We use cookies to personalise content and ads, '
+        "to provide social media features and to analyse our traffic.</p></div>"
+        '<div class="layout"><article class="story-body">'
+        + "".join(f"<p>{text}</p>" for text in body)
+        + f'</article><aside class="related-stories">{related}</aside></div>'
+        '<footer class="site-footer"><p>Copyright 2025 Example News Ltd. All rights reserved. '
+        "Terms of use, privacy policy and cookie settings.</p></footer></body></html>"
+    )
+    return html.encode("utf-8"), " ".join(body[:10])
+
+
+def load_corpus(args):
+    if args.synthetic:
+        rng = random.Random(args.seed)
+        return [synthetic_page(rng) for _ in range(args.synthetic)]
+    pages = []
+    for html_path in sorted(Path(args.corpus).glob("*.html")):
+        gold_path = html_path.with_suffix(".txt")
+        gold = gold_path.read_text(encoding="utf-8") if gold_path.exists() else None
+        pages.append((html_path.read_bytes(), gold))
+    return pages
+
+
+def bench_extract(args):
+    pages = load_corpus(args)
+    if not pages:
+        print("Corpus is empty", file=sys.stderr)
+        sys.exit(1)
+    total_mb = sum(len(html) for html, _ in pages) / 1e6
+    print(f"{len(pages)} pages, {total_mb:.1f} MB")
+    print(f"{'backend':<12}{'pages/s':>10}{'MB/s':>10}{'F1':>8}")
+
+    installed = available_backends()
+    for name, extract in BACKENDS.items():
+        if name not in installed:
+            print(f"{name:<12}{'(not installed)':>28}")
+            continue
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            outputs = [extract(html) for html, _ in pages]
+        elapsed = (time.perf_counter() - start) / args.repeat
+        scored = [token_f1(out, gold) for out, (_, gold) in zip(outputs, pages) if gold]
+        f1 = f"{sum(scored) / len(scored):.3f}" if scored else "-"
+        print(f"{name:<12}{len(pages) / elapsed:>10.1f}{total_mb / elapsed:>10.2f}{f1:>8}")
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Serper-compatible /news endpoint plus the article pages it links to."""
+
+    latency = 0.05
+    pages = []
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, body, content_type):
+        time.sleep(self.latency)
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        host = f"http://{self.headers['Host']}"
+        seed = abs(hash(payload["q"])) % 100000
+        news = [
+            {
+                "title": f"{payload['q']} story {i}",
+                "snippet": f"Snippet {i} about {payload['q']}",
+                "date": "1 hour ago",
+                "source": f"Outlet {i}",
+                "link": f"{host}/article/{seed}/{i}"
+            }
+            for i in range(10)
+        ]
+        self._reply(json.dumps({"news": news}).encode("utf-8"), "application/json")
+
+    def do_GET(self):
+        index = hash(self.path) % len(self.pages)
+        self._reply(self.pages[index][0], "text/html")
+
+
+def bench_pipeline(args):
+    from news_pipeline import NewsPipeline, run_batch
+
+    rng = random.Random(args.seed)
+    StandInHandler.pages = [synthetic_page(rng) for _ in range(50)]
+    StandInHandler.latency = args.latency
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/news"
+
+    queries = [f"topic {i}" for i in range(args.queries)]
+    with tempfile.TemporaryDirectory() as tmp:
+        pipeline = NewsPipeline(cache_path=str(Path(tmp) / "cache.sqlite3"), search_url=url)
+        if args.summarize:
+            pipeline.load_model()
+        with open(Path(tmp) / "out.jsonl", "w", encoding="utf-8") as output:
+            start = time.perf_counter()
+            done, failed = run_batch(
+                pipeline, queries, output, args.concurrency,
+                api_key="stand-in", summarize=args.summarize
+            )
+            elapsed = time.perf_counter() - start
+    server.shutdown()
+
+    stage = "search+fetch+extract+summarize" if args.summarize else "search+fetch+extract"
+    print(f"{done} queries ({failed} failed), {stage}, concurrency {args.concurrency}, "
+          f"{args.latency * 1000:.0f} ms server latency")
+    print(f"{elapsed:.1f}s total, {done / elapsed * 60:.0f} topics/minute")
+
+
+def syndicated_corpus(rng, stories):
+    """Articles where each story appears 1-4 times with outlet-specific edits."""
+    articles = []
+    for story in range(stories):
+        _, text = synthetic_page(rng, paragraphs=4)
+        for copy in range(rng.randint(1, 4)):
+            words = text.split()
+            for _ in range(3):  # Light copy-editing per outlet
+                words[rng.randrange(len(words))] = rng.choice(WORDS)
+            articles.append({
+                "title": f"Story {story}",
+                "snippet": " ".join(words[:20]),
+                "date": "Today",
+                "source": f"Outlet {copy}",
+                "content": f"({rng.choice(['AP', 'Reuters', 'AFP'])}) " + " ".join(words)
+            })
+    rng.shuffle(articles)
+    return articles
+
+
+def bench_dedup(args):
+    import news_dedup
+    from news_pipeline import build_content
+
+    if args.synthetic:
+        articles = syndicated_corpus(random.Random(args.seed), args.synthetic)
+    else:
+        articles = [
+            {"title": path.stem, "snippet": "", "date": "", "source": path.stem,
+             "content": path.read_text(encoding="utf-8")}
+            for path in sorted(Path(args.corpus).glob("*.txt"))
+        ]
+    if not articles:
+        print("Corpus is empty", file=sys.stderr)
+        sys.exit(1)
+
+    shingles = [news_dedup.shingle_hashes(a["content"]) for a in articles]
+    numpy_module = news_dedup.np
+    for label, module in (("numpy", numpy_module), ("pure python", None)):
+        if label == "numpy" and module is None:
+            print(f"{'numpy':<12} (not installed)")
+            continue
+        news_dedup.np = module
+        start = time.perf_counter()
+        for hashes in shingles:
+            news_dedup.minhash(hashes)
+        elapsed = time.perf_counter() - start
+        print(f"{label:<12} {len(articles) / elapsed:>10.0f} signatures/s")
+    news_dedup.np = numpy_module
+
+    start = time.perf_counter()
+    representatives, clusters = news_dedup.cluster_articles(articles)
+    elapsed = time.perf_counter() - start
+    before = len(build_content(articles).split())
+    after = len(build_content(representatives).split())
+    print(f"{len(articles)} articles -> {len(clusters)} clusters in {elapsed * 1000:.0f} ms")
+    print(f"summarizer input: {before} -> {after} tokens ({1 - after / before:.0%} reduction)")
+
+
+def ngrams(words, n):
+    counts = {}
+    for i in range(len(words) - n + 1):
+        gram = tuple(words[i:i + n])
+        counts[gram] = counts.get(gram, 0) + 1
+    return counts
+
+
+def rouge_n(candidate, reference, n):
+    cand = ngrams(TOKEN.findall(candidate.lower()), n)
+    ref = ngrams(TOKEN.findall(reference.lower()), n)
+    overlap = sum(min(count, ref.get(gram, 0)) for gram, count in cand.items())
+    if not overlap:
+        return 0.0
+    precision = overlap / sum(cand.values())
+    recall = overlap / sum(ref.values())
+    return 2 * precision * recall / (precision + recall)
+
+
+def rouge_l(candidate, reference):
+    cand = TOKEN.findall(candidate.lower())
+    ref = TOKEN.findall(reference.lower())
+    if not cand or not ref:
+        return 0.0
+    previous = [0] * (len(ref) + 1)
+    for word in cand:
+        current = [0]
+        for j, ref_word in enumerate(ref):
+            current.append(previous[j] + 1 if word == ref_word else max(previous[j + 1], current[j]))
+        previous = current
+    lcs = previous[-1]
+    if not lcs:
+        return 0.0
+    precision, recall = lcs / len(cand), lcs / len(ref)
+    return 2 * precision * recall / (precision + recall)
+
+
+def bench_summarize(args):
+    import importlib.util
+    from news_extractive import fast_summary
+    from news_pipeline import NewsPipeline, summary_input
+
+    if args.synthetic:
+        articles = syndicated_corpus(random.Random(args.seed), args.synthetic)
+    else:
+        articles = [
+            {"title": path.stem, "snippet": "", "date": "", "source": path.stem,
+             "content": path.read_text(encoding="utf-8")[:2000]}
+            for path in sorted(Path(args.corpus).glob("*.txt"))
+        ]
+    groups = [articles[i:i + args.group] for i in range(0, len(articles), args.group)]
+    if not groups:
+        print("Corpus is empty", file=sys.stderr)
+        sys.exit(1)
+
+    has_model = importlib.util.find_spec("transformers") is not None
+    tmp = tempfile.TemporaryDirectory()
+    pipeline = NewsPipeline(cache_path=str(Path(tmp.name) / "cache.sqlite3"))
+    if has_model:
+        pipeline.load_model()
+    else:
+        print("transformers not installed: timing the fast (extractive) mode only")
+
+    results = {"full": [], "hybrid": [], "fast": []}
+    for group in groups:
+        outputs = {}
+        for mode in results:
+            if mode != "fast" and not has_model:
+                continue
+            start = time.perf_counter()
+            if mode == "fast":
+                outputs[mode] = fast_summary(group)
+            else:
+                # generate_summary bypasses the cache so every run is timed
+                outputs[mode] = pipeline.generate_summary(summary_input(group, mode))
+            results[mode].append([time.perf_counter() - start])
+        if "full" in outputs:
+            for mode in results:
+                reference = outputs["full"]
+                results[mode][-1] += [
+                    rouge_n(outputs[mode], reference, 1),
+                    rouge_n(outputs[mode], reference, 2),
+                    rouge_l(outputs[mode], reference)
+                ]
+
+    print(f"{len(groups)} article sets of up to {args.group}; ROUGE F1 against full-BART output")
+    print(f"{'mode':<8}{'latency':>10}{'R-1':>8}{'R-2':>8}{'R-L':>8}")
+    for mode, rows in results.items():
+        if not rows:
+            continue
+        columns = list(zip(*rows))
+        means = [sum(c) / len(c) for c in columns]
+        scores = "".join(f"{m:>8.3f}" for m in means[1:]) if len(means) > 1 else f"{'-':>8}" * 3
+        print(f"{mode:<8}{means[0] * 1000:>8.0f}ms{scores}")
+    tmp.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="News summarizer benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    extract = sub.add_parser("extract", help="Compare HTML extraction backends")
+    source = extract.add_mutually_exclusive_group(required=True)
+    source.add_argument("--corpus", help="Directory of saved NAME.html pages (+ optional NAME.txt gold text)")
+    source.add_argument("--synthetic", type=int, help="Generate this many synthetic news pages")
+    extract.add_argument("--seed", type=int, default=0)
+    extract.add_argument("--repeat", type=int, default=3)
+    extract.set_defaults(func=bench_extract)
+
+    pipeline = sub.add_parser("pipeline", help="Batch throughput against a local stand-in search server")
+    pipeline.add_argument("--queries", type=int, default=100)
+    pipeline.add_argument("--concurrency", type=int, default=8)
+    pipeline.add_argument("--latency", type=float, default=0.05, help="Seconds added to every server response")
+    pipeline.add_argument("--summarize", action="store_true", help="Include BART summarization (loads the model)")
+    pipeline.add_argument("--seed", type=int, default=0)
+    pipeline.set_defaults(func=bench_pipeline)
+
+    dedup = sub.add_parser("dedup", help="MinHash signature throughput and token reduction")
+    source = dedup.add_mutually_exclusive_group(required=True)
+    source.add_argument("--corpus", help="Directory of extracted article texts (NAME.txt)")
+    source.add_argument("--synthetic", type=int, help="Generate this many stories with syndicated copies")
+    dedup.add_argument("--seed", type=int, default=0)
+    dedup.set_defaults(func=bench_dedup)
+
+    summarize = sub.add_parser("summarize", help="Latency vs ROUGE of hybrid/fast modes against full BART")
+    source = summarize.add_mutually_exclusive_group(required=True)
+    source.add_argument("--corpus", help="Directory of extracted article texts (NAME.txt)")
+    source.add_argument("--synthetic", type=int, help="Generate this many stories with syndicated copies")
+    summarize.add_argument("--group", type=int, default=8, help="Articles per simulated search")
+    summarize.add_argument("--seed", type=int, default=0)
+    summarize.set_defaults(func=bench_summarize)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,348 @@
+"""
+Persistent SQLite caches for the News Search & Summarizer.
+
+Fetched articles are stored by normalized URL together with the extracted
+paragraph text and the HTTP validators (ETag / Last-Modified) so that stale
+entries can be revalidated with a conditional request instead of being
+downloaded and parsed again. The same database also keeps the search history
+so it survives app restarts and is shared between Streamlit sessions.
+
+Serper responses and generated summaries are memoized by ResultCache, an
+in-memory LRU in front of a table in the same database.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Query parameters that only track the visitor and never change the article
+TRACKING_PARAMS = {"fbclid", "gclid", "ocid", "cmpid", "mc_cid", "mc_eid", "ref", "src", "smid", "guccounter"}
+TRACKING_PREFIXES = ("utm_",)
+
+
+def normalize_url(url):
+    """Return a canonical form of an article URL for use as a cache key."""
+    parts = urlsplit(url.strip())
+    netloc = parts.netloc.lower()
+    if netloc.startswith("www."):
+        netloc = netloc[4:]
+    query = [
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k.lower() not in TRACKING_PARAMS and not k.lower().startswith(TRACKING_PREFIXES)
+    ]
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((parts.scheme.lower(), netloc, path, urlencode(sorted(query)), ""))
+
+
+def url_key(url):
+    """Content-address an article by the SHA-256 of its normalized URL."""
+    return hashlib.sha256(normalize_url(url).encode("utf-8")).hexdigest()
+
+
+def fingerprint(*parts):
+    """Stable SHA-256 over JSON-serializable parts, e.g. (model, params, content)."""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _connect(path):
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    return conn
+
+
+class CacheStats:
+    """Hit/miss counters for one cache, shared by every session in the process."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.evictions = 0
+        self.saved_seconds = 0.0
+
+    @property
+    def lookups(self):
+        return self.hits + self.misses
+
+    @property
+    def hit_rate(self):
+        return self.hits / self.lookups if self.lookups else 0.0
+
+    def as_dict(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "revalidated": self.revalidated,
+            "evictions": self.evictions,
+            "saved_seconds": self.saved_seconds,
+            "hit_rate": self.hit_rate,
+        }
+
+
+class ArticleCache:
+    """SQLite-backed article text cache with TTL, validators and LRU eviction."""
+
+    def __init__(self, path, ttl=6 * 3600, max_bytes=50 * 1024 * 1024, history_limit=5):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.history_limit = history_limit
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+        self._conn = _connect(path)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS articles (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                content TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                size INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_articles_last_access ON articles(last_access);
+            CREATE TABLE IF NOT EXISTS search_history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                created_at REAL NOT NULL,
+                entry TEXT NOT NULL
+            );
+        """)
+        self._conn.commit()
+
+    # -- article entries ---------------------------------------------------
+
+    def get(self, url):
+        """Return the cached row for a URL as a dict, or None."""
+        key = url_key(url)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content, fetched_at, etag, last_modified FROM articles WHERE key = ?",
+                (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE articles SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+        return {"content": row[0], "fetched_at": row[1], "etag": row[2], "last_modified": row[3]}
+
+    def put(self, url, content, etag=None, last_modified=None):
+        """Store extracted text for a URL and evict old entries if over budget."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO articles "
+                "(key, url, content, fetched_at, last_access, etag, last_modified, size) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (url_key(url), normalize_url(url), content, now, now, etag, last_modified,
+                 len(content.encode("utf-8")))
+            )
+            self._evict()
+            self._conn.commit()
+
+    def touch(self, url):
+        """Mark an entry fresh again after a 304 Not Modified response."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE articles SET fetched_at = ?, last_access = ? WHERE key = ?",
+                (now, now, url_key(url))
+            )
+            self._conn.commit()
+
+    def _evict(self):
+        # Drop least recently used entries until the cache fits in max_bytes
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM articles").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute("SELECT key, size FROM articles ORDER BY last_access").fetchall()
+        doomed = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            doomed.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM articles WHERE key = ?", doomed)
+        self.stats.evictions += len(doomed)
+
+    def fetch(self, url, extract, http=None, timeout=10):
+        """
+        Return extracted article text for a URL, using the cache when possible.
+
+        Fresh entries are returned directly. Stale entries are revalidated with
+        If-None-Match / If-Modified-Since; on 304 the cached text is reused.
+        `extract` turns the raw response body into text and is only called on
+        a real download. Error responses raise requests.HTTPError and are not
+        cached.
+        """
+        if http is None:
+            import requests
+            http = requests
+
+        cached = self.get(url)
+        if cached and time.time() - cached["fetched_at"] < self.ttl:
+            with self._lock:
+                self.stats.hits += 1
+            return cached["content"]
+
+        headers = {}
+        if cached:
+            if cached["etag"]:
+                headers["If-None-Match"] = cached["etag"]
+            if cached["last_modified"]:
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        response = http.get(url, headers=headers, timeout=timeout)
+        if cached and response.status_code == 304:
+            self.touch(url)
+            with self._lock:
+                self.stats.hits += 1
+                self.stats.revalidated += 1
+            return cached["content"]
+        # Never extract or cache an error page as the article
+        response.raise_for_status()
+
+        with self._lock:
+            self.stats.misses += 1
+        content = extract(response.content)
+        self.put(url, content, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+        return content
+
+    def size_bytes(self):
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM articles").fetchone()[0]
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+
+    # -- search history ----------------------------------------------------
+
+    def add_history(self, entry):
+        """Persist a search history entry, keeping only the newest few."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO search_history (created_at, entry) VALUES (?, ?)",
+                (time.time(), json.dumps(entry))
+            )
+            self._conn.execute(
+                "DELETE FROM search_history WHERE id NOT IN "
+                "(SELECT id FROM search_history ORDER BY id DESC LIMIT ?)",
+                (self.history_limit,)
+            )
+            self._conn.commit()
+
+    def load_history(self):
+        """Return the stored search history, newest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT entry FROM search_history ORDER BY id DESC LIMIT ?",
+                (self.history_limit,)
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+
+class ResultCache:
+    """
+    Bounded in-memory LRU backed by a SQLite table.
+
+    Values must be JSON-serializable. Each entry remembers how long it took to
+    compute so hits can report the latency they saved. With ttl=None entries
+    never expire (used for summaries, which are pure functions of their key).
+    """
+
+    def __init__(self, path, table, ttl=None, max_items=128, max_rows=5000):
+        if not table.isidentifier():
+            raise ValueError(f"Invalid table name: {table}")
+        self.table = table
+        self.ttl = ttl
+        self.max_items = max_items
+        self.max_rows = max_rows
+        self.stats = CacheStats()
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = _connect(path)
+        self._conn.executescript(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                compute_seconds REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_{table}_last_access ON {table}(last_access);
+        """)
+        self._conn.commit()
+
+    def _expired(self, created_at):
+        return self.ttl is not None and time.time() - created_at >= self.ttl
+
+    def _remember(self, key, entry):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_items:
+            self._memory.popitem(last=False)
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss."""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and self._expired(entry[1]):
+                del self._memory[key]
+                entry = None
+            if entry is not None:
+                self._memory.move_to_end(key)
+            else:
+                row = self._conn.execute(
+                    f"SELECT value, created_at, compute_seconds FROM {self.table} WHERE key = ?",
+                    (key,)
+                ).fetchone()
+                if row is not None and not self._expired(row[1]):
+                    entry = (json.loads(row[0]), row[1], row[2])
+                    self._remember(key, entry)
+                    self._conn.execute(
+                        f"UPDATE {self.table} SET last_access = ? WHERE key = ?", (time.time(), key)
+                    )
+                    self._conn.commit()
+
+            if entry is None:
+                self.stats.misses += 1
+                return None
+            self.stats.hits += 1
+            self.stats.saved_seconds += entry[2]
+            return entry[0]
+
+    def put(self, key, value, compute_seconds=0.0):
+        """Store a value in memory and on disk."""
+        now = time.time()
+        with self._lock:
+            self._remember(key, (value, now, compute_seconds))
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} "
+                "(key, value, created_at, last_access, compute_seconds) VALUES (?, ?, ?, ?, ?)",
+                (key, json.dumps(value), now, now, compute_seconds)
+            )
+            excess = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0] - self.max_rows
+            if excess > 0:
+                self._conn.execute(
+                    f"DELETE FROM {self.table} WHERE key IN "
+                    f"(SELECT key FROM {self.table} ORDER BY last_access LIMIT ?)",
+                    (excess,)
+                )
+                self.stats.evictions += excess
+            self._conn.commit()
+
+    def get_or_compute(self, key, compute):
+        """Return the cached value for key, computing and storing it on a miss."""
+        value = self.get(key)
+        if value is not None:
+            return value
+        start = time.perf_counter()
+        value = compute()
+        self.put(key, value, time.perf_counter() - start)
+        return value
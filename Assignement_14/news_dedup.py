@@ -0,0 +1,169 @@
+"""
+Near-duplicate detection for news results.
+
+Serper often returns the same wire story from several outlets. Two stages
+remove the copies before they cost fetches and summarizer tokens:
+
+- Before fetching: titles and snippets are compared with 64-bit SimHash
+  fingerprints, which is cheap enough for every search result.
+- After extraction: article text is shingled into word 5-grams, signed with
+  MinHash and bucketed with banded LSH. Candidate pairs above the Jaccard
+  threshold are clustered and one representative per cluster is kept.
+
+NumPy is used to vectorize MinHash when installed; a pure Python fallback
+gives identical signatures.
+"""
+
+import re
+import zlib
+import random
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+NUM_PERM = 64
+BANDS = 16  # 16 bands x 4 rows: pairs above ~0.5 Jaccard become candidates
+SHINGLE_SIZE = 5
+JACCARD_THRESHOLD = 0.6
+SIMHASH_DISTANCE = 3
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+
+WORD = re.compile(r"\w+")
+
+_rng = random.Random(1)
+PERM_A = [_rng.randint(1, MERSENNE_PRIME - 1) for _ in range(NUM_PERM)]
+PERM_B = [_rng.randint(0, MERSENNE_PRIME - 1) for _ in range(NUM_PERM)]
+if np is not None:
+    _PERM_A = np.array(PERM_A, dtype=np.uint64)
+    _PERM_B = np.array(PERM_B, dtype=np.uint64)
+
+
+def tokens(text):
+    return WORD.findall(text.lower())
+
+
+def shingle_hashes(text, size=SHINGLE_SIZE):
+    """32-bit hashes of the word n-gram shingles of a text."""
+    words = tokens(text)
+    if len(words) < size:
+        return {zlib.crc32(" ".join(words).encode("utf-8"))} if words else set()
+    return {
+        zlib.crc32(" ".join(words[i:i + size]).encode("utf-8"))
+        for i in range(len(words) - size + 1)
+    }
+
+
+def minhash(hashes):
+    """MinHash signature (tuple of NUM_PERM ints) of a set of shingle hashes."""
+    if not hashes:
+        return (MAX_HASH,) * NUM_PERM
+    if np is not None:
+        values = np.fromiter(hashes, dtype=np.uint64, count=len(hashes))
+        # uint64 arithmetic wraps on overflow, as in datasketch; still a good hash family
+        permuted = (np.outer(_PERM_A, values) + _PERM_B[:, None]) % np.uint64(MERSENNE_PRIME)
+        return tuple(int(v) for v in (permuted & np.uint64(MAX_HASH)).min(axis=1))
+    signature = []
+    mask = (1 << 64) - 1
+    for a, b in zip(PERM_A, PERM_B):
+        signature.append(min(
+            ((((a * h) & mask) + b) & mask) % MERSENNE_PRIME & MAX_HASH for h in hashes
+        ))
+    return tuple(signature)
+
+
+def estimated_jaccard(sig_a, sig_b):
+    return sum(1 for a, b in zip(sig_a, sig_b) if a == b) / len(sig_a)
+
+
+def simhash(text):
+    """64-bit SimHash over the words of a short text such as a title."""
+    weights = [0] * 64
+    for word in tokens(text):
+        h = zlib.crc32(word.encode("utf-8")) | (zlib.crc32(word[::-1].encode("utf-8")) << 32)
+        for bit in range(64):
+            weights[bit] += 1 if h >> bit & 1 else -1
+    return sum(1 << bit for bit in range(64) if weights[bit] > 0)
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+def dedup_results(news_results, max_distance=SIMHASH_DISTANCE):
+    """
+    Drop search results whose title + snippet is a near copy of an earlier one.
+
+    Returns (kept_results, dropped_count). Order of kept results is preserved.
+    """
+    kept = []
+    fingerprints = []
+    for item in news_results:
+        fp = simhash(f"{item.get('title', '')} {item.get('snippet', '')}")
+        if any(hamming(fp, other) <= max_distance for other in fingerprints):
+            continue
+        fingerprints.append(fp)
+        kept.append(item)
+    return kept, len(news_results) - len(kept)
+
+
+class LSHIndex:
+    """Banded LSH over MinHash signatures."""
+
+    def __init__(self, bands=BANDS):
+        self.bands = bands
+        self.rows = NUM_PERM // bands
+        self.buckets = [{} for _ in range(bands)]
+
+    def insert(self, key, signature):
+        """Add a signature and return the keys that share at least one band."""
+        candidates = set()
+        for band in range(self.bands):
+            chunk = signature[band * self.rows:(band + 1) * self.rows]
+            bucket = self.buckets[band].setdefault(chunk, [])
+            candidates.update(bucket)
+            bucket.append(key)
+        return candidates
+
+
+def cluster_articles(articles, threshold=JACCARD_THRESHOLD):
+    """
+    Group syndicated copies and keep one representative per cluster.
+
+    The representative is the copy with the longest content (ties go to the
+    higher-ranked result); it gains an "also_reported_by" list of the other
+    sources. Returns (representatives, clusters) where clusters holds index lists.
+    """
+    parent = list(range(len(articles)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    index = LSHIndex()
+    signatures = []
+    for i, article in enumerate(articles):
+        signature = minhash(shingle_hashes(article.get("content", "")))
+        signatures.append(signature)
+        for j in index.insert(i, signature):
+            if estimated_jaccard(signature, signatures[j]) >= threshold:
+                parent[find(i)] = find(j)
+
+    groups = {}
+    for i in range(len(articles)):
+        groups.setdefault(find(i), []).append(i)
+
+    representatives = []
+    clusters = sorted(groups.values(), key=lambda members: members[0])
+    for members in clusters:
+        best = max(members, key=lambda i: (len(articles[i].get("content", "")), -i))
+        article = dict(articles[best])
+        others = [articles[i]["source"] for i in members if i != best]
+        if others:
+            article["also_reported_by"] = others
+        representatives.append(article)
+    return representatives, clusters
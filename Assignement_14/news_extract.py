@@ -0,0 +1,308 @@
+"""
+Article text extraction for the News Search & Summarizer.
+
+The original approach parsed every page into a full BeautifulSoup tree with
+the pure-Python html.parser and took the first ten <p> tags, which is slow
+and often picks up cookie banners, navigation and "related stories" blurbs.
+
+This module offers pluggable parser backends (selectolax, lxml, BeautifulSoup)
+that all produce candidate paragraphs, plus a readability-style scorer that
+groups paragraphs by their container element and keeps the best-scoring one.
+The lxml backend parses incrementally and stops feeding the document once the
+winning container has enough paragraphs.
+"""
+
+import codecs
+import itertools
+import re
+
+MAX_PARAGRAPHS = 10
+MAX_CHARS = 2000
+MIN_PARAGRAPH_CHARS = 25
+CHUNK_SIZE = 16 * 1024
+
+# Class/id fragments that hint at article body or at boilerplate
+POSITIVE_HINTS = re.compile(r"article|body|content|entry|main|post|story|text", re.I)
+NEGATIVE_HINTS = re.compile(
+    r"comment|footer|nav|menu|sidebar|promo|related|share|social|subscribe|newsletter|"
+    r"cookie|consent|banner|advert|sponsor|popup|modal|caption|byline|meta",
+    re.I
+)
+WHITESPACE = re.compile(r"\s+")
+META_CHARSET = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([A-Za-z0-9_.:-]+)""", re.I)
+BOMS = ((codecs.BOM_UTF8, "utf-8"), (codecs.BOM_UTF16_LE, "utf-16-le"), (codecs.BOM_UTF16_BE, "utf-16-be"))
+
+
+class Paragraph:
+    """A candidate <p> with the data the scorer needs."""
+
+    __slots__ = ("text", "link_chars", "container", "hints")
+
+    def __init__(self, text, link_chars, container, hints):
+        self.text = text
+        self.link_chars = link_chars
+        self.container = container
+        self.hints = hints
+
+
+def paragraph_score(paragraph):
+    """Readability-style content score for a single paragraph."""
+    length = len(paragraph.text)
+    if length < MIN_PARAGRAPH_CHARS:
+        return 0.0
+    link_density = paragraph.link_chars / length
+    if link_density > 0.5:
+        return 0.0
+    score = 1.0 + paragraph.text.count(",") + min(length / 100.0, 3.0)
+    return score * (1.0 - link_density)
+
+
+def hint_weight(hints):
+    """Bonus or penalty from the class/id attributes around a paragraph."""
+    weight = 0.0
+    if POSITIVE_HINTS.search(hints):
+        weight += 25.0
+    if NEGATIVE_HINTS.search(hints):
+        weight -= 25.0
+    return weight
+
+
+class ContentScorer:
+    """Accumulates paragraphs per container and tracks the best container."""
+
+    def __init__(self, max_paragraphs=MAX_PARAGRAPHS):
+        self.max_paragraphs = max_paragraphs
+        self.paragraphs = []
+        self.scores = {}
+        self.counts = {}
+
+    def add(self, paragraph):
+        score = paragraph_score(paragraph)
+        self.paragraphs.append(paragraph)
+        if score <= 0:
+            return
+        key = paragraph.container
+        if key not in self.scores:
+            self.scores[key] = hint_weight(paragraph.hints)
+            self.counts[key] = 0
+        self.scores[key] += score
+        self.counts[key] += 1
+
+    def best_container(self):
+        if not self.scores:
+            return None
+        return max(self.scores, key=self.scores.get)
+
+    def done(self):
+        """True once the leading container already has enough good paragraphs."""
+        best = self.best_container()
+        return best is not None and self.counts[best] >= self.max_paragraphs and self.scores[best] > 0
+
+    def text(self, max_chars=MAX_CHARS):
+        best = self.best_container()
+        if best is None or self.scores[best] <= 0:
+            # Nothing looks like an article body: behave like the old extractor
+            chosen = self.paragraphs[:self.max_paragraphs]
+        else:
+            chosen = [
+                p for p in self.paragraphs
+                if p.container == best and paragraph_score(p) > 0
+            ][:self.max_paragraphs]
+        return WHITESPACE.sub(" ", " ".join(p.text for p in chosen)).strip()[:max_chars]
+
+
+def _chunks(source):
+    if isinstance(source, (bytes, bytearray)):
+        for start in range(0, len(source), CHUNK_SIZE):
+            yield bytes(source[start:start + CHUNK_SIZE])
+    elif isinstance(source, str):
+        yield source.encode("utf-8")
+    else:
+        yield from source
+
+
+def _as_bytes(source):
+    if isinstance(source, (bytes, bytearray)):
+        return bytes(source)
+    if isinstance(source, str):
+        return source.encode("utf-8")
+    return b"".join(source)
+
+
+def sniff_encoding(data):
+    """
+    Encoding of an HTML byte string: its BOM, then its <meta charset>, then
+    UTF-8 if it decodes as such, else Windows-1252 (what browsers assume).
+    """
+    for bom, name in BOMS:
+        if data.startswith(bom):
+            return name
+    match = META_CHARSET.search(data[:4096])
+    if match:
+        try:
+            return codecs.lookup(match.group(1).decode("ascii")).name
+        except LookupError:
+            pass
+    try:
+        data.decode("utf-8")
+    except UnicodeDecodeError as e:
+        # A multi-byte character cut off at the end of a partial document is fine
+        if e.start < len(data) - 3 or e.reason != "unexpected end of data":
+            return "windows-1252"
+    return "utf-8"
+
+
+def _as_text(source):
+    """source as str, bytes decoded with sniff_encoding()."""
+    if isinstance(source, str):
+        return source
+    data = _as_bytes(source)
+    return data.decode(sniff_encoding(data), errors="replace")
+
+
+def _attr_hints(*attr_dicts):
+    return " ".join(
+        f"{attrs.get('class') or ''} {attrs.get('id') or ''}" for attrs in attr_dicts if attrs
+    )
+
+
+# -- backends ---------------------------------------------------------------
+
+def extract_selectolax(source, max_paragraphs=MAX_PARAGRAPHS, max_chars=MAX_CHARS):
+    """Extract with selectolax (Lexbor C parser, full parse but very fast)."""
+    from selectolax.lexbor import LexborHTMLParser
+
+    # Lexbor reads bytes without a declared charset as UTF-8
+    tree = LexborHTMLParser(_as_text(source))
+    scorer = ContentScorer(max_paragraphs)
+    for node in tree.css("p"):
+        parent = node.parent
+        grandparent = parent.parent if parent is not None else None
+        container = parent.mem_id if parent is not None else None
+        hints = _attr_hints(
+            parent.attributes if parent is not None else None,
+            grandparent.attributes if grandparent is not None else None
+        )
+        link_chars = sum(len(a.text()) for a in node.css("a"))
+        scorer.add(Paragraph(node.text(), link_chars, container, hints))
+        if scorer.done():
+            break
+    return scorer.text(max_chars)
+
+
+def _lxml_paragraph(element):
+    parent = element.getparent()
+    grandparent = parent.getparent() if parent is not None else None
+    hints = _attr_hints(
+        parent.attrib if parent is not None else None,
+        grandparent.attrib if grandparent is not None else None
+    )
+    link_chars = sum(len("".join(a.itertext())) for a in element.iter("a"))
+    return Paragraph("".join(element.itertext()), link_chars, parent, hints)
+
+
+def extract_lxml(source, max_paragraphs=MAX_PARAGRAPHS, max_chars=MAX_CHARS):
+    """Extract with lxml's incremental parser, stopping once the body is found."""
+    from lxml import etree
+
+    chunks = _chunks(source)
+    # Without an encoding lxml reads bytes as Latin-1 unless the page declares one
+    if isinstance(source, (bytes, bytearray)):
+        encoding = sniff_encoding(bytes(source))
+    else:
+        first = next(chunks, b"")
+        encoding = "utf-8" if isinstance(source, str) else sniff_encoding(first)
+        chunks = itertools.chain([first], chunks)
+    parser = etree.HTMLPullParser(events=("end",), tag="p", recover=True, encoding=encoding)
+    scorer = ContentScorer(max_paragraphs)
+    for chunk in chunks:
+        parser.feed(chunk)
+        for _, element in parser.read_events():
+            scorer.add(_lxml_paragraph(element))
+        if scorer.done():
+            break
+    else:
+        try:
+            parser.close()
+        except etree.LxmlError:
+            pass
+        for _, element in parser.read_events():
+            scorer.add(_lxml_paragraph(element))
+    return scorer.text(max_chars)
+
+
+def extract_bs4(source, max_paragraphs=MAX_PARAGRAPHS, max_chars=MAX_CHARS):
+    """Extract with BeautifulSoup, using lxml as its tree builder when available."""
+    from bs4 import BeautifulSoup
+
+    try:
+        soup = BeautifulSoup(_as_bytes(source), "lxml")
+    except Exception:
+        soup = BeautifulSoup(_as_bytes(source), "html.parser")
+    scorer = ContentScorer(max_paragraphs)
+    for node in soup.find_all("p"):
+        parent = node.parent
+        grandparent = parent.parent if parent is not None else None
+        hints = _attr_hints(
+            _bs4_attrs(parent),
+            _bs4_attrs(grandparent)
+        )
+        link_chars = sum(len(a.get_text()) for a in node.find_all("a"))
+        scorer.add(Paragraph(node.get_text(), link_chars, id(parent), hints))
+        if scorer.done():
+            break
+    return scorer.text(max_chars)
+
+
+def _bs4_attrs(tag):
+    if tag is None or not hasattr(tag, "attrs"):
+        return None
+    attrs = dict(tag.attrs)
+    if isinstance(attrs.get("class"), list):
+        attrs["class"] = " ".join(attrs["class"])
+    return attrs
+
+
+def extract_legacy(source, max_paragraphs=MAX_PARAGRAPHS, max_chars=MAX_CHARS):
+    """The original approach: html.parser tree and the first N <p> tags."""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(_as_bytes(source), "html.parser")
+    paragraphs = soup.find_all("p")
+    content = " ".join([p.get_text() for p in paragraphs[:max_paragraphs]])
+    return WHITESPACE.sub(" ", content)[:max_chars]
+
+
+BACKENDS = {
+    "selectolax": extract_selectolax,
+    "lxml": extract_lxml,
+    "bs4": extract_bs4,
+    "legacy": extract_legacy,
+}
+
+# Preference order for "auto"
+AUTO_ORDER = ("selectolax", "lxml", "bs4")
+BACKEND_MODULES = {"selectolax": "selectolax", "lxml": "lxml", "bs4": "bs4", "legacy": "bs4"}
+
+
+def available_backends():
+    """Names of backends whose parser library is installed."""
+    import importlib.util
+
+    return [
+        name for name in BACKENDS
+        if importlib.util.find_spec(BACKEND_MODULES[name]) is not None
+    ]
+
+
+def get_extractor(name="auto"):
+    """Return an extraction function for the named backend (or the fastest available)."""
+    if name == "auto":
+        installed = available_backends()
+        for candidate in AUTO_ORDER:
+            if candidate in installed:
+                return BACKENDS[candidate]
+        raise ImportError("No HTML parser installed: pip install selectolax (or lxml / beautifulsoup4)")
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown extraction backend: {name}. Choose from {', '.join(BACKENDS)}")
+    return BACKENDS[name]
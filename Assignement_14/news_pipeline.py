@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+"""
+Search -> fetch -> extract -> summarize pipeline for the News Search & Summarizer.
+
+The Streamlit app and the headless batch CLI share this module. One
+NewsPipeline holds a pooled HTTP session, the caches and a single loaded
+summarization model, so it can be reused across many queries.
+
+Batch usage:
+  python news_pipeline.py queries.txt --output digest.jsonl --concurrency 8
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from news_cache import ArticleCache, ResultCache, fingerprint
+from news_dedup import cluster_articles, dedup_results
+from news_extract import get_extractor
+from news_extractive import extractive_summary, fast_summary
+
+SERPER_URL = os.getenv("SERPER_URL", "https://google.serper.dev/news")
+DEFAULT_CACHE_PATH = os.getenv(
+    "NEWS_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "news_cache.sqlite3")
+)
+SUMMARY_MODEL = "facebook/bart-large-cnn"
+SUMMARY_PARAMS = {"max_length": 200, "min_length": 50, "do_sample": False}
+# Greedy decoding: TextIteratorStreamer cannot stream beam search
+STREAM_PARAMS = dict(SUMMARY_PARAMS, num_beams=1)
+SUMMARY_MAX_INPUT_TOKENS = 1024  # BART's position embedding limit
+SEARCH_TTL = 10 * 60  # Serper results go stale quickly
+MAX_ARTICLES = 10
+PRESUMMARY_TOKENS = 900  # Extractive pre-summary budget, below BART's input limit
+
+# hybrid: TextRank pre-summary then BART; full: BART over all content; fast: TextRank only
+SUMMARY_MODES = ["hybrid", "full", "fast"]
+
+TIME_PERIODS = ["Any time", "Today", "Yesterday", "This week", "This month", "This year"]
+PERIOD_MAP = {
+    "Today": "d",
+    "Yesterday": "d",
+    "This week": "w",
+    "This month": "m",
+    "This year": "y"
+}
+
+
+class SearchError(Exception):
+    """Raised when the Serper API call fails."""
+
+
+def build_date_filter(time_period="Any time", start_date=None, end_date=None):
+    """Return the Serper `tbs` value for a time period or custom date range."""
+    if start_date and end_date:
+        return f"cdr:1,cd_min:{start_date.strftime('%m/%d/%Y')},cd_max:{end_date.strftime('%m/%d/%Y')}"
+    if time_period == "Yesterday":
+        return "cdr:1,cd_min:yesterday,cd_max:yesterday"
+    if time_period in PERIOD_MAP:
+        return f"qdr:{PERIOD_MAP[time_period]}"
+    return ""
+
+
+def build_bias_term(political_bias):
+    """Keywords appended to the query to approximate political bias."""
+    if political_bias < -30:
+        return " (liberal OR left OR progressive)"
+    if political_bias > 30:
+        return " (conservative OR right OR libertarian)"
+    return ""
+
+
+def build_content(articles):
+    """Join articles into the text handed to the summarizer."""
+    all_content = "\n\n".join([
+        f"Title: {a['title']}\nSource: {a['source']}\nDate: {a['date']}\nContent: {a['content'][:500]}"
+        for a in articles
+    ])
+    # Sanitize content to prevent index errors
+    all_content = all_content.replace('\x00', '')  # Remove null bytes
+    all_content = all_content.replace('\ufffd', '')  # Remove replacement characters
+    return all_content
+
+
+def summary_input(articles, mode="hybrid"):
+    """Text handed to BART for the given summary mode."""
+    if mode == "full":
+        return build_content(articles)
+    presummary = extractive_summary([a["content"] for a in articles], token_budget=PRESUMMARY_TOKENS)
+    # No sentence long enough to rank (e.g. snippet-only articles): give BART the articles themselves
+    return presummary or build_content(articles)
+
+
+def fallback_summary(articles, error):
+    """Key points shown when the model cannot produce a summary."""
+    summary = f"Summarization failed due to: {str(error)}. Showing key points:\n\n"
+    for i, article in enumerate(articles[:3]):  # Show first 3 articles
+        summary += f"{i+1}. {article['title']} - {article['snippet']}\n\n"
+    return summary
+
+
+class NewsPipeline:
+    """Reusable news search and summarization pipeline."""
+
+    def __init__(self, cache_path=DEFAULT_CACHE_PATH, extractor="auto", search_url=SERPER_URL,
+                 pool_size=32, fetch_workers=8):
+        self.search_url = search_url
+        self.fetch_workers = fetch_workers
+        self.extract = get_extractor(extractor)
+
+        # One pooled session reused for every Serper call and article download
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.article_cache = ArticleCache(cache_path)
+        self.search_cache = ResultCache(cache_path, "serper_responses", ttl=SEARCH_TTL)
+        self.summary_cache = ResultCache(cache_path, "summaries", max_items=64)
+
+        self._model = None
+        self._model_lock = threading.Lock()
+        self._generate_lock = threading.Lock()
+
+    # -- search --------------------------------------------------------------
+
+    def search(self, query, bias_term="", date_filter="", api_key=None):
+        """Return the Serper news response, reusing identical recent searches."""
+        search_key = fingerprint(query, bias_term, date_filter)
+        search_data = self.search_cache.get(search_key)
+        if search_data is not None:
+            return search_data
+
+        api_key = api_key or os.getenv("SERPER_API_KEY")
+        if not api_key:
+            raise SearchError("Please set your SERPER_API_KEY environment variable")
+
+        search_payload = {
+            "q": f"{query}{bias_term}",
+            "gl": "US",  # Geographic location
+            "hl": "en",  # Language
+            "num": 20,   # Number of results
+        }
+        if date_filter:
+            search_payload["tbs"] = date_filter
+
+        start = time.perf_counter()
+        response = self.session.post(
+            self.search_url,
+            headers={'X-API-KEY': api_key, 'Content-Type': 'application/json'},
+            data=json.dumps(search_payload),
+            timeout=15
+        )
+        if response.status_code != 200:
+            raise SearchError(f"Serper API error: {response.status_code} - {response.text}")
+
+        search_data = response.json()
+        self.search_cache.put(search_key, search_data, time.perf_counter() - start)
+        return search_data
+
+    # -- fetch + extract -----------------------------------------------------
+
+    def fetch_articles(self, news_results):
+        """
+        Download and extract articles concurrently, preserving result order.
+
+        Returns (articles, fetch_seconds, extract_seconds); extraction time is
+        summed across workers and subtracted from the wall-clock fetch time.
+        """
+        extract_seconds = [0.0]
+        extract_lock = threading.Lock()
+
+        def timed_extract(html):
+            start = time.perf_counter()
+            try:
+                return self.extract(html)
+            finally:
+                with extract_lock:
+                    extract_seconds[0] += time.perf_counter() - start
+
+        def fetch_one(item):
+            article = {
+                "title": item["title"],
+                "snippet": item["snippet"],
+                "date": item.get("date", "Unknown"),
+                "source": item["source"],
+                "link": item["link"]  # Store the link
+            }
+            try:
+                # Reuse cached text, revalidating stale entries with ETag/Last-Modified
+                article["content"] = self.article_cache.fetch(item["link"], timed_extract, http=self.session)
+            except Exception:
+                # Fallback to snippet if content extraction fails
+                article["content"] = item["snippet"]
+            return article
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.fetch_workers) as executor:
+            articles = list(executor.map(fetch_one, news_results))
+        elapsed = time.perf_counter() - start
+        return articles, max(elapsed - extract_seconds[0], 0.0), extract_seconds[0]
+
+    # -- summarize -----------------------------------------------------------
+
+    def load_model(self):
+        """Load the tokenizer and model once; later calls reuse them."""
+        with self._model_lock:
+            if self._model is None:
+                import torch
+                from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
+
+                # Set environment to use CPU only
+                os.environ["CUDA_VISIBLE_DEVICES"] = "-1"
+                torch.cuda.is_available = lambda: False
+
+                tokenizer = AutoTokenizer.from_pretrained(SUMMARY_MODEL)
+                model = AutoModelForSeq2SeqLM.from_pretrained(SUMMARY_MODEL)
+                model.eval()
+                self._model = (tokenizer, model)
+        return self._model
+
+    def summary_key(self, content, streamed=False):
+        # Same model, parameters and article content always give the same summary
+        return fingerprint(SUMMARY_MODEL, STREAM_PARAMS if streamed else SUMMARY_PARAMS, content)
+
+    def stream_summary(self, text):
+        """Yield summary text pieces as the model generates them."""
+        from transformers import TextIteratorStreamer
+
+        tokenizer, model = self.load_model()
+        inputs = tokenizer(text, return_tensors="pt", truncation=True, max_length=SUMMARY_MAX_INPUT_TOKENS)
+        streamer = TextIteratorStreamer(tokenizer, skip_prompt=True, skip_special_tokens=True)
+        failure = []
+
+        def generate():
+            # One generation at a time: the model already uses every CPU core
+            try:
+                with self._generate_lock:
+                    model.generate(**inputs, streamer=streamer, **STREAM_PARAMS)
+            except Exception as e:
+                failure.append(e)
+                streamer.end()  # Unblock the consumer
+
+        worker = threading.Thread(target=generate, daemon=True)
+        worker.start()
+        for piece in streamer:
+            yield piece
+        worker.join()
+        if failure:
+            raise failure[0]
+
+    def generate_summary(self, content):
+        """Run the model once, bypassing the cache."""
+        tokenizer, model = self.load_model()
+        inputs = tokenizer(content, return_tensors="pt", truncation=True, max_length=SUMMARY_MAX_INPUT_TOKENS)
+        with self._generate_lock:
+            output = model.generate(**inputs, **SUMMARY_PARAMS)
+        return tokenizer.decode(output[0], skip_special_tokens=True).strip()
+
+    def summarize(self, content):
+        """Return a (possibly cached) summary without streaming."""
+        return self.summary_cache.get_or_compute(
+            self.summary_key(content), lambda: self.generate_summary(content)
+        )
+
+    # -- whole pipeline ------------------------------------------------------
+
+    def run(self, query, time_period="Any time", political_bias=0, start_date=None, end_date=None,
+            api_key=None, summarize=True, mode="hybrid"):
+        """Run one query end to end and return a JSON-serializable result."""
+        timings = {}
+        date_filter = build_date_filter(time_period, start_date, end_date)
+        bias_term = build_bias_term(political_bias)
+
+        start = time.perf_counter()
+        search_data = self.search(query, bias_term, date_filter, api_key)
+        timings["search"] = time.perf_counter() - start
+
+        # Drop near-identical titles/snippets before spending fetches on them
+        news_results, duplicate_results = dedup_results(search_data.get("news", []))
+        articles, timings["fetch"], timings["extract"] = self.fetch_articles(news_results[:MAX_ARTICLES])
+        # Collapse syndicated copies of the same story to one representative
+        fetched = len(articles)
+        articles, _ = cluster_articles(articles)
+
+        summary = ""
+        if summarize and articles:
+            start = time.perf_counter()
+            try:
+                if mode == "fast":
+                    summary = fast_summary(articles)
+                else:
+                    summary = self.summarize(summary_input(articles, mode))
+            except Exception as e:
+                summary = fallback_summary(articles, e)
+            timings["summarize"] = time.perf_counter() - start
+
+        return {
+            "query": query,
+            "time_period": time_period,
+            "bias": political_bias,
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "summary": summary,
+            "mode": mode,
+            "articles": articles,
+            "duplicates_removed": duplicate_results + fetched - len(articles),
+            "timings": timings
+        }
+
+
+def read_queries(path):
+    """One query per line; blank lines and lines starting with # are skipped."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+
+
+def run_batch(pipeline, queries, output, concurrency=4, **run_kwargs):
+    """Run queries with bounded concurrency, writing one JSON line per query as it finishes."""
+    done = failed = 0
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = {executor.submit(pipeline.run, query, **run_kwargs): query for query in queries}
+        for future in as_completed(futures):
+            try:
+                record = future.result()
+            except Exception as e:
+                record = {"query": futures[future], "error": str(e)}
+                failed += 1
+            output.write(json.dumps(record, ensure_ascii=False) + "\n")
+            output.flush()
+            done += 1
+    return done, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Headless news search & summarizer: one JSON line per query"
+    )
+    parser.add_argument('queries', help='File with one query per line')
+    parser.add_argument('--output', '-o', help='JSONL output path (default: stdout)')
+    parser.add_argument('--concurrency', '-c', type=int, default=4, help='Queries in flight at once (default: 4)')
+    parser.add_argument('--time-period', choices=TIME_PERIODS, default="Any time")
+    parser.add_argument('--bias', type=int, default=0, help='Political bias from -100 (left) to 100 (right)')
+    parser.add_argument('--mode', choices=SUMMARY_MODES, default="hybrid",
+                        help='hybrid: TextRank then BART (default); full: BART only; fast: TextRank only')
+    parser.add_argument('--no-summary', action='store_true', help='Search, fetch and extract only')
+    parser.add_argument('--cache-path', default=DEFAULT_CACHE_PATH, help='SQLite cache file')
+    parser.add_argument('--search-url', default=SERPER_URL, help='Serper-compatible news endpoint')
+    args = parser.parse_args()
+
+    queries = read_queries(args.queries)
+    pipeline = NewsPipeline(cache_path=args.cache_path, search_url=args.search_url)
+    if not args.no_summary and args.mode != "fast":
+        pipeline.load_model()
+
+    output = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    start = time.perf_counter()
+    try:
+        done, failed = run_batch(
+            pipeline, queries, output, args.concurrency,
+            time_period=args.time_period, political_bias=args.bias,
+            summarize=not args.no_summary, mode=args.mode
+        )
+    finally:
+        if args.output:
+            output.close()
+    elapsed = time.perf_counter() - start
+    print(
+        f"{done} queries ({failed} failed) in {elapsed:.1f}s: {done / elapsed * 60:.1f} topics/minute",
+        file=sys.stderr
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,14 @@
 import streamlit as st
-import requests
-from bs4 import BeautifulSoup
-import re
 import json
-import time
+import csv
+import io
 from urllib.parse import urlparse
-import os
+from product_extract import SUPPORTED_SITES
+from product_batch import BatchScraper, CSV_FIELDS, read_urls
+from product_cache import ProductCache
+from price_tracker import PriceTracker
+from hf_inference import build_prompt, get_backend
+from description_templates import get_templates, render_description
 
 # Set page config
 st.set_page_config(
@@ -68,402 +71,66 @@ st.markdown("""
 # Title
 st.markdown('<div class="main-header"><h1>🛒 Amazon Product Description Enhancer</h1></div>', unsafe_allow_html=True)
 
-# Supported sites - Only Amazon
-SUPPORTED_SITES = [
-    "amazon.com", "amazon.co.uk", "amazon.de", "amazon.fr", "amazon.es", "amazon.it",
-    "amazon.ca", "amazon.au", "amazon.in", "amazon.jp", "amazon.cn", "amazon.nl",
-    "amazon.sg", "amazon.mx", "amazon.br", "amazon.ae"
-]
-
 st.info(f"Supported sites: {', '.join(SUPPORTED_SITES)}")
 
+# One cache per process, shared by every session
+@st.cache_resource
+def get_cache():
+    return ProductCache()
+
+@st.cache_resource
+def get_tracker():
+    return PriceTracker()
+
+# Hugging Face API client (HF_API_KEY) or local model (HF_BACKEND=local); None means templates only
+@st.cache_resource
+def get_inference_backend():
+    return get_backend()
+
 # Initialize session state
 if 'product_data' not in st.session_state:
     st.session_state.product_data = None
 if 'enhanced_description' not in st.session_state:
     st.session_state.enhanced_description = None
-
-# Function to extract product info from URL
-def extract_product_info(url):
-    try:
-        # Parse the URL
-        parsed_url = urlparse(url)
-        domain = parsed_url.netloc.lower()
-
-        # Remove www if present
-        if domain.startswith('www.'):
-            domain = domain[4:]
-
-        # Check if site is supported
-        if not any(supported in domain for supported in SUPPORTED_SITES):
-            return {"error": f"Unsupported site: {domain}. Please use one of the supported Amazon sites."}
-
-        # Set headers to mimic a browser
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-            'Accept-Encoding': 'gzip, deflate',
-            'DNT': '1',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-        }
-
-        # Get the page content
-        response = requests.get(url, headers=headers, timeout=15)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.content, 'html.parser')
-
-        # Initialize product data with the URL
-        product_data = {
-            "url": url,
-            "name": "",
-            "description": "",
-            "price": "",
-            "rating": ""
-        }
-
-        # Extract product information
-        product_data.update(extract_amazon(soup, domain))
-
-        return product_data
-
-    except Exception as e:
-        return {"error": f"Error extracting product info: {str(e)}"}
-
-# Amazon-specific extraction function
-def extract_amazon(soup, domain):
-    data = {}
-
-    # Product name - Try multiple selectors
-    title_elem = (
-        soup.find('span', id='productTitle') or
-        soup.find('h1', {'data-testid': 'product-title'}) or
-        soup.find('h1', class_='a-size-large') or
-        soup.find('h1', class_='a-spacing-small') or
-        soup.find('h1', class_='a-spacing-none')
-    )
-    data['name'] = title_elem.get_text(strip=True) if title_elem else "Not found"
-
-    # PRICE EXTRACTION - Look in script tags for JSON data first
-    price = "Not found"
-    script_tags = soup.find_all('script', type='text/javascript')
-
-    # Look for price in JSON data within script tags
-    for script in script_tags:
-        if script.string and ('price' in script.string or 'Price' in script.string):
-            # Look for price in JSON format
-            price_match = re.search(r'"price"\s*:\s*["\']?([\d.,]+)["\']?', script.string)
-            if price_match:
-                price_value = price_match.group(1)
-
-                # Look for currency in the same script
-                currency_match = re.search(r'"currencyCode"\s*:\s*["\']?([A-Z]{3})["\']?', script.string)
-                if currency_match:
-                    currency_code = currency_match.group(1)
-                    # Map currency codes to symbols
-                    currency_map = {
-                        'USD': '$', 'EUR': '€', 'GBP': '£', 'JPY': '¥',
-                        'CAD': 'C$', 'AUD': 'A$', 'INR': '₹', 'CNY': '¥',
-                        'MXN': 'Mex$', 'BRL': 'R$', 'SGD': 'S$'
-                    }
-                    currency_symbol = currency_map.get(currency_code, currency_code)
-                    price = f"{currency_symbol}{price_value}"
-                    break
-                else:
-                    price = price_value
-                    break
-
-    # If not found in scripts, try visible HTML elements
-    if price == "Not found":
-        # Look for price in structured data
-        price_elem = soup.find('span', class_='a-offscreen')
-        if price_elem:
-            price_text = price_elem.get_text(strip=True)
-            # Extract currency and amount
-            currency_match = re.search(r'[^\d.,\s]', price_text)
-            amount_match = re.search(r'[\d.,]+', price_text)
-
-            currency = currency_match.group() if currency_match else ''
-            amount = amount_match.group() if amount_match else price_text
-
-            price = f"{currency}{amount}"
-
-    # If still not found, try other elements
-    if price == "Not found":
-        price_selectors = [
-            'span.a-price-whole',
-            'span.apexPriceToPay',
-            'span[data-cy="price-recipe"]',
-            'span.a-price',
-            'span.priceBlockBuyingPriceString'
-        ]
-        for selector in price_selectors:
-            price_elem = soup.select_one(selector)
-            if price_elem:
-                price = price_elem.get_text(strip=True)
-                break
-
-    data['price'] = price
-
-    # RATING EXTRACTION - Look in script tags for JSON data first
-    rating = "Not found"
-    for script in script_tags:
-        if script.string:
-            # Look for rating in JSON-LD structured data
-            rating_match = re.search(r'"ratingValue"\s*:\s*["\']?([\d.]+)["\']?', script.string)
-            if rating_match:
-                rating = rating_match.group(1)
-                break
-
-    # If not found in scripts, try visible HTML elements
-    if rating == "Not found":
-        rating_elem = soup.find('span', class_='a-icon-alt')
-        if rating_elem:
-            rating_text = rating_elem.get_text()
-            rating_match = re.search(r'(\d+\.?\d*)', rating_text)
-            rating = rating_match.group(1) if rating_match else "Not found"
-
-    data['rating'] = rating
-
-    # DESCRIPTION EXTRACTION - Look for product description in script tags first
-    description = "No description available"
-
-    # Try to find description in JSON-LD structured data
-    for script in script_tags:
-        if script.string and ('description' in script.string.lower() or 'productdescription' in script.string.lower()):
-            desc_match = re.search(r'"description"\s*:\s*["\']([^"\']+)["\']', script.string)
-            if desc_match:
-                description = desc_match.group(1)
-                break
-
-    # If not found in scripts, try visible HTML elements
-    if description == "No description available":
-        # Look for the main product description
-        desc_elem = soup.find('div', id='productDescription')
-        if desc_elem:
-            # Get all text content and clean it
-            desc_text = desc_elem.get_text(strip=True)
-            # Remove common Amazon metadata that appears in descriptions
-            desc_text = re.sub(r'Dispatches fromAmazon.*?Returns.*?Read full return policy', '', desc_text)
-            desc_text = re.sub(r'PaymentSecure transaction.*?We don’t share your credit card details', '', desc_text)
-            desc_text = re.sub(r'Shipping & Returns.*?Learn more', '', desc_text)
-            desc_text = re.sub(r'Amazon.*?Inc.*?All rights reserved', '', desc_text)
-            desc_text = re.sub(r'Back to top.*?Get to Know UsCareers.*?Amazon.*?CaresGift a*?Smile', '', desc_text)
-            # Remove delivery information
-            desc_text = re.sub(r'FREE delivery.*?Details', '', desc_text)
-            desc_text = re.sub(r'Get it as soon as.*?Details', '', desc_text)
-            desc_text = re.sub(r'Delivered.*?Details', '', desc_text)
-
-            # Limit to 500 characters
-            description = desc_text[:500] if len(desc_text) > 500 else desc_text
-
-    # If still no description, try feature bullets
-    if description == "No description available":
-        feature_bullets = soup.find('div', id='feature-bullets')
-        if feature_bullets:
-            desc_text = feature_bullets.get_text(strip=True)
-            # Remove common Amazon metadata
-            desc_text = re.sub(r'Dispatches fromAmazon.*?Returns.*?Read full return policy', '', desc_text)
-            desc_text = re.sub(r'PaymentSecure transaction.*?We don’t share your credit card details', '', desc_text)
-            desc_text = re.sub(r'Shipping & Returns.*?Learn more', '', desc_text)
-            desc_text = re.sub(r'Amazon.*?Inc.*?All rights reserved', '', desc_text)
-            # Remove delivery information
-            desc_text = re.sub(r'FREE delivery.*?Details', '', desc_text)
-            desc_text = re.sub(r'Get it as soon as.*?Details', '', desc_text)
-            desc_text = re.sub(r'Delivered.*?Details', '', desc_text)
-
-            description = desc_text[:500] if len(desc_text) > 500 else desc_text
-
-    # If still no description, try other places
-    if description == "No description available":
-        desc_elems = soup.find_all('div', class_='a-spacing-base')
-        for elem in desc_elems:
-            elem_text = elem.get_text(strip=True)
-            # Check if this element contains actual product info (not Amazon metadata)
-            if len(elem_text) > 50 and not any(phrase in elem_text.lower() for phrase in
-                ['dispatches from', 'payment', 'secure transaction', 'amazon', 'returns', 'delivery']):
-                description = elem_text[:500]
-                break
-
-    data['description'] = description
-
-    return data
+if 'batch_results' not in st.session_state:
+    st.session_state.batch_results = []
 
 # Function to enhance description using Hugging Face model
-def enhance_description(product_data):
+def enhance_description(product_data, force=False, locale=None):
     try:
-        # Create prompt for the LLM
-        prompt = f"""You are a professional product copywriter. Rewrite the following product description to make it more compelling and persuasive, considering the price and rating (if available).
-
-Product Name: {product_data.get('name', 'N/A')}
-Price: {product_data.get('price', 'N/A')}
-Rating: {product_data.get('rating', 'N/A')}
-Original Description: {product_data.get('description', 'N/A')}
-
-Enhanced Description:"""
-
-        # Use Hugging Face's free inference API with a text generation model
-        API_URL = "https://api-inference.huggingface.co/models/facebook/bart-large-cnn"
-        headers = {"Authorization": f"Bearer {os.getenv('HF_API_KEY', '')}"}
-
-        # If no API key, use a simple enhancement
-        if not os.getenv('HF_API_KEY'):
-            # Simple enhancement without API
-            enhanced = f"🌟 **{product_data.get('name', 'Product')}** 🌟\n\n"
-            enhanced += f"**Price:** {product_data.get('price', 'N/A')}\n"
-            if product_data.get('rating') and product_data['rating'] != "Not found" and product_data['rating'] != "Not available":
-                enhanced += f"**Rating:** ⭐ {product_data.get('rating', 'N/A')}/5\n\n"
-
-            # Add persuasive elements based on price and rating
-            desc = product_data.get('description', 'No description available')
-            if "Not found" not in desc and "No description" not in desc and len(desc) > 20:
-                enhanced += f"**Why you'll love it:**\n{desc}\n\n"
-
-            # Add value proposition
-            if product_data.get('price') and "Not found" not in product_data['price']:
-                try:
-                    # Extract numeric price value
-                    price_val = float(re.sub(r'[^\d.]', '', product_data['price']))
-                    if price_val < 50:
-                        enhanced += "💡 **Great value for money!** This affordable option delivers excellent quality without breaking the bank."
-                    elif price_val < 200:
-                        enhanced += "💎 **Premium quality at a reasonable price!** You're getting exceptional value with this purchase."
-                    else:
-                        enhanced += "🏆 **Top-tier product for discerning customers!** This premium item offers unmatched quality and features."
-                except:
-                    pass
-
-            if product_data.get('rating') and product_data['rating'] != "Not found" and product_data['rating'] != "Not available":
-                try:
-                    rating_val = float(product_data['rating'])
-                    if rating_val >= 4.5:
-                        enhanced += "\n\n✅ **Highly rated by customers!** Join thousands of satisfied buyers who love this product."
-                    elif rating_val >= 4.0:
-                        enhanced += "\n\n👍 **Well-reviewed by customers!** Most buyers are very happy with their purchase."
-                except:
-                    pass
-
-            enhanced += "\n\n✨ **Don't miss out on this excellent product!** ✨"
-            return enhanced
-
-        # If API key is available, use the model
-        payload = {
-            "inputs": prompt,
-            "parameters": {
-                "max_length": 300,
-                "min_length": 100,
-                "do_sample": False
-            }
-        }
-
-        response = requests.post(API_URL, headers=headers, json=payload)
-        result = response.json()
-
-        if isinstance(result, list) and len(result) > 0:
-            # Return just the generated text, not the full prompt
-            generated_text = result[0]['summary_text']
-            # Remove any parts that look like the original prompt
-            if "You are a professional product copywriter" in generated_text:
-                # Try to extract just the enhanced description part
-                if "Enhanced Description:" in generated_text:
-                    parts = generated_text.split("Enhanced Description:")
-                    if len(parts) > 1:
-                        generated_text = parts[1].strip()
-            return generated_text
-        else:
-            # If API returns error, use fallback
-            enhanced = f"🌟 **{product_data.get('name', 'Product')}** 🌟\n\n"
-            enhanced += f"**Price:** {product_data.get('price', 'N/A')}\n"
-            if product_data.get('rating') and product_data['rating'] != "Not found" and product_data['rating'] != "Not available":
-                enhanced += f"**Rating:** ⭐ {product_data.get('rating', 'N/A')}/5\n\n"
-
-            # Add persuasive elements based on price and rating
-            desc = product_data.get('description', 'No description available')
-            if "Not found" not in desc and "No description" not in desc and len(desc) > 20:
-                enhanced += f"**Why you'll love it:**\n{desc}\n\n"
-
-            # Add value proposition
-            if product_data.get('price') and "Not found" not in product_data['price']:
-                try:
-                    # Extract numeric price value
-                    price_val = float(re.sub(r'[^\d.]', '', product_data['price']))
-                    if price_val < 50:
-                        enhanced += "💡 **Great value for money!** This affordable option delivers excellent quality without breaking the bank."
-                    elif price_val < 200:
-                        enhanced += "💎 **Premium quality at a reasonable price!** You're getting exceptional value with this purchase."
-                    else:
-                        enhanced += "🏆 **Top-tier product for discerning customers!** This premium item offers unmatched quality and features."
-                except:
-                    pass
-
-            if product_data.get('rating') and product_data['rating'] != "Not found" and product_data['rating'] != "Not available":
-                try:
-                    rating_val = float(product_data['rating'])
-                    if rating_val >= 4.5:
-                        enhanced += "\n\n✅ **Highly rated by customers!** Join thousands of satisfied buyers who love this product."
-                    elif rating_val >= 4.0:
-                        enhanced += "\n\n👍 **Well-reviewed by customers!** Most buyers are very happy with their purchase."
-                except:
-                    pass
-
-            enhanced += "\n\n✨ **Don't miss out on this excellent product!** ✨"
-            return enhanced
-
-    except Exception as e:
-        # Fallback if anything goes wrong
-        enhanced = f"🌟 **{product_data.get('name', 'Product')}** 🌟\n\n"
-        enhanced += f"**Price:** {product_data.get('price', 'N/A')}\n"
-        if product_data.get('rating') and product_data['rating'] != "Not found" and product_data['rating'] != "Not available":
-            enhanced += f"**Rating:** ⭐ {product_data.get('rating', 'N/A')}/5\n\n"
-
-        # Add persuasive elements based on price and rating
-        desc = product_data.get('description', 'No description available')
-        if "Not found" not in desc and "No description" not in desc and len(desc) > 20:
-            enhanced += f"**Why you'll love it:**\n{desc}\n\n"
-
-        # Add value proposition
-        if product_data.get('price') and "Not found" not in product_data['price']:
-            try:
-                # Extract numeric price value
-                price_val = float(re.sub(r'[^\d.]', '', product_data['price']))
-                if price_val < 50:
-                    enhanced += "💡 **Great value for money!** This affordable option delivers excellent quality without breaking the bank."
-                elif price_val < 200:
-                    enhanced += "💎 **Premium quality at a reasonable price!** You're getting exceptional value with this purchase."
-                else:
-                    enhanced += "🏆 **Top-tier product for discerning customers!** This premium item offers unmatched quality and features."
-            except:
-                pass
-
-        if product_data.get('rating') and product_data['rating'] != "Not found" and product_data['rating'] != "Not available":
-            try:
-                rating_val = float(product_data['rating'])
-                if rating_val >= 4.5:
-                    enhanced += "\n\n✅ **Highly rated by customers!** Join thousands of satisfied buyers who love this product."
-                elif rating_val >= 4.0:
-                    enhanced += "\n\n👍 **Well-reviewed by customers!** Most buyers are very happy with their purchase."
-            except:
-                pass
-
-        enhanced += "\n\n✨ **Don't miss out on this excellent product!** ✨"
-        return enhanced
+        backend = get_inference_backend()
+        if backend is not None:
+            # Use the model (results are cached by request)
+            generated_text = backend.generate([build_prompt(product_data)], cache=get_cache().descriptions, force=force)[0]
+            if generated_text is not None:
+                return generated_text
+    except Exception:
+        pass
+    # No API key, or the model failed: template description
+    return render_description(product_data, locale)
 
 # Main app interface
 url = st.text_input("Enter Amazon product URL", placeholder="https://www.amazon.com/product/...")
+force_refresh = st.checkbox("Force refresh", help="Download the page and regenerate the description even if cached")
+LANGUAGE_OPTIONS = ["auto"] + list(get_templates().locales)
+template_locale = st.selectbox(
+    "Template language", LANGUAGE_OPTIONS, index=LANGUAGE_OPTIONS.index(get_templates().default_locale),
+    format_func=lambda locale: "Match marketplace" if locale == "auto" else locale,
+    help="Language of template descriptions, used without a model or when generation fails"
+)
 
 col1, col2, col3 = st.columns([1, 2, 1])
 with col2:
     if st.button("✨ Enhance Product Description", use_container_width=True):
         if url:
             with st.spinner("Extracting product information..."):
-                product_data = extract_product_info(url)
+                product_data = get_cache().extract_product_info(url, force=force_refresh)
 
                 # Only proceed if extraction was successful
                 if "error" not in product_data:
                     st.session_state.product_data = product_data
                     with st.spinner("Generating enhanced description..."):
-                        enhanced_desc = enhance_description(product_data)
+                        enhanced_desc = enhance_description(product_data, force=force_refresh, locale=template_locale)
                         st.session_state.enhanced_description = enhanced_desc
                 else:
                     st.error(product_data["error"])
@@ -472,6 +139,20 @@ with col2:
         else:
             st.warning("Please enter an Amazon product URL")
 
+# Cache instrumentation
+with st.sidebar:
+    st.header("Cache")
+    cache = get_cache()
+    page_stats = cache.pages.stats
+    st.metric("Page hit rate", f"{page_stats.hit_rate:.0%}", help=f"{page_stats.hits} hits / {page_stats.lookups} lookups")
+    st.caption(f"{len(cache.pages)} pages cached, {page_stats.evictions} evicted, {page_stats.saved_seconds:.1f}s of downloads saved")
+    for label, result_cache in (("Product", cache.products), ("Description", cache.descriptions)):
+        stats = result_cache.stats
+        st.caption(
+            f"{label} cache: {stats.hit_rate:.0%} hit rate "
+            f"({stats.hits}/{stats.lookups}), {stats.saved_seconds:.1f}s saved"
+        )
+
 # Display results
 if st.session_state.product_data and "error" not in st.session_state.product_data:
     st.markdown("## Product Information")
@@ -501,6 +182,24 @@ if st.session_state.product_data and "error" not in st.session_state.product_dat
             domain = 'N/A'
         st.metric("Source", domain)
 
+    # Price history for tracked products
+    tracker = get_tracker()
+    tracked_id = tracker.product_id(url_from_data) if url_from_data != 'N/A' else None
+    if tracked_id is None:
+        if st.button("📈 Track price history"):
+            tracked_id = tracker.add(url_from_data, st.session_state.product_data.get('name'))
+            if tracked_id is None:
+                st.warning("Only product URLs with an ASIN (/dp/...) can be tracked")
+            else:
+                tracker.record(tracked_id, st.session_state.product_data)
+    if tracked_id is not None:
+        history = tracker.history(tracked_id)
+        st.markdown("### Price History")
+        if len(history) > 1:
+            st.line_chart(history, x="date", y=["min", "max"])
+        else:
+            st.caption("Tracking started. The chart fills in as the product is re-checked.")
+
     # Display original description
     st.markdown("### Original Description")
     original_desc = st.session_state.product_data.get("description", "No description available")
@@ -538,6 +237,93 @@ if st.session_state.product_data and "error" not in st.session_state.product_dat
             mime="application/json"
         )
 
+# Batch mode: scrape a list of URLs concurrently
+st.markdown("---")
+st.markdown("## Batch Mode")
+uploaded_urls = st.file_uploader("Upload a list of Amazon product URLs (.txt or .csv)", type=["txt", "csv"])
+batch_workers = st.slider("Concurrent downloads", min_value=1, max_value=32, value=8)
+batch_rate = st.slider("Requests per second per Amazon domain", min_value=0.5, max_value=5.0, value=1.0, step=0.5)
+batch_enhance = st.checkbox(
+    "Generate enhanced descriptions",
+    help="Batched model requests with HF_API_KEY or HF_BACKEND=local; template descriptions otherwise"
+)
+
+if uploaded_urls and st.button("🚀 Scrape All URLs"):
+    urls = read_urls(uploaded_urls.getvalue().decode("utf-8").splitlines())
+    if not urls:
+        st.warning("No product URLs found in the uploaded file")
+    else:
+        progress = st.progress(0.0)
+        table = st.empty()
+        rows = [None] * len(urls)
+        scraper = BatchScraper(workers=batch_workers, rate=batch_rate)
+        # Results arrive in completion order; the table keeps input order
+        for done, (index, product_data) in enumerate(scraper.scrape_many(urls), start=1):
+            rows[index] = {field: product_data.get(field, "") for field in CSV_FIELDS}
+            progress.progress(done / len(urls), text=f"{done}/{len(urls)} pages scraped")
+            table.dataframe([row for row in rows if row], use_container_width=True)
+        table.empty()
+
+        if batch_enhance:
+            scraped = [row for row in rows if not row["error"]]
+            texts = [None] * len(scraped)
+            try:
+                backend = get_inference_backend()
+                if backend is not None:
+                    progress.progress(0.0, text="Generating enhanced descriptions...")
+                    texts = backend.generate(
+                        [build_prompt(row) for row in scraped], cache=get_cache().descriptions,
+                        progress=lambda done, total: progress.progress(done / total, text=f"{done}/{total} descriptions generated")
+                    )
+            except Exception as e:
+                # Keep the scraped rows: the model failing (load error, out of memory) only loses its descriptions
+                st.warning(f"Description model failed ({e}); using template descriptions")
+                texts = [None] * len(scraped)
+            # Products the model did not describe get the template description
+            missing = [row for row, text in zip(scraped, texts) if text is None]
+            fallback = iter(get_templates().render_many(missing, template_locale))
+            for row in rows:
+                row["enhanced_description"] = ""
+            for row, text in zip(scraped, texts):
+                row["enhanced_description"] = text if text is not None else next(fallback)
+        st.session_state.batch_results = rows
+
+if st.session_state.batch_results:
+    st.dataframe(st.session_state.batch_results, use_container_width=True)
+    batch_csv = io.StringIO()
+    writer = csv.DictWriter(batch_csv, fieldnames=list(st.session_state.batch_results[0]))
+    writer.writeheader()
+    writer.writerows(st.session_state.batch_results)
+    st.download_button(
+        label="Download CSV",
+        data=batch_csv.getvalue(),
+        file_name="products.csv",
+        mime="text/csv"
+    )
+
+# Price tracking: re-check the watchlist and show drops
+st.markdown("---")
+st.markdown("## Price Tracking")
+tracker = get_tracker()
+st.caption(f"{len(tracker)} products tracked. Schedule `python price_tracker.py watch` to re-check them regularly.")
+if len(tracker) and st.button("🔄 Re-check tracked prices"):
+    progress = st.progress(0.0)
+    scraped, failed = tracker.refresh(
+        max_age=3600, workers=batch_workers, rate=batch_rate,
+        progress=lambda done, total: progress.progress(done / total, text=f"{done}/{total} products checked")
+    )
+    st.success(f"{scraped} products checked, {failed} failed" if scraped else "Every product was checked within the last hour")
+drop_percent = st.slider("Alert when today's price is this far below the 30-day high (%)", 5, 50, 10)
+alerts = tracker.alerts(drop_percent / 100)
+if alerts:
+    st.dataframe(
+        [{"product": a["name"] or a["asin"], "price": a["price"], "30-day high": a["previous_high"],
+          "currency": a["currency"], "drop": f"{a['drop']:.0%}", "url": a["url"]} for a in alerts],
+        use_container_width=True
+    )
+elif len(tracker):
+    st.caption("No price drops today")
+
 # Instructions
 st.markdown("---")
 st.markdown("### How to use:")
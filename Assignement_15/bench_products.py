@@ -0,0 +1,706 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the Amazon Product Description Enhancer.
+
+Usage:
+  python bench_products.py scrape --synthetic 300 --workers 16
+  python bench_products.py scrape --corpus saved_pages/ --urls 300
+  python bench_products.py scripts --synthetic 100
+  python bench_products.py cleanup --sizes 1000 4000 16000
+  python bench_products.py parse --corpus saved_pages/
+  python bench_products.py parse --synthetic 50 --page-kb 1500
+  python bench_products.py tracker --products 10000 --days 90
+  python bench_products.py inference --products 500 --batch-size 8 --workers 4
+  python bench_products.py templates --products 100000
+
+A corpus directory holds saved Amazon product pages (NAME.html). Without one,
+synthetic pages with the same structure (title, price/rating JSON in script
+tags, description, feature bullets and large filler scripts) are generated.
+The stand-in server acts as an HTTP proxy, so the scraper sees real Amazon
+URLs while every request is answered locally.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+DOMAINS = ["amazon.com", "amazon.co.uk", "amazon.de", "amazon.fr", "amazon.it", "amazon.es", "amazon.ca", "amazon.in"]
+
+
+def synthetic_product_page(rng, asin, filler_kb=400):
+    """An Amazon-like product page of roughly filler_kb kilobytes."""
+    price = f"{rng.randint(5, 900)}.{rng.randint(0, 99):02d}"
+    rating = f"{rng.randint(30, 50) / 10:.1f}"
+    filler = "".join(
+        '<script type="text/javascript">var data%d = {"widget": "carousel", "displayPrice": "%s", "items": [%s]};</script>'
+        % (i, "See Price in Cart", ",".join(str(rng.randint(0, 10 ** 6)) for _ in range(200)))
+        for i in range(filler_kb // 2)
+    )
+    description = (
+        f"The {asin} gadget is built from durable materials, with a long-lasting battery, "
+        "a bright display and a comfortable grip for everyday use. "
+    ) * 3
+    bullets = "".join(f"<li><span>Feature {i}: reliable, light and easy to clean.</span></li>" for i in range(6))
+    html = (
+        "<html><head><meta charset=\"utf-8\"><title>Amazon.com</title>"
+        f"{filler}"
+        '<script type="text/javascript">'
+        f'var twister = {{"price": "{price}", "currencyCode": "USD", "asin": "{asin}"}};'
+        "</script>"
+        '<script type="application/ld+json">'
+        + json.dumps({
+            "@type": "Product", "name": f"Gadget {asin}",
+            "aggregateRating": {"ratingValue": rating, "reviewCount": rng.randint(1, 5000)}
+        })
+        + "</script></head><body>"
+        '<div id="nav-main">Deliver to Helsinki Account &amp; Lists Returns &amp; Orders</div>'
+        f'<span id="productTitle"> Gadget {asin} </span>'
+        f'<span class="a-price"><span class="a-offscreen">${price}</span></span>'
+        f'<span class="a-icon-alt">{rating} out of 5 stars</span>'
+        f'<div id="feature-bullets"><ul>{bullets}</ul>FREE delivery Tuesday. Details</div>'
+        f'<div id="productDescription"><p>{description}</p>'
+        "Dispatches fromAmazon Sold by Amazon Returns Returnable within 30 days Read full return policy</div>"
+        "</body></html>"
+    )
+    return html.encode("utf-8")
+
+
+def load_pages(args, count):
+    if args.corpus:
+        pages = [path.read_bytes() for path in sorted(Path(args.corpus).glob("*.html"))]
+        if not pages:
+            print("Corpus is empty", file=sys.stderr)
+            sys.exit(1)
+        return pages
+    rng = random.Random(args.seed)
+    return [synthetic_product_page(rng, f"B0{i:08d}", args.page_kb) for i in range(count)]
+
+
+class StandInProxy(BaseHTTPRequestHandler):
+    """Answers proxied GETs for any Amazon URL with a saved page."""
+
+    pages = []
+    latency = 0.1
+    error_rate = 0.0
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        if random.random() < self.error_rate:
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = self.pages[hash(self.path) % len(self.pages)]
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_proxy(pages, latency, error_rate=0.0):
+    StandInProxy.pages = pages
+    StandInProxy.latency = latency
+    StandInProxy.error_rate = error_rate
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInProxy)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def product_urls(count):
+    return [f"http://www.{DOMAINS[i % len(DOMAINS)]}/dp/B0{i:08d}?ref=bench" for i in range(count)]
+
+
+class StandInInference(BaseHTTPRequestHandler):
+    """
+    Answers Inference API POSTs like a summarization model: 503 "loading" for
+    the first `warmup` seconds, then a fixed cost per request plus a smaller
+    cost per input, with at most `slots` requests computed at once.
+    """
+
+    started = 0.0
+    warmup = 0.0
+    base_latency = 0.3
+    input_latency = 0.03
+    error_rate = 0.0
+    slots = threading.Semaphore(2)
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        inputs = payload["inputs"] if isinstance(payload["inputs"], list) else [payload["inputs"]]
+        remaining = self.warmup - (time.monotonic() - self.started)
+        if remaining > 0:
+            self._reply(503, {"error": "Model facebook/bart-large-cnn is currently loading", "estimated_time": remaining})
+            return
+        if random.random() < self.error_rate:
+            self._reply(502, {"error": "Bad gateway"})
+            return
+        with self.slots:
+            time.sleep(self.base_latency + self.input_latency * len(inputs))
+        self._reply(200, [{"summary_text": f"Enhanced: {text.split('Product Name: ')[-1][:60]}"} for text in inputs])
+
+
+def bench_inference(args):
+    import requests
+    from hf_inference import HFInferenceClient, build_prompt
+
+    rng = random.Random(args.seed)
+    products = [
+        {"name": f"Gadget B0{i:08d}", "price": f"${rng.randint(5, 900)}.99",
+         "rating": f"{rng.randint(30, 50) / 10:.1f}", "description": "Durable, light and easy to clean. " * 4}
+        for i in range(args.products)
+    ]
+    prompts = [build_prompt(product) for product in products]
+
+    StandInInference.base_latency = args.latency
+    StandInInference.input_latency = args.input_latency
+    StandInInference.error_rate = args.error_rate
+    StandInInference.slots = threading.Semaphore(args.slots)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInInference)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    api_url = f"http://127.0.0.1:{server.server_port}/models"
+    print(f"{args.products} products, {args.latency * 1000:.0f} ms per request + {args.input_latency * 1000:.0f} ms "
+          f"per input, {args.slots} concurrent slots, {args.warmup:g}s model loading, {args.error_rate:.0%} 502s")
+
+    if args.baseline:
+        # One blocking POST per product with no retries, as enhance_description did
+        StandInInference.started = time.monotonic()
+        failed = 0
+        start = time.perf_counter()
+        for prompt in prompts[:args.baseline]:
+            result = requests.post(f"{api_url}/facebook/bart-large-cnn", json={"inputs": prompt}).json()
+            failed += not isinstance(result, list)
+        elapsed = time.perf_counter() - start
+        print(f"{'sequential':<12} {args.baseline / elapsed:>8.1f} products/s ({args.baseline} products, "
+              f"{failed} fell back to the template)")
+
+    client = HFInferenceClient(api_url=api_url, api_key="bench", batch_size=args.batch_size,
+                               workers=args.workers, rate=args.rate)
+    StandInInference.started = time.monotonic()
+    StandInInference.warmup = args.warmup
+    start = time.perf_counter()
+    texts = client.generate(prompts)
+    elapsed = time.perf_counter() - start
+    server.shutdown()
+    failed = sum(text is None for text in texts)
+    print(f"{'client':<12} {args.products / elapsed:>8.1f} products/s, batch {args.batch_size}, "
+          f"{args.workers} workers, {args.rate:g} req/s: {client.stats['requests']} requests, "
+          f"{client.stats['retries']} retries ({client.stats['loading_waits']} loading waits), {failed} failed")
+
+
+def bench_scrape(args):
+    import requests
+    from product_batch import BatchScraper
+    from product_extract import HEADERS, parse_product_page
+
+    count = args.urls or args.synthetic
+    pages = load_pages(args, min(count, 50))
+    server, proxy = start_proxy(pages, args.latency, args.error_rate)
+    proxies = {"http": proxy}
+    urls = product_urls(count)
+    print(f"{count} URLs over {len(DOMAINS)} domains, {len(pages)} distinct pages, "
+          f"{args.latency * 1000:.0f} ms latency, {args.error_rate:.0%} 503s")
+
+    if args.baseline:
+        # One blocking requests.get per URL, as the app's single-URL path does
+        start = time.perf_counter()
+        for url in urls[:args.baseline]:
+            response = requests.get(url, headers=HEADERS, timeout=15, proxies=proxies)
+            parse_product_page(url, response.content)
+        elapsed = time.perf_counter() - start
+        print(f"{'sequential':<12} {args.baseline / elapsed:>8.1f} pages/s ({args.baseline} URLs)")
+
+    scraper = BatchScraper(workers=args.workers, rate=args.rate, proxies=proxies)
+    start = time.perf_counter()
+    first = None
+    failed = 0
+    for _, product_data in scraper.scrape_many(urls):
+        first = first or time.perf_counter() - start
+        failed += "error" in product_data
+    elapsed = time.perf_counter() - start
+    server.shutdown()
+    print(f"{'batch':<12} {count / elapsed:>8.1f} pages/s, {args.workers} workers, "
+          f"{args.rate:g} req/s per domain, first result after {first * 1000:.0f} ms, {failed} failed")
+
+
+def legacy_script_fields(soup):
+    """The original three separate passes over the script tags, for comparison."""
+    import re
+
+    found = {}
+    script_tags = soup.find_all('script', type='text/javascript')
+    for script in script_tags:
+        if script.string and ('price' in script.string or 'Price' in script.string):
+            price_match = re.search(r'"price"\s*:\s*["\']?([\d.,]+)["\']?', script.string)
+            if price_match:
+                found['price'] = price_match.group(1)
+                currency_match = re.search(r'"currencyCode"\s*:\s*["\']?([A-Z]{3})["\']?', script.string)
+                found['currencyCode'] = currency_match.group(1) if currency_match else None
+                break
+    for script in script_tags:
+        if script.string:
+            rating_match = re.search(r'"ratingValue"\s*:\s*["\']?([\d.]+)["\']?', script.string)
+            if rating_match:
+                found['ratingValue'] = rating_match.group(1)
+                break
+    for script in script_tags:
+        if script.string and ('description' in script.string.lower() or 'productdescription' in script.string.lower()):
+            desc_match = re.search(r'"description"\s*:\s*["\']([^"\']+)["\']', script.string)
+            if desc_match:
+                found['description'] = desc_match.group(1)
+                break
+    return found
+
+
+def bench_scripts(args):
+    from bs4 import BeautifulSoup
+    from product_extract import extract_amazon, scan_scripts
+    from product_parsers import SoupPage
+
+    pages = load_pages(args, args.synthetic or 0)
+    soups = [BeautifulSoup(page, 'html.parser') for page in pages]
+    print(f"{len(pages)} pages, {sum(len(p) for p in pages) / 1e6:.1f} MB")
+
+    start = time.process_time()
+    legacy = [legacy_script_fields(soup) for soup in soups]
+    legacy_ms = (time.process_time() - start) * 1000 / len(pages)
+
+    start = time.process_time()
+    single = []
+    for soup in soups:
+        texts = [str(s.string) for s in soup.find_all('script') if s.string and s.get('type') == 'text/javascript']
+        single.append(scan_scripts(texts))
+    single_ms = (time.process_time() - start) * 1000 / len(pages)
+
+    start = time.process_time()
+    for page in [SoupPage(soup) for soup in soups]:
+        extract_amazon(page, "amazon.com")
+    extract_ms = (time.process_time() - start) * 1000 / len(pages)
+
+    mismatches = sum(a != b for a, b in zip(legacy, single))
+    print(f"script scan, three passes: {legacy_ms:8.2f} ms CPU/page")
+    print(f"script scan, single pass:  {single_ms:8.2f} ms CPU/page ({legacy_ms / single_ms:.1f}x)")
+    print(f"extract_amazon total:      {extract_ms:8.2f} ms CPU/page (after parsing)")
+    print(f"pages with different results: {mismatches}")
+
+
+def rss_bytes():
+    """Current resident set size (Linux), or 0 where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return 0
+
+
+def parse_memory(backend, pages, queue):
+    """Run in a fresh process: memory held by parsed trees of every page."""
+    import tracemalloc
+    from product_parsers import get_parser
+
+    parser = get_parser(backend)
+    before = rss_bytes()
+    tracemalloc.start()
+    trees = [parser(page) for page in pages]
+    _, python_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    queue.put((rss_bytes() - before, python_peak, len(trees)))
+
+
+def bench_parse(args):
+    from product_extract import extract_amazon
+    from product_parsers import available_backends, get_parser
+
+    pages = load_pages(args, args.synthetic or 0)
+    megabytes = sum(len(p) for p in pages) / 1e6
+    print(f"{len(pages)} pages, {megabytes:.1f} MB")
+    installed = available_backends()
+    backends = [b for b in (args.backends or installed) if b in installed]
+
+    # bs4 with html.parser is the original behaviour, so compare against it
+    reference = [extract_amazon(get_parser("bs4")(page), "amazon.com") for page in pages] if "bs4" in installed else None
+    print(f"{'backend':<12} {'parse/s':>9} {'total/s':>9} {'MB/s':>7} {'RSS MB/page':>12} "
+          f"{'py peak MB/page':>16} {'mismatches':>11}")
+    for backend in backends:
+        parser = get_parser(backend)
+        start = time.perf_counter()
+        trees = [parser(page) for page in pages]
+        parse_s = time.perf_counter() - start
+        start = time.perf_counter()
+        results = [extract_amazon(tree, "amazon.com") for tree in trees]
+        total_s = parse_s + time.perf_counter() - start
+        del trees
+
+        # Memory in a separate process so earlier backends do not skew the numbers
+        sample = pages[:args.memory_pages]
+        queue = multiprocessing.get_context("spawn").Queue()
+        process = multiprocessing.get_context("spawn").Process(target=parse_memory, args=(backend, sample, queue))
+        process.start()
+        rss, python_peak, count = queue.get()
+        process.join()
+
+        mismatches = sum(a != b for a, b in zip(reference, results)) if reference else "-"
+        print(f"{backend:<12} {len(pages) / parse_s:>9.1f} {len(pages) / total_s:>9.1f} "
+              f"{megabytes / total_s:>7.1f} {rss / count / 1e6:>12.2f} {python_peak / count / 1e6:>16.2f} "
+              f"{mismatches:>11}")
+
+
+def bench_tracker(args):
+    import sqlite3
+    import tempfile
+    from price_tracker import DAY, PriceTracker
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "prices.sqlite3")
+        tracker = PriceTracker(path)
+        ids = [tracker.add(f"https://www.{DOMAINS[i % len(DOMAINS)]}/dp/B0{i:08d}") for i in range(args.products)]
+
+        # A random walk per product, a few scrapes a day, the last one now
+        now = int(time.time())
+        step = DAY // args.per_day
+        prices = {product_id: rng.randint(500, 50000) for product_id in ids}
+        observations = 0
+        start = time.perf_counter()
+        for ts in range(now - args.days * DAY, now + 1, step):
+            batch = []
+            for product_id in ids:
+                prices[product_id] = max(100, int(prices[product_id] * rng.uniform(0.995, 1.005)))
+                cents = prices[product_id]
+                if ts == now and rng.random() < 0.02:
+                    cents = int(cents * 0.8)  # A sale today
+                batch.append((product_id, ts, cents, "USD", round(rng.uniform(3.5, 5.0), 1)))
+            tracker.record_many(batch)
+            observations += len(batch)
+        insert_s = time.perf_counter() - start
+        print(f"{args.products} products, {observations} observations over {args.days} days: "
+              f"{observations / insert_s:,.0f} observations/s recorded, "
+              f"{os.path.getsize(path) / 1e6:.0f} MB on disk")
+
+        conn = sqlite3.connect(path)
+        sample = rng.sample(ids, min(args.queries, len(ids)))
+        first_ts = now - 90 * DAY
+
+        start = time.perf_counter()
+        for product_id in sample:
+            conn.execute(
+                "SELECT day, min_cents, max_cents FROM daily_prices WHERE product_id = ? AND day > ? ORDER BY day",
+                (product_id, first_ts // DAY)
+            ).fetchall()
+        rollup_ms = (time.perf_counter() - start) * 1000 / len(sample)
+        start = time.perf_counter()
+        for product_id in sample:
+            conn.execute(
+                "SELECT ts / 86400, MIN(price_cents), MAX(price_cents) FROM observations "
+                "WHERE product_id = ? AND ts > ? GROUP BY 1 ORDER BY 1",
+                (product_id, first_ts)
+            ).fetchall()
+        raw_ms = (time.perf_counter() - start) * 1000 / len(sample)
+        start = time.perf_counter()
+        for product_id in sample:
+            tracker.history(product_id, 90)
+        history_ms = (time.perf_counter() - start) * 1000 / len(sample)
+        print(f"90-day chart:  rollups {rollup_ms:6.2f} ms, raw observations {raw_ms:6.2f} ms "
+              f"(tracker.history incl. formatting {history_ms:.2f} ms)")
+
+        today = now // DAY
+        start = time.perf_counter()
+        alerts = tracker.alerts(0.1, 30)
+        rollup_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        raw = conn.execute(
+            "SELECT t.product_id FROM "
+            "(SELECT product_id, MIN(price_cents) AS low FROM observations WHERE ts >= ? GROUP BY product_id) t "
+            "JOIN (SELECT product_id, MAX(price_cents) AS high FROM observations "
+            "      WHERE ts >= ? AND ts < ? GROUP BY product_id) ref ON ref.product_id = t.product_id "
+            "WHERE t.low <= ref.high * 0.9",
+            (today * DAY, (today - 30) * DAY, today * DAY)
+        ).fetchall()
+        raw_ms = (time.perf_counter() - start) * 1000
+        print(f"drop alerts:   rollups {rollup_ms:6.1f} ms, raw observations {raw_ms:6.1f} ms "
+              f"({len(alerts)} vs {len(raw)} products)")
+        conn.close()
+
+
+LEGACY_CLEANUP = [
+    r'Dispatches fromAmazon.*?Returns.*?Read full return policy',
+    r'PaymentSecure transaction.*?We don’t share your credit card details',
+    r'Shipping & Returns.*?Learn more',
+    r'Amazon.*?Inc.*?All rights reserved',
+    r'Back to top.*?Get to Know UsCareers.*?Amazon.*?CaresGift a*?Smile',
+    r'FREE delivery.*?Details',
+    r'Get it as soon as.*?Details',
+    r'Delivered.*?Details',
+]
+
+BOILERPLATE = [
+    "Dispatches fromAmazon Sold by Amazon Returns Returnable within 30 days Read full return policy",
+    "PaymentSecure transaction We don’t share your credit card details",
+    "Shipping & Returns Learn more",
+    "© 1996-2024, Amazon.com, Inc. or its affiliates. All rights reserved",
+    "FREE delivery Tuesday, 4 June. Details",
+    "Get it as soon as tomorrow. Details",
+]
+
+
+def legacy_cleanup(text):
+    """The original sequence of backtracking re.sub calls, for comparison."""
+    import re
+
+    for pattern in LEGACY_CLEANUP:
+        text = re.sub(pattern, '', text)
+    return text
+
+
+def pathological_texts(size):
+    """Inputs that make lazy-quantifier chains backtrack: first markers with no closing one."""
+    return {
+        "Amazon, no 'All rights reserved'": "Amazon Inc " * (size // 11),
+        "Delivered, no 'Details'": "Delivered " * (size // 10),
+        "Back to top, no footer": ("Back to top Get to Know UsCareers Amazon " * (size // 41)),
+    }
+
+
+def rule_regex_cleanup(rules, text, section="description"):
+    """The rule file applied as the original chain of lazy re.sub calls."""
+    import re
+
+    for markers in rules.for_section(section):
+        text = re.sub(".*?".join(map(re.escape, markers)), '', text)
+    return text
+
+
+def marker_soup(rng, rules, count, length):
+    """Short texts of shuffled markers, marker fragments and newlines: overlapping and unclosed rules."""
+    words = sorted({marker for _, markers, _ in rules.rules for marker in markers})
+    words += [word[:len(word) // 2] for word in words] + ["\n", " ", "x"]
+    return ["".join(rng.choice(words) for _ in range(rng.randint(1, length))) for _ in range(count)]
+
+
+def bench_cleanup(args):
+    from text_cleanup import CleanupRules, clean_text
+
+    # Realistic descriptions: product prose with boilerplate spliced in
+    rng = random.Random(args.seed)
+    prose = "Durable stainless steel body, dishwasher safe and easy to store. "
+    samples = []
+    for _ in range(args.samples):
+        parts = [prose * rng.randint(1, 5)]
+        for fragment in rng.sample(BOILERPLATE, rng.randint(0, 3)):
+            parts += [fragment, prose]
+        samples.append("".join(parts))
+
+    start = time.perf_counter()
+    legacy = [legacy_cleanup(text) for text in samples]
+    legacy_s = time.perf_counter() - start
+    start = time.perf_counter()
+    cleaned = [clean_text(text) for text in samples]
+    cleaned_s = time.perf_counter() - start
+    mismatches = sum(a != b for a, b in zip(legacy, cleaned))
+    print(f"{args.samples} descriptions: regex {legacy_s * 1e6 / args.samples:.1f} us, "
+          f"rules {cleaned_s * 1e6 / args.samples:.1f} us per text, {mismatches} different results")
+
+    # Same results as re.sub on the same rules, in order, wherever markers overlap or go unclosed
+    rules = CleanupRules.from_file()
+    fuzz = marker_soup(rng, rules, args.parity, 12)
+    fuzz += ["FREE delivery Amazon Details Inc All rights reserved",
+             "Amazon FREE delivery Inc Details All rights reserved",
+             "Delivered Get it as soon as Details Details",
+             "Back to top Get to Know UsCareers Amazon Inc All rights reserved CaresGift Smile"]
+    differ = [text for text in fuzz if rule_regex_cleanup(rules, text) != clean_text(text)]
+    print(f"parity with sequential re.sub over {len(fuzz)} overlapping-marker texts: "
+          f"{len(differ)} different results")
+    for text in differ[:5]:
+        print(f"  {text!r}")
+
+    print(f"{'input':<36} {'chars':>7} {'regex ms':>10} {'rules ms':>10}")
+    for size in args.sizes:
+        for name, text in pathological_texts(size).items():
+            timings = []
+            for func in (legacy_cleanup, clean_text):
+                if func is legacy_cleanup and size > args.regex_limit:
+                    timings.append(float("nan"))
+                    continue
+                start = time.perf_counter()
+                func(text)
+                timings.append((time.perf_counter() - start) * 1000)
+            print(f"{name:<36} {len(text):>7} {timings[0]:>10.2f} {timings[1]:>10.2f}")
+
+
+def legacy_template(product_data):
+    """The original string-concatenation template description, for comparison."""
+    import re
+
+    enhanced = f"🌟 **{product_data.get('name', 'Product')}** 🌟\n\n"
+    enhanced += f"**Price:** {product_data.get('price', 'N/A')}\n"
+    if product_data.get('rating') and product_data['rating'] != "Not found" and product_data['rating'] != "Not available":
+        enhanced += f"**Rating:** ⭐ {product_data.get('rating', 'N/A')}/5\n\n"
+    desc = product_data.get('description', 'No description available')
+    if "Not found" not in desc and "No description" not in desc and len(desc) > 20:
+        enhanced += f"**Why you'll love it:**\n{desc}\n\n"
+    if product_data.get('price') and "Not found" not in product_data['price']:
+        try:
+            price_val = float(re.sub(r'[^\d.]', '', product_data['price']))
+            if price_val < 50:
+                enhanced += "💡 **Great value for money!** This affordable option delivers excellent quality without breaking the bank."
+            elif price_val < 200:
+                enhanced += "💎 **Premium quality at a reasonable price!** You're getting exceptional value with this purchase."
+            else:
+                enhanced += "🏆 **Top-tier product for discerning customers!** This premium item offers unmatched quality and features."
+        except:
+            pass
+    if product_data.get('rating') and product_data['rating'] != "Not found" and product_data['rating'] != "Not available":
+        try:
+            rating_val = float(product_data['rating'])
+            if rating_val >= 4.5:
+                enhanced += "\n\n✅ **Highly rated by customers!** Join thousands of satisfied buyers who love this product."
+            elif rating_val >= 4.0:
+                enhanced += "\n\n👍 **Well-reviewed by customers!** Most buyers are very happy with their purchase."
+        except:
+            pass
+    enhanced += "\n\n✨ **Don't miss out on this excellent product!** ✨"
+    return enhanced
+
+
+def synthetic_products(rng, count):
+    """Scraped product_data as the extractor returns it, including missing fields."""
+    prose = "Durable stainless steel body, dishwasher safe and easy to store. "
+    products = []
+    for i in range(count):
+        price = rng.choice([f"${rng.uniform(5, 900):,.2f}", f"${rng.randint(1000, 5000):,}.99", "Not found"])
+        rating = rng.choice([f"{rng.uniform(2.5, 5):.1f}", "Not found", "Not available"])
+        description = rng.choice([prose * rng.randint(1, 6), "No description available", "Not found"])
+        products.append({"url": f"https://www.{rng.choice(DOMAINS)}/dp/B{i:09d}", "name": f"Product {i}",
+                         "price": price, "rating": rating, "description": description})
+    return products
+
+
+def bench_templates(args):
+    from description_templates import DescriptionTemplates
+
+    rng = random.Random(args.seed)
+    products = synthetic_products(rng, args.products)
+
+    start = time.perf_counter()
+    legacy = [legacy_template(product_data) for product_data in products]
+    legacy_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    templates = DescriptionTemplates.from_file()
+    compile_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    rendered = templates.render_many(products)
+    rendered_s = time.perf_counter() - start
+    start = time.perf_counter()
+    templates.render_many(products, "auto")
+    auto_s = time.perf_counter() - start
+
+    mismatches = sum(a != b for a, b in zip(legacy, rendered))
+    print(f"{args.products} products, templates compiled in {compile_ms:.1f} ms")
+    print(f"original concatenation: {legacy_s:6.2f}s  {args.products / legacy_s:>9,.0f} descriptions/s")
+    print(f"compiled templates:     {rendered_s:6.2f}s  {args.products / rendered_s:>9,.0f} descriptions/s "
+          f"({mismatches} different results)")
+    print(f"per-marketplace locale: {auto_s:6.2f}s  {args.products / auto_s:>9,.0f} descriptions/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Product scraper benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    scrape = sub.add_parser("scrape", help="Batch scraping throughput against a local stand-in server")
+    source = scrape.add_mutually_exclusive_group(required=True)
+    source.add_argument("--corpus", help="Directory of saved product pages (NAME.html)")
+    source.add_argument("--synthetic", type=int, help="Scrape this many URLs served from synthetic pages")
+    scrape.add_argument("--urls", type=int, default=0, help="Number of URLs when using --corpus")
+    scrape.add_argument("--workers", type=int, default=16)
+    scrape.add_argument("--rate", type=float, default=5.0, help="Requests per second per domain")
+    scrape.add_argument("--latency", type=float, default=0.1)
+    scrape.add_argument("--error-rate", type=float, default=0.05, help="Fraction of requests answered with 503")
+    scrape.add_argument("--baseline", type=int, default=20, help="URLs to fetch sequentially for comparison")
+    scrape.add_argument("--page-kb", type=int, default=400)
+    scrape.add_argument("--seed", type=int, default=0)
+    scrape.set_defaults(func=bench_scrape)
+
+    scripts = sub.add_parser("scripts", help="CPU time of script-tag scanning, before and after")
+    source = scripts.add_mutually_exclusive_group(required=True)
+    source.add_argument("--corpus", help="Directory of saved product pages (NAME.html)")
+    source.add_argument("--synthetic", type=int, help="Generate this many synthetic pages")
+    scripts.add_argument("--page-kb", type=int, default=400)
+    scripts.add_argument("--seed", type=int, default=0)
+    scripts.set_defaults(func=bench_scripts)
+
+    parse = sub.add_parser("parse", help="Parse + extract throughput and memory per parser backend")
+    source = parse.add_mutually_exclusive_group(required=True)
+    source.add_argument("--corpus", help="Directory of saved product pages (NAME.html)")
+    source.add_argument("--synthetic", type=int, help="Generate this many synthetic pages")
+    parse.add_argument("--backends", nargs="+", help="Backends to compare (default: all installed)")
+    parse.add_argument("--memory-pages", type=int, default=10, help="Pages held at once for the memory figures")
+    parse.add_argument("--page-kb", type=int, default=1500)
+    parse.add_argument("--seed", type=int, default=0)
+    parse.set_defaults(func=bench_parse)
+
+    inference = sub.add_parser("inference", help="Description generation throughput against a stand-in Inference API")
+    inference.add_argument("--products", type=int, default=500)
+    inference.add_argument("--batch-size", type=int, default=8)
+    inference.add_argument("--workers", type=int, default=4)
+    inference.add_argument("--rate", type=float, default=10.0, help="Requests per second (token bucket)")
+    inference.add_argument("--latency", type=float, default=0.3, help="Seconds per request")
+    inference.add_argument("--input-latency", type=float, default=0.03, help="Extra seconds per input in a request")
+    inference.add_argument("--slots", type=int, default=4, help="Requests the stand-in computes at once")
+    inference.add_argument("--warmup", type=float, default=2.0, help="Seconds of 503 model-loading answers")
+    inference.add_argument("--error-rate", type=float, default=0.02, help="Fraction of requests answered with 502")
+    inference.add_argument("--baseline", type=int, default=20, help="Products to send one at a time for comparison")
+    inference.add_argument("--seed", type=int, default=0)
+    inference.set_defaults(func=bench_inference)
+
+    tracker = sub.add_parser("tracker", help="Price history storage, chart and alert queries")
+    tracker.add_argument("--products", type=int, default=10000)
+    tracker.add_argument("--days", type=int, default=90)
+    tracker.add_argument("--per-day", type=int, default=4, help="Scrapes per product per day")
+    tracker.add_argument("--queries", type=int, default=500, help="Chart queries to time")
+    tracker.add_argument("--seed", type=int, default=0)
+    tracker.set_defaults(func=bench_tracker)
+
+    cleanup = sub.add_parser("cleanup", help="Description cleanup rules vs the original regexes")
+    cleanup.add_argument("--samples", type=int, default=2000, help="Realistic descriptions to compare")
+    cleanup.add_argument("--sizes", type=int, nargs="+", default=[1000, 4000, 16000, 64000],
+                         help="Lengths of the pathological inputs")
+    cleanup.add_argument("--regex-limit", type=int, default=4000,
+                         help="Skip the original regexes above this length (they are quadratic or worse)")
+    cleanup.add_argument("--parity", type=int, default=20000,
+                         help="Random marker texts checked against re.sub with the same rules")
+    cleanup.add_argument("--seed", type=int, default=0)
+    cleanup.set_defaults(func=bench_cleanup)
+
+    templates = sub.add_parser("templates", help="Template description rendering vs the original concatenation")
+    templates.add_argument("--products", type=int, default=100000)
+    templates.add_argument("--seed", type=int, default=0)
+    templates.set_defaults(func=bench_templates)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
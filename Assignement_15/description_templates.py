@@ -0,0 +1,191 @@
+"""
+Template descriptions for products without a model-generated one.
+
+Used when no inference backend is configured, when generation fails, and for
+catalogue-wide exports where calling a model per product is too slow. The
+copy, the price and rating tiers and the marketplace -> language mapping live
+in description_templates.json.
+
+Placeholders are checked when the file is loaded and the tiers become sorted
+threshold lists picked with bisect. A description is the header and price
+line plus whichever rating, description and tier sections apply, so each
+combination of sections is joined into one format string the first time it
+is needed: rendering a product is a few lookups, two number parses and a
+single str.format call.
+"""
+
+import json
+import os
+import string
+from bisect import bisect_right
+from collections import namedtuple
+from urllib.parse import urlsplit
+
+from price_tracker import parse_amount
+from product_extract import site_domain
+
+DEFAULT_TEMPLATES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "description_templates.json")
+
+# Placeholders each template may use
+FIELDS = {
+    "header": {"name"},
+    "price": {"price"},
+    "rating": {"rating"},
+    "description": {"description"},
+    "closing": set(),
+}
+# Extractor placeholders that mean "no value"
+MISSING_RATINGS = {"Not found", "Not available"}
+MIN_DESCRIPTION_LENGTH = 20
+
+CompiledLocale = namedtuple("CompiledLocale", "default_name header price rating description price_tiers rating_tiers closing")
+
+
+def _check(template, allowed, where):
+    fields = {field for _, field, _, _ in string.Formatter().parse(template) if field is not None}
+    unknown = fields - allowed
+    if unknown:
+        raise ValueError(f"{where}: unknown placeholder(s) {', '.join(sorted(unknown))}")
+    return template
+
+
+class DescriptionTemplates:
+    """Compiled description templates for every configured locale."""
+
+    def __init__(self, data):
+        self.default_locale = data.get("default_locale", "en")
+        self.marketplace_locales = data.get("marketplace_locales", {})
+
+        # Price tiers apply below an amount, the last one to everything above
+        price_tiers = data["price_tiers"]
+        if any("below" not in tier for tier in price_tiers[:-1]) or "below" in price_tiers[-1]:
+            raise ValueError("Every price tier but the last needs 'below'; the last one must not have it")
+        self.price_limits = [float(tier["below"]) for tier in price_tiers[:-1]]
+        if self.price_limits != sorted(self.price_limits):
+            raise ValueError("Price tiers must be in increasing order")
+        price_keys = [tier["key"] for tier in price_tiers]
+
+        # Rating tiers apply from a value upwards: keep them ascending for bisect
+        rating_tiers = sorted(data.get("rating_tiers", []), key=lambda tier: tier["at_least"])
+        self.rating_limits = [float(tier["at_least"]) for tier in rating_tiers]
+        rating_keys = [tier["key"] for tier in rating_tiers]
+
+        self.locales = {}
+        for locale, copy in data["locales"].items():
+            try:
+                self.locales[locale] = CompiledLocale(
+                    default_name=copy.get("default_name", "Product"),
+                    header=_check(copy["header"], FIELDS["header"], f"{locale}.header"),
+                    price=_check(copy["price"], FIELDS["price"], f"{locale}.price"),
+                    rating=_check(copy["rating"], FIELDS["rating"], f"{locale}.rating"),
+                    description=_check(copy["description"], FIELDS["description"], f"{locale}.description"),
+                    price_tiers=tuple(_check(copy["price_tiers"][key], set(), f"{locale}.price_tiers.{key}")
+                                      for key in price_keys),
+                    rating_tiers=tuple(_check(copy["rating_tiers"][key], set(), f"{locale}.rating_tiers.{key}")
+                                       for key in rating_keys),
+                    closing=_check(copy["closing"], FIELDS["closing"], f"{locale}.closing"),
+                )
+            except KeyError as e:
+                raise ValueError(f"Locale {locale} is missing template {e}") from None
+        if self.default_locale not in self.locales:
+            raise ValueError(f"Default locale {self.default_locale} has no templates")
+
+        # (locale, sections) -> bound str.format of the joined templates
+        self._compiled = {}
+        self._host_locales = {}
+
+    @classmethod
+    def from_file(cls, path=DEFAULT_TEMPLATES_PATH):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def locale_for(self, product_data):
+        """The marketplace's language for a product, else the default locale."""
+        host = urlsplit(product_data.get('url') or "").netloc
+        locale = self._host_locales.get(host)
+        if locale is None:
+            domain = site_domain(f"https://{host}/")
+            locale = self._host_locales[host] = self.marketplace_locales.get(domain, self.default_locale)
+        return locale
+
+    def _resolve(self, locale, product_data):
+        if locale is None:
+            locale = self.default_locale
+        elif locale == "auto":
+            locale = self.locale_for(product_data)
+        if locale not in self.locales:
+            raise ValueError(f"Unknown locale: {locale}. Choose one of: {', '.join(self.locales)}")
+        return locale
+
+    def _template(self, locale, has_rating, has_description, price_tier, rating_tier):
+        """Join the sections one kind of description needs into a single format string."""
+        t = self.locales[locale]
+        parts = [t.header, t.price]
+        if has_rating:
+            parts.append(t.rating)
+        if has_description:
+            parts.append(t.description)
+        # Value proposition by price, then reassurance by rating
+        if price_tier is not None:
+            parts.append(t.price_tiers[price_tier])
+        if rating_tier is not None:
+            parts.append(t.rating_tiers[rating_tier])
+        parts.append(t.closing)
+        compiled = self._compiled[(locale, has_rating, has_description, price_tier, rating_tier)] = "".join(parts).format
+        return compiled
+
+    def render(self, product_data, locale=None):
+        """
+        Template description for one product. locale=None uses the default
+        locale, "auto" the language of the product's marketplace.
+        """
+        return self._render(self._resolve(locale, product_data), product_data)
+
+    def _render(self, locale, product_data):
+        price = product_data.get('price', 'N/A')
+        rating = product_data.get('rating')
+        desc = product_data.get('description', 'No description available')
+
+        has_rating = bool(rating) and rating not in MISSING_RATINGS
+        has_description = (len(desc) > MIN_DESCRIPTION_LENGTH and "Not found" not in desc
+                           and "No description" not in desc)
+        price_tier = rating_tier = None
+        if price and "Not found" not in price:
+            cents = parse_amount(price)
+            if cents is not None:
+                price_tier = bisect_right(self.price_limits, cents / 100)
+        if has_rating and self.rating_limits:
+            try:
+                tier = bisect_right(self.rating_limits, float(rating)) - 1
+            except ValueError:
+                tier = -1
+            if tier >= 0:
+                rating_tier = tier
+
+        render = self._compiled.get((locale, has_rating, has_description, price_tier, rating_tier))
+        if render is None:
+            render = self._template(locale, has_rating, has_description, price_tier, rating_tier)
+        return render(name=product_data.get('name', self.locales[locale].default_name), price=price,
+                      rating=rating, description=desc)
+
+    def render_many(self, products, locale=None):
+        """Template descriptions for a list of products, in order."""
+        if locale == "auto":
+            return [self._render(self._resolve(locale, product_data), product_data) for product_data in products]
+        locale = self._resolve(locale, {})
+        return [self._render(locale, product_data) for product_data in products]
+
+
+_default_templates = None
+
+
+def get_templates():
+    """Templates from description_templates.json (loaded once)."""
+    global _default_templates
+    if _default_templates is None:
+        _default_templates = DescriptionTemplates.from_file()
+    return _default_templates
+
+
+def render_description(product_data, locale=None):
+    return get_templates().render(product_data, locale)
@@ -0,0 +1,306 @@
+"""
+Batched, concurrent Hugging Face inference for enhanced descriptions.
+
+HFInferenceClient sends several product prompts per request (the Inference
+API accepts a list of inputs for summarization models), runs requests
+concurrently over a pooled session and paces them with a token bucket.
+503 "model is loading" answers are retried after the estimated load time,
+429 and other 5xx responses with jittered exponential backoff. If the API
+rejects list inputs for a model, the client falls back to one prompt per
+request.
+
+LocalSummarizer runs the same model in-process with transformers instead.
+Both return one generated text per prompt (None where generation failed) so
+the caller can fall back to the template description.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from product_batch import backoff_delay
+from product_cache import fingerprint
+
+HF_API_URL = os.getenv("HF_API_URL", "https://api-inference.huggingface.co/models")
+DEFAULT_MODEL = "facebook/bart-large-cnn"
+GENERATION_PARAMS = {"max_length": 300, "min_length": 100, "do_sample": False}
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_LOADING_WAIT = 60.0
+
+PROMPT_TEMPLATE = """You are a professional product copywriter. Rewrite the following product description to make it more compelling and persuasive, considering the price and rating (if available).
+
+Product Name: {name}
+Price: {price}
+Rating: {rating}
+Original Description: {description}
+
+Enhanced Description:"""
+
+
+def build_prompt(product_data):
+    return PROMPT_TEMPLATE.format(
+        name=product_data.get('name', 'N/A'),
+        price=product_data.get('price', 'N/A'),
+        rating=product_data.get('rating', 'N/A'),
+        description=product_data.get('description', 'N/A'),
+    )
+
+
+def clean_output(text):
+    """Strip an echoed prompt from generated text."""
+    if "You are a professional product copywriter" in text and "Enhanced Description:" in text:
+        parts = text.split("Enhanced Description:")
+        if len(parts) > 1:
+            return parts[1].strip()
+    return text
+
+
+def _output_text(item):
+    # Summarization returns {"summary_text"}, text generation {"generated_text"},
+    # and list inputs to text generation a list per input
+    if isinstance(item, list):
+        item = item[0] if item else {}
+    if not isinstance(item, dict):
+        return None
+    return item.get("summary_text") or item.get("generated_text")
+
+
+class TokenBucket:
+    """Allow `rate` acquisitions per second on average, with bursts up to `capacity`."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class InferenceError(Exception):
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+class HFInferenceClient:
+    """Hugging Face Inference API client with batching, pooling and rate limiting."""
+
+    def __init__(self, model=DEFAULT_MODEL, api_key=None, api_url=HF_API_URL, batch_size=8, workers=4,
+                 rate=5.0, retries=5, timeout=60, parameters=None):
+        self.model = model
+        self.endpoint = f"{api_url.rstrip('/')}/{model}"
+        self.batch_size = max(1, batch_size)
+        self.workers = workers
+        self.retries = retries
+        self.timeout = timeout
+        self.parameters = dict(GENERATION_PARAMS if parameters is None else parameters)
+        self.bucket = TokenBucket(rate)
+        self.batching = self.batch_size > 1
+        self.stats = {"requests": 0, "retries": 0, "loading_waits": 0}
+        self._stats_lock = threading.Lock()
+
+        self.session = requests.Session()
+        api_key = api_key if api_key is not None else os.getenv("HF_API_KEY", "")
+        if api_key:
+            self.session.headers["Authorization"] = f"Bearer {api_key}"
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(workers, 10))
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def cache_key(self, prompt):
+        return fingerprint(self.endpoint, prompt, self.parameters)
+
+    def _count(self, name):
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    def _post(self, inputs):
+        """One request for a list of prompts (or a single prompt). Returns a list of texts."""
+        payload = {"inputs": inputs if len(inputs) > 1 else inputs[0], "parameters": self.parameters,
+                   "options": {"wait_for_model": False}}
+        attempt = 0
+        while True:
+            self.bucket.acquire()
+            attempt += 1
+            self._count("requests")
+            try:
+                response = self.session.post(self.endpoint, json=payload, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error, delay = e, backoff_delay(attempt)
+            else:
+                if response.status_code == 200:
+                    result = response.json()
+                    if isinstance(result, dict):
+                        result = [result]
+                    if not isinstance(result, list) or len(result) != len(inputs):
+                        raise InferenceError(f"Unexpected response for {len(inputs)} inputs: {str(result)[:200]}")
+                    return [_output_text(item) for item in result]
+                error = InferenceError(f"{response.status_code}: {response.text[:200]}", response.status_code)
+                if response.status_code not in RETRY_STATUSES:
+                    raise error
+
+                delay = backoff_delay(attempt)
+                if response.status_code == 503:
+                    # {"error": "Model ... is currently loading", "estimated_time": 20.0}
+                    try:
+                        estimated = float(response.json().get("estimated_time", 0))
+                    except (ValueError, AttributeError):
+                        estimated = 0.0
+                    if estimated:
+                        self._count("loading_waits")
+                        delay = min(estimated, MAX_LOADING_WAIT) + delay / 10
+                retry_after = response.headers.get("Retry-After", "")
+                if retry_after.isdigit():
+                    delay = max(delay, int(retry_after))
+            if attempt > self.retries:
+                raise error
+            self._count("retries")
+            time.sleep(delay)
+
+    def _generate_batch(self, prompts):
+        if self.batching and len(prompts) > 1:
+            try:
+                return self._post(prompts)
+            except InferenceError as e:
+                if e.status not in (400, 413, 422):
+                    raise
+                # Model does not accept list inputs: send prompts one by one from now on
+                self.batching = False
+        results = []
+        for prompt in prompts:
+            try:
+                results.append(self._post([prompt])[0])
+            except (InferenceError, requests.RequestException):
+                results.append(None)
+        return results
+
+    def generate(self, prompts, cache=None, force=False, progress=None):
+        """
+        Generate text for every prompt, in order; None where generation failed.
+
+        With a ResultCache, cached prompts are answered without a request and
+        new results are stored. `progress(done, total)` is called as batches finish.
+        """
+        results = [None] * len(prompts)
+        pending = []
+        for i, prompt in enumerate(prompts):
+            cached = None if cache is None or force else cache.get(self.cache_key(prompt))
+            if cached is not None:
+                results[i] = cached
+            else:
+                pending.append(i)
+
+        done = len(prompts) - len(pending)
+        if progress and done:
+            progress(done, len(prompts))
+        size = self.batch_size if self.batching else 1
+        batches = [pending[start:start + size] for start in range(0, len(pending), size)]
+
+        def run(batch):
+            start = time.perf_counter()
+            try:
+                texts = self._generate_batch([prompts[i] for i in batch])
+            except (InferenceError, requests.RequestException):
+                texts = [None] * len(batch)
+            return batch, texts, (time.perf_counter() - start) / len(batch)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for future in as_completed([executor.submit(run, batch) for batch in batches]):
+                batch, texts, seconds = future.result()
+                for i, text in zip(batch, texts):
+                    if text is None:
+                        continue
+                    results[i] = clean_output(text)
+                    if cache is not None:
+                        cache.put(self.cache_key(prompts[i]), results[i], seconds)
+                done += len(batch)
+                if progress:
+                    progress(done, len(prompts))
+        return results
+
+
+class LocalSummarizer:
+    """The same model run in-process with transformers, batched on the local device."""
+
+    def __init__(self, model=DEFAULT_MODEL, batch_size=8, parameters=None):
+        from transformers import pipeline
+
+        self.model = model
+        self.batch_size = batch_size
+        self.parameters = dict(GENERATION_PARAMS if parameters is None else parameters)
+        self.pipeline = pipeline("summarization", model=model)
+
+    def cache_key(self, prompt):
+        return fingerprint(f"local:{self.model}", prompt, self.parameters)
+
+    def generate(self, prompts, cache=None, force=False, progress=None):
+        results = [None] * len(prompts)
+        pending = []
+        for i, prompt in enumerate(prompts):
+            cached = None if cache is None or force else cache.get(self.cache_key(prompt))
+            if cached is not None:
+                results[i] = cached
+            else:
+                pending.append(i)
+
+        done = len(prompts) - len(pending)
+        for start in range(0, len(pending), self.batch_size):
+            batch = pending[start:start + self.batch_size]
+            began = time.perf_counter()
+            try:
+                outputs = self.pipeline([prompts[i] for i in batch], batch_size=self.batch_size,
+                                        truncation=True, **self.parameters)
+            except Exception:
+                # Out of memory, bad input...: leave this batch to the template
+                outputs = [None] * len(batch)
+            seconds = (time.perf_counter() - began) / len(batch)
+            for i, output in zip(batch, outputs):
+                text = _output_text(output)
+                if text is None:
+                    continue
+                results[i] = clean_output(text)
+                if cache is not None:
+                    cache.put(self.cache_key(prompts[i]), results[i], seconds)
+            done += len(batch)
+            if progress:
+                progress(done, len(prompts))
+        return results
+
+
+def get_backend(name=None):
+    """
+    The configured inference backend: HF_BACKEND=api (default, needs
+    HF_API_KEY) or local. Returns None when no backend is usable, in which
+    case descriptions come from the template.
+    """
+    name = name or os.getenv("HF_BACKEND", "api")
+    if name == "local":
+        return LocalSummarizer(os.getenv("HF_MODEL", DEFAULT_MODEL))
+    if name != "api":
+        raise ValueError(f"Unknown inference backend: {name}. Choose api or local")
+    if not os.getenv("HF_API_KEY"):
+        return None
+    return HFInferenceClient(
+        model=os.getenv("HF_MODEL", DEFAULT_MODEL),
+        batch_size=int(os.getenv("HF_BATCH_SIZE", "8")),
+        workers=int(os.getenv("HF_WORKERS", "4")),
+        rate=float(os.getenv("HF_RATE", "5")),
+    )
@@ -0,0 +1,430 @@
+#!/usr/bin/env python3
+"""
+Price and rating history for a watchlist of Amazon products.
+
+Tracked products are re-scraped with the batch scraper (bounded concurrency,
+per-domain rate limits). Every scrape is stored as one compact observation
+row (product id, unix time, price in cents, currency, rating) clustered by
+product, and folded into a daily rollup with the min/max/last price of each
+day. Charts and drop alerts only read the rollups, so they stay fast with
+tens of thousands of tracked products and years of observations.
+
+CLI usage:
+  python price_tracker.py add https://www.amazon.com/dp/B08N5WRWNW ...
+  python price_tracker.py add --file urls.txt
+  python price_tracker.py refresh --workers 8 --rate 1
+  python price_tracker.py watch --interval 3600
+  python price_tracker.py history https://www.amazon.com/dp/B08N5WRWNW --days 30
+  python price_tracker.py alerts --drop 10 --days 30
+"""
+
+import argparse
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+
+from product_batch import BatchScraper, read_urls
+from product_cache import asin_from_url
+from product_extract import CURRENCY_SYMBOLS, site_domain
+
+DEFAULT_DB_PATH = os.getenv(
+    "PRICE_DB_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "price_history.sqlite3")
+)
+DAY = 86400
+
+# Currency of each marketplace, for prices shown without a code or symbol
+DOMAIN_CURRENCIES = {
+    "amazon.com": "USD", "amazon.co.uk": "GBP", "amazon.de": "EUR", "amazon.fr": "EUR",
+    "amazon.es": "EUR", "amazon.it": "EUR", "amazon.nl": "EUR", "amazon.ca": "CAD",
+    "amazon.au": "AUD", "amazon.in": "INR", "amazon.jp": "JPY", "amazon.cn": "CNY",
+    "amazon.sg": "SGD", "amazon.mx": "MXN", "amazon.br": "BRL", "amazon.ae": "AED",
+}
+# Longest symbols first so "C$" wins over "$"
+SYMBOL_CURRENCIES = sorted(
+    ((symbol, code) for code, symbol in CURRENCY_SYMBOLS.items() if code != "CNY"),
+    key=lambda item: -len(item[0])
+)
+# Currencies that may be shown with the plain "$" / "¥" symbol
+SHARED_SYMBOLS = {"USD": {"USD", "CAD", "AUD", "MXN", "SGD"}, "JPY": {"JPY", "CNY"}}
+# Digits and separators; a thin or no-break space only between groups of three ("1 234,56")
+AMOUNT = re.compile(r"\d(?:[\d.,]|[\u00a0\u2009\u202f](?=\d{3}(?!\d)))*")
+CURRENCY_CODE = re.compile(r"\b([A-Z]{3})\b")
+
+
+def parse_amount(text):
+    """The first amount in a price string in cents ("€1.234,56" -> 123456), or None."""
+    if not text:
+        return None
+    match = AMOUNT.search(text)
+    if not match:
+        return None
+    amount = "".join(match.group().split()).rstrip(".,")
+
+    # The last separator is the decimal point if two digits or fewer follow it
+    last = max(amount.rfind("."), amount.rfind(","))
+    if last != -1 and len(amount) - last - 1 <= 2:
+        whole, fraction = amount[:last], amount[last + 1:]
+    else:
+        whole, fraction = amount, ""
+    whole = whole.replace(".", "").replace(",", "") or "0"
+    return int(whole) * 100 + int(fraction.ljust(2, "0") or 0)
+
+
+def parse_price(text, domain=None):
+    """
+    Turn an extracted price such as "$1,299.00", "€1.234,56" or "EUR 9,99"
+    into (cents, currency). Returns (None, None) when there is no amount.
+    """
+    cents = parse_amount(text)
+    if cents is None:
+        return None, None
+
+    code = CURRENCY_CODE.search(text)
+    if code:
+        return cents, code.group(1)
+    currency = next((c for symbol, c in SYMBOL_CURRENCIES if symbol in text), None)
+    # A plain "$" on amazon.ca is Canadian dollars: let the marketplace decide
+    site_currency = DOMAIN_CURRENCIES.get(domain)
+    if currency is None or site_currency in SHARED_SYMBOLS.get(currency, ()):
+        currency = site_currency or currency
+    return cents, currency
+
+
+def parse_rating(text):
+    try:
+        rating = float(text)
+    except (TypeError, ValueError):
+        return None
+    return rating if 0 <= rating <= 5 else None
+
+
+def _connect(path):
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class PriceTracker:
+    """Watchlist, observations and daily rollups in one SQLite database."""
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = _connect(path)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS products (
+                id INTEGER PRIMARY KEY,
+                domain TEXT NOT NULL,
+                asin TEXT NOT NULL,
+                url TEXT NOT NULL,
+                name TEXT,
+                added_at INTEGER NOT NULL,
+                last_checked INTEGER,
+                UNIQUE (domain, asin)
+            );
+            CREATE INDEX IF NOT EXISTS idx_products_last_checked ON products(last_checked);
+            CREATE TABLE IF NOT EXISTS observations (
+                product_id INTEGER NOT NULL,
+                ts INTEGER NOT NULL,
+                price_cents INTEGER,
+                currency TEXT,
+                rating REAL,
+                PRIMARY KEY (product_id, ts)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_observations_ts ON observations(ts);
+            CREATE TABLE IF NOT EXISTS daily_prices (
+                product_id INTEGER NOT NULL,
+                day INTEGER NOT NULL,
+                min_cents INTEGER NOT NULL,
+                max_cents INTEGER NOT NULL,
+                last_cents INTEGER NOT NULL,
+                last_ts INTEGER NOT NULL,
+                currency TEXT,
+                rating REAL,
+                samples INTEGER NOT NULL,
+                PRIMARY KEY (product_id, day)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_daily_prices_day ON daily_prices(day);
+        """)
+        self._conn.commit()
+
+    # -- watchlist ---------------------------------------------------------
+
+    def add(self, url, name=None):
+        """Track a product URL. Returns its product id, or None if it has no ASIN."""
+        domain = site_domain(url)
+        asin = asin_from_url(url)
+        if domain is None or asin is None:
+            return None
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO products (domain, asin, url, name, added_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (domain, asin) DO UPDATE SET name = COALESCE(excluded.name, name)",
+                (domain, asin, url, name, int(time.time()))
+            )
+            self._conn.commit()
+            return self._conn.execute(
+                "SELECT id FROM products WHERE domain = ? AND asin = ?", (domain, asin)
+            ).fetchone()[0]
+
+    def remove(self, product_id):
+        with self._lock:
+            for table, column in (("observations", "product_id"), ("daily_prices", "product_id"), ("products", "id")):
+                self._conn.execute(f"DELETE FROM {table} WHERE {column} = ?", (product_id,))
+            self._conn.commit()
+
+    def product_id(self, url):
+        """The id of a tracked product URL, or None."""
+        domain, asin = site_domain(url), asin_from_url(url)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id FROM products WHERE domain = ? AND asin = ?", (domain, asin)
+            ).fetchone()
+        return row[0] if row else None
+
+    def products(self):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, domain, asin, url, name, last_checked FROM products ORDER BY id"
+            ).fetchall()
+        return [dict(zip(("id", "domain", "asin", "url", "name", "last_checked"), row)) for row in rows]
+
+    def due(self, max_age):
+        """Products not checked within max_age seconds, oldest first."""
+        cutoff = int(time.time() - max_age)
+        with self._lock:
+            return self._conn.execute(
+                "SELECT id, url FROM products WHERE last_checked IS NULL OR last_checked < ? "
+                "ORDER BY last_checked IS NOT NULL, last_checked",
+                (cutoff,)
+            ).fetchall()
+
+    # -- observations ------------------------------------------------------
+
+    def record_many(self, observations):
+        """
+        Store (product_id, ts, price_cents, currency, rating) tuples and fold
+        them into the daily rollups, all in one transaction. An observation
+        at the same product and second as a stored one replaces it, and that
+        day's rollup is recomputed from its observations.
+        """
+        with self._lock:
+            added = []
+            replaced = set()
+            for observation in observations:
+                product_id, ts, cents, currency, rating = observation
+                inserted = self._conn.execute(
+                    "INSERT OR IGNORE INTO observations (product_id, ts, price_cents, currency, rating) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    observation
+                ).rowcount
+                if inserted:
+                    added.append(observation)
+                else:
+                    self._conn.execute(
+                        "UPDATE observations SET price_cents = ?, currency = ?, rating = ? "
+                        "WHERE product_id = ? AND ts = ?",
+                        (cents, currency, rating, product_id, ts)
+                    )
+                    replaced.add((product_id, ts // DAY))
+            self._conn.executemany(
+                "INSERT INTO daily_prices "
+                "(product_id, day, min_cents, max_cents, last_cents, last_ts, currency, rating, samples) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, 1) "
+                "ON CONFLICT (product_id, day) DO UPDATE SET "
+                "min_cents = MIN(min_cents, excluded.min_cents), "
+                "max_cents = MAX(max_cents, excluded.max_cents), "
+                "last_cents = CASE WHEN excluded.last_ts >= last_ts THEN excluded.last_cents ELSE last_cents END, "
+                "rating = CASE WHEN excluded.last_ts >= last_ts THEN COALESCE(excluded.rating, rating) ELSE rating END, "
+                "last_ts = MAX(last_ts, excluded.last_ts), "
+                "samples = samples + 1",
+                [(product_id, ts // DAY, cents, cents, cents, ts, currency, rating)
+                 for product_id, ts, cents, currency, rating in added if cents is not None]
+            )
+            for product_id, day in replaced:
+                self._rebuild_day(product_id, day)
+            self._conn.executemany(
+                "UPDATE products SET last_checked = MAX(COALESCE(last_checked, 0), ?) WHERE id = ?",
+                [(ts, product_id) for product_id, ts, _, _, _ in observations]
+            )
+            self._conn.commit()
+
+    def _rebuild_day(self, product_id, day):
+        # The rollup of one day from scratch, after an observation was overwritten
+        self._conn.execute("DELETE FROM daily_prices WHERE product_id = ? AND day = ?", (product_id, day))
+        priced = "FROM observations WHERE product_id = :id AND ts >= :start AND ts < :end AND price_cents IS NOT NULL"
+        self._conn.execute(
+            "INSERT INTO daily_prices "
+            "(product_id, day, min_cents, max_cents, last_cents, last_ts, currency, rating, samples) "
+            f"SELECT :id, :day, MIN(price_cents), MAX(price_cents), "
+            f"(SELECT price_cents {priced} ORDER BY ts DESC LIMIT 1), MAX(ts), "
+            f"(SELECT currency {priced} ORDER BY ts LIMIT 1), "
+            f"(SELECT rating {priced} AND rating IS NOT NULL ORDER BY ts DESC LIMIT 1), COUNT(*) "
+            f"{priced} HAVING COUNT(*) > 0",
+            {"id": product_id, "day": day, "start": day * DAY, "end": (day + 1) * DAY}
+        )
+
+    def record(self, product_id, product_data, ts=None):
+        """Store the price and rating from an extracted product_data dict."""
+        ts = int(ts if ts is not None else time.time())
+        cents, currency = parse_price(product_data.get("price"), site_domain(product_data.get("url", "")))
+        self.record_many([(product_id, ts, cents, currency, parse_rating(product_data.get("rating")))])
+        if product_data.get("name") and product_data["name"] != "Not found":
+            with self._lock:
+                self._conn.execute("UPDATE products SET name = ? WHERE id = ?", (product_data["name"], product_id))
+                self._conn.commit()
+
+    def refresh(self, max_age=0, workers=8, rate=1.0, proxies=None, progress=None):
+        """
+        Re-scrape every product not checked within max_age seconds.
+        Returns (scraped, failed). `progress(done, total)` is called as pages finish.
+        """
+        due = self.due(max_age)
+        if not due:
+            return 0, 0
+        scraper = BatchScraper(workers=workers, rate=rate, proxies=proxies)
+        failed = 0
+        batch = []
+        for done, (index, product_data) in enumerate(scraper.scrape_many([url for _, url in due]), start=1):
+            product_id = due[index][0]
+            if "error" in product_data:
+                failed += 1
+            else:
+                ts = int(time.time())
+                cents, currency = parse_price(product_data.get("price"), site_domain(product_data["url"]))
+                batch.append((product_id, ts, cents, currency, parse_rating(product_data.get("rating"))))
+            # Write in groups so a long refresh is not one huge transaction
+            if len(batch) >= 100:
+                self.record_many(batch)
+                batch = []
+            if progress:
+                progress(done, len(due))
+        if batch:
+            self.record_many(batch)
+        return len(due), failed
+
+    # -- charts and alerts (rollups only) ----------------------------------
+
+    def history(self, product_id, days=90):
+        """Daily min/max/last prices for a product over the last `days` days, oldest first."""
+        first_day = int(time.time()) // DAY - days
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT day, min_cents, max_cents, last_cents, currency, rating FROM daily_prices "
+                "WHERE product_id = ? AND day > ? ORDER BY day",
+                (product_id, first_day)
+            ).fetchall()
+        return [
+            {
+                "date": time.strftime("%Y-%m-%d", time.gmtime(day * DAY)),
+                "min": min_cents / 100, "max": max_cents / 100, "last": last_cents / 100,
+                "currency": currency, "rating": rating,
+            }
+            for day, min_cents, max_cents, last_cents, currency, rating in rows
+        ]
+
+    def alerts(self, drop=0.1, days=30, today=None):
+        """
+        Products whose lowest price today is at least `drop` (a fraction)
+        below their highest daily price over the previous `days` days.
+        """
+        today = int(today if today is not None else time.time()) // DAY
+        # Start from today's rollups; each peak is a short primary-key range scan
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM ("
+                "  SELECT p.id, p.domain, p.asin, p.name, p.url, d.min_cents, "
+                "    (SELECT MAX(r.max_cents) FROM daily_prices r "
+                "     WHERE r.product_id = d.product_id AND r.day >= ? AND r.day < ?) AS peak_cents, d.currency "
+                "  FROM daily_prices d JOIN products p ON p.id = d.product_id "
+                "  WHERE d.day = ?"
+                ") WHERE peak_cents > 0 AND min_cents <= peak_cents * (1 - ?) "
+                "ORDER BY 1.0 * min_cents / peak_cents",
+                (today - days, today, today, drop)
+            ).fetchall()
+        return [
+            {
+                "id": product_id, "domain": domain, "asin": asin, "name": name, "url": url,
+                "price": cents / 100, "previous_high": peak / 100, "currency": currency,
+                "drop": 1 - cents / peak,
+            }
+            for product_id, domain, asin, name, url, cents, peak, currency in rows
+        ]
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM products").fetchone()[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Track Amazon price and rating history")
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help='SQLite database path')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    add = sub.add_parser('add', help='Add product URLs to the watchlist')
+    add.add_argument('urls', nargs='*')
+    add.add_argument('--file', help='File with one product URL per line (text or CSV)')
+
+    for name, help_text in (('refresh', 'Re-scrape products once'), ('watch', 'Re-scrape products forever')):
+        command = sub.add_parser(name, help=help_text)
+        command.add_argument('--workers', '-w', type=int, default=8, help='Concurrent downloads (default: 8)')
+        command.add_argument('--rate', type=float, default=1.0, help='Requests per second per Amazon domain (default: 1)')
+        command.add_argument('--max-age', type=float, default=0 if name == 'refresh' else 3600,
+                             help='Skip products checked within this many seconds')
+        command.add_argument('--proxy', help='HTTP(S) proxy URL')
+        if name == 'watch':
+            command.add_argument('--interval', type=float, default=3600, help='Seconds between rounds (default: 3600)')
+
+    history = sub.add_parser('history', help='Show daily prices for a product')
+    history.add_argument('url')
+    history.add_argument('--days', type=int, default=90)
+
+    alerts = sub.add_parser('alerts', help='List products whose price dropped today')
+    alerts.add_argument('--drop', type=float, default=10, help='Minimum drop in percent (default: 10)')
+    alerts.add_argument('--days', type=int, default=30, help='Compare with the high of this many days (default: 30)')
+
+    args = parser.parse_args()
+    tracker = PriceTracker(args.db)
+
+    if args.command == 'add':
+        urls = list(args.urls)
+        if args.file:
+            with open(args.file, 'r', encoding='utf-8') as f:
+                urls += read_urls(f)
+        added = [url for url in urls if tracker.add(url) is not None]
+        for url in set(urls) - set(added):
+            print(f"Skipped (not an Amazon product URL): {url}", file=sys.stderr)
+        print(f"{len(added)} products added, {len(tracker)} tracked")
+
+    elif args.command in ('refresh', 'watch'):
+        proxies = {"http": args.proxy, "https": args.proxy} if args.proxy else None
+        while True:
+            start = time.perf_counter()
+            scraped, failed = tracker.refresh(args.max_age, args.workers, args.rate, proxies)
+            print(f"{scraped} products scraped ({failed} failed) in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+            if args.command == 'refresh':
+                break
+            time.sleep(args.interval)
+
+    elif args.command == 'history':
+        product_id = tracker.product_id(args.url)
+        if product_id is None:
+            print("Product is not tracked", file=sys.stderr)
+            sys.exit(1)
+        for row in tracker.history(product_id, args.days):
+            print(f"{row['date']}  min {row['min']:>10.2f}  max {row['max']:>10.2f}  "
+                  f"last {row['last']:>10.2f} {row['currency'] or ''}  rating {row['rating'] or '-'}")
+
+    elif args.command == 'alerts':
+        for alert in tracker.alerts(args.drop / 100, args.days):
+            print(f"-{alert['drop']:.0%}  {alert['price']:.2f} {alert['currency'] or ''} "
+                  f"(was {alert['previous_high']:.2f})  {alert['name'] or alert['asin']}  {alert['url']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Concurrent batch scraping of Amazon product pages.
+
+URLs are scraped by a thread pool sharing one pooled requests session. Each
+Amazon domain gets its own rate limit so a batch spread over amazon.com,
+amazon.de, ... runs in parallel without hammering any single site. Failed
+requests (connection errors, 429 and 5xx) are retried with jittered
+exponential backoff, and results are yielded as they finish.
+
+CLI usage:
+  python product_batch.py urls.txt --output products.csv --workers 16 --rate 1
+"""
+
+import argparse
+import csv
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from product_extract import HEADERS, parse_product_page, site_domain
+
+CSV_FIELDS = ["url", "name", "price", "rating", "description", "error", "attempts", "seconds"]
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class DomainRateLimiter:
+    """Allow at most `rate` requests per second to each domain."""
+
+    def __init__(self, rate=1.0):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    def wait(self, domain):
+        # Reserve the next free slot for this domain, then sleep until it arrives
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(domain, now))
+            self._next_slot[domain] = slot + self.interval
+        delay = slot - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def defer(self, domain, seconds):
+        """Push back every request to a domain, e.g. after a 429 Retry-After."""
+        with self._lock:
+            self._next_slot[domain] = max(self._next_slot.get(domain, 0.0), time.monotonic() + seconds)
+
+
+def backoff_delay(attempt, base=0.5, cap=30.0):
+    """Full-jitter exponential backoff: uniform in [0, min(cap, base * 2**attempt)]."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class BatchScraper:
+    """Scrape many product URLs concurrently with a pooled session."""
+
+    def __init__(self, workers=8, rate=1.0, retries=3, timeout=15, proxies=None, parser=None):
+        self.workers = workers
+        self.parser = parser
+        self.retries = retries
+        self.timeout = timeout
+        self.limiter = DomainRateLimiter(rate)
+
+        self.session = requests.Session()
+        self.session.headers.update(HEADERS)
+        adapter = HTTPAdapter(pool_connections=32, pool_maxsize=max(workers, 10))
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        if proxies:
+            self.session.proxies.update(proxies)
+
+    def fetch(self, url, domain):
+        """Download a page, retrying transient failures. Returns (content, attempts)."""
+        attempt = 0
+        while True:
+            self.limiter.wait(domain)
+            attempt += 1
+            try:
+                response = self.session.get(url, timeout=self.timeout)
+                if response.status_code not in RETRY_STATUSES:
+                    response.raise_for_status()
+                    return response.content, attempt
+                retry_after = response.headers.get("Retry-After", "")
+                if retry_after.isdigit():
+                    self.limiter.defer(domain, int(retry_after))
+                error = requests.HTTPError(f"{response.status_code} Server Error for url: {url}")
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+            if attempt > self.retries:
+                raise error
+            time.sleep(backoff_delay(attempt))
+
+    def scrape(self, url):
+        """Scrape one URL into a product_data dict (with "error" on failure)."""
+        start = time.perf_counter()
+        attempts = 0
+        domain = site_domain(url)
+        if domain is None:
+            product_data = {"url": url, "error": "Unsupported site. Please use one of the supported Amazon sites."}
+        else:
+            try:
+                content, attempts = self.fetch(url, domain)
+                product_data = parse_product_page(url, content, domain, self.parser)
+            except Exception as e:
+                product_data = {"url": url, "error": f"Error extracting product info: {str(e)}"}
+        product_data["attempts"] = attempts
+        product_data["seconds"] = round(time.perf_counter() - start, 3)
+        return product_data
+
+    def scrape_many(self, urls):
+        """Yield (index, product_data) for each URL as soon as it finishes."""
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {executor.submit(self.scrape, url): i for i, url in enumerate(urls)}
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+
+
+def read_urls(lines):
+    """Product URLs from text or CSV lines: the first http(s) field on each line."""
+    urls = []
+    for line in lines:
+        for field in line.replace(",", " ").split():
+            if field.startswith(("http://", "https://")):
+                urls.append(field)
+                break
+    return urls
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scrape many Amazon product pages concurrently")
+    parser.add_argument('urls', help='File with one product URL per line (text or CSV)')
+    parser.add_argument('--output', '-o', help='CSV output path (default: stdout)')
+    parser.add_argument('--workers', '-w', type=int, default=8, help='Concurrent downloads (default: 8)')
+    parser.add_argument('--rate', type=float, default=1.0, help='Requests per second per Amazon domain (default: 1)')
+    parser.add_argument('--retries', type=int, default=3, help='Retries per URL for transient errors (default: 3)')
+    parser.add_argument('--proxy', help='HTTP(S) proxy URL')
+    parser.add_argument('--parser', choices=['auto', 'selectolax', 'lxml', 'bs4'], default='auto',
+                        help='HTML parser backend (default: fastest installed)')
+    parser.add_argument('--describe', nargs='?', const='auto', metavar='LOCALE',
+                        help='Add a template enhanced_description column (default language: the marketplace\'s)')
+    args = parser.parse_args()
+
+    with open(args.urls, 'r', encoding='utf-8') as f:
+        urls = read_urls(f)
+
+    proxies = {"http": args.proxy, "https": args.proxy} if args.proxy else None
+    scraper = BatchScraper(workers=args.workers, rate=args.rate, retries=args.retries, proxies=proxies,
+                           parser=args.parser)
+
+    fields = CSV_FIELDS
+    if args.describe:
+        # Imported here: description_templates depends on this module through price_tracker
+        from description_templates import get_templates
+        templates = get_templates()
+        if args.describe != 'auto' and args.describe not in templates.locales:
+            parser.error(f"--describe: choose auto or one of {', '.join(templates.locales)}")
+        fields = CSV_FIELDS + ["enhanced_description"]
+
+    output = open(args.output, 'w', newline='', encoding='utf-8') if args.output else sys.stdout
+    writer = csv.DictWriter(output, fieldnames=fields, extrasaction='ignore')
+    writer.writeheader()
+    start = time.perf_counter()
+    failed = 0
+    try:
+        for _, product_data in scraper.scrape_many(urls):
+            failed += "error" in product_data
+            if args.describe and "error" not in product_data:
+                product_data["enhanced_description"] = templates.render(product_data, args.describe)
+            writer.writerow(product_data)
+            output.flush()
+    finally:
+        if args.output:
+            output.close()
+    elapsed = time.perf_counter() - start
+    print(f"{len(urls)} URLs ({failed} failed) in {elapsed:.1f}s: {len(urls) / elapsed:.1f} pages/s", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
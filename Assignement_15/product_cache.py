@@ -0,0 +1,300 @@
+"""
+Persistent caches for the Amazon Product Description Enhancer.
+
+Two levels, both in one SQLite database shared by every Streamlit session:
+
+  pages         raw product page HTML keyed by marketplace + ASIN, so
+                tracking parameters and URL variants (/dp/, /gp/product/,
+                ...) reuse the same download until it is older than the TTL
+  products      parsed product_data keyed by a hash of the page content and
+                of the parser version (extraction code, backend, cleanup
+                rules), so changing any of them parses pages again
+  descriptions  enhanced descriptions keyed by a hash of the model request
+
+Parsed data and descriptions go through ResultCache, an in-memory LRU in
+front of a table. Raw pages are zlib-compressed on disk and never held in
+memory. Every cache counts hits and misses and how much time hits saved.
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import requests
+
+from product_extract import HEADERS, parse_product_page, parser_version, site_domain
+
+DEFAULT_CACHE_PATH = os.getenv(
+    "PRODUCT_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "product_cache.sqlite3")
+)
+PAGE_TTL = 6 * 3600
+
+# Query parameters that only track the visit (referrer, affiliate, search position)
+TRACKING_PARAMS = {"ref", "ref_", "tag", "qid", "sr", "crid", "sprefix", "linkCode", "linkId", "camp",
+                   "creative", "creativeASIN", "ascsubtag", "content-id", "_encoding", "dib", "dib_tag"}
+TRACKING_PREFIXES = ("utm_", "pd_rd_", "pf_rd_")
+
+# /dp/ASIN, /gp/product/ASIN, /gp/aw/d/ASIN, /exec/obidos/ASIN/ASIN, /o/ASIN/ASIN ...
+ASIN_PATH = re.compile(r"/(?:dp|gp/product|gp/aw/d|exec/obidos/asin|o/asin|product)/([A-Z0-9]{10})(?:[/?]|$)", re.I)
+
+
+def asin_from_url(url):
+    """The product's ASIN from an Amazon URL, or None."""
+    match = ASIN_PATH.search(urlsplit(url.strip()).path + "/")
+    return match.group(1).upper() if match else None
+
+
+def page_key(url):
+    """Cache key for a product page: marketplace and ASIN, else path and meaningful query."""
+    domain = site_domain(url) or urlsplit(url).netloc.lower()
+    asin = asin_from_url(url)
+    if asin:
+        return f"{domain}/{asin}"
+    parts = urlsplit(url.strip())
+    # Search and listing pages depend on their query (/s?k=...): keep it, minus tracking, sorted
+    query = urlencode(sorted(
+        (name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if name not in TRACKING_PARAMS and not name.startswith(TRACKING_PREFIXES)
+    ))
+    return f"{domain}{parts.path.rstrip('/')}" + (f"?{query}" if query else "")
+
+
+def fingerprint(*parts):
+    """Stable SHA-256 over JSON-serializable parts, e.g. (model, params, content)."""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def content_key(content, version=""):
+    return hashlib.sha256(version.encode("utf-8") + b"\0" + content).hexdigest()
+
+
+def _connect(path):
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    return conn
+
+
+class CacheStats:
+    """Hit/miss counters for one cache, shared by every session in the process."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.saved_seconds = 0.0
+
+    @property
+    def lookups(self):
+        return self.hits + self.misses
+
+    @property
+    def hit_rate(self):
+        return self.hits / self.lookups if self.lookups else 0.0
+
+
+class PageCache:
+    """Compressed raw HTML per product with a TTL and LRU eviction by size."""
+
+    def __init__(self, path, ttl=PAGE_TTL, max_bytes=200 * 1024 * 1024):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+        self._conn = _connect(path)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS pages (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                html BLOB NOT NULL,
+                fetched_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                fetch_seconds REAL NOT NULL,
+                size INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_pages_last_access ON pages(last_access);
+        """)
+        self._conn.commit()
+
+    def get(self, url):
+        """Return the cached page body for a URL if it is fresh, else None."""
+        key = page_key(url)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT html, fetched_at, fetch_seconds FROM pages WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or time.time() - row[1] >= self.ttl:
+                self.stats.misses += 1
+                return None
+            self._conn.execute("UPDATE pages SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            self.stats.hits += 1
+            self.stats.saved_seconds += row[2]
+        return zlib.decompress(row[0])
+
+    def put(self, url, content, fetch_seconds=0.0):
+        """Store a downloaded page and evict old entries if over budget."""
+        now = time.time()
+        blob = zlib.compress(content, 6)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages "
+                "(key, url, html, fetched_at, last_access, fetch_seconds, size) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (page_key(url), url, blob, now, now, fetch_seconds, len(blob))
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        # Drop least recently used pages until the table fits in max_bytes
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute("SELECT key, size FROM pages ORDER BY last_access").fetchall()
+        doomed = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            doomed.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM pages WHERE key = ?", doomed)
+        self.stats.evictions += len(doomed)
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+
+
+class ResultCache:
+    """
+    Bounded in-memory LRU backed by a SQLite table.
+
+    Values must be JSON-serializable. Entries never expire: they are keyed by
+    a hash of everything they were computed from.
+    """
+
+    def __init__(self, path, table, max_items=256, max_rows=10000):
+        if not table.isidentifier():
+            raise ValueError(f"Invalid table name: {table}")
+        self.table = table
+        self.max_items = max_items
+        self.max_rows = max_rows
+        self.stats = CacheStats()
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = _connect(path)
+        self._conn.executescript(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                last_access REAL NOT NULL,
+                compute_seconds REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_{table}_last_access ON {table}(last_access);
+        """)
+        self._conn.commit()
+
+    def _remember(self, key, entry):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_items:
+            self._memory.popitem(last=False)
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss."""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+            else:
+                row = self._conn.execute(
+                    f"SELECT value, compute_seconds FROM {self.table} WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    entry = (json.loads(row[0]), row[1])
+                    self._remember(key, entry)
+                    self._conn.execute(f"UPDATE {self.table} SET last_access = ? WHERE key = ?", (time.time(), key))
+                    self._conn.commit()
+
+            if entry is None:
+                self.stats.misses += 1
+                return None
+            self.stats.hits += 1
+            self.stats.saved_seconds += entry[1]
+            return entry[0]
+
+    def put(self, key, value, compute_seconds=0.0):
+        """Store a value in memory and on disk."""
+        with self._lock:
+            self._remember(key, (value, compute_seconds))
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, last_access, compute_seconds) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), time.time(), compute_seconds)
+            )
+            excess = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0] - self.max_rows
+            if excess > 0:
+                self._conn.execute(
+                    f"DELETE FROM {self.table} WHERE key IN "
+                    f"(SELECT key FROM {self.table} ORDER BY last_access LIMIT ?)",
+                    (excess,)
+                )
+                self.stats.evictions += excess
+            self._conn.commit()
+
+    def get_or_compute(self, key, compute, force=False):
+        """Return the cached value for key, computing and storing it on a miss (or when forced)."""
+        value = None if force else self.get(key)
+        if value is not None:
+            return value
+        start = time.perf_counter()
+        value = compute()
+        self.put(key, value, time.perf_counter() - start)
+        return value
+
+
+class ProductCache:
+    """Page, product and description caches sharing one database."""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, page_ttl=PAGE_TTL):
+        self.pages = PageCache(path, ttl=page_ttl)
+        self.products = ResultCache(path, "products")
+        self.descriptions = ResultCache(path, "descriptions")
+        self.parser_version = parser_version()
+
+    def extract_product_info(self, url, session=None, force=False):
+        """
+        Cached version of product_extract.extract_product_info.
+
+        force=True downloads and parses the page again and overwrites the
+        cached entries.
+        """
+        try:
+            domain = site_domain(url)
+            if domain is None:
+                return {"error": f"Unsupported site: {urlsplit(url).netloc.lower()}. Please use one of the supported Amazon sites."}
+
+            content = None if force else self.pages.get(url)
+            if content is None:
+                http = session or requests
+                start = time.perf_counter()
+                response = http.get(url, headers=HEADERS, timeout=15)
+                response.raise_for_status()
+                content = response.content
+                self.pages.put(url, content, time.perf_counter() - start)
+
+            product_data = self.products.get_or_compute(
+                content_key(content, self.parser_version), lambda: parse_product_page(url, content, domain), force=force
+            )
+            # The same page can be reached through several URLs
+            return dict(product_data, url=url)
+
+        except Exception as e:
+            return {"error": f"Error extracting product info: {str(e)}"}
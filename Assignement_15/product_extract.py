@@ -0,0 +1,326 @@
+"""
+Amazon product page scraping and extraction.
+
+Shared by the Streamlit app (assignement_15.py) and the batch scraper, so the
+extraction logic can be used without starting the UI. Pages are parsed with
+the fastest installed backend from product_parsers.
+"""
+
+import hashlib
+import json
+import os
+import re
+from urllib.parse import urlparse
+
+import requests
+
+from product_parsers import SoupPage, get_parser
+from text_cleanup import DEFAULT_RULES_PATH, clean_text
+
+# Supported sites - Only Amazon
+SUPPORTED_SITES = [
+    "amazon.com", "amazon.co.uk", "amazon.de", "amazon.fr", "amazon.es", "amazon.it",
+    "amazon.ca", "amazon.au", "amazon.in", "amazon.jp", "amazon.cn", "amazon.nl",
+    "amazon.sg", "amazon.mx", "amazon.br", "amazon.ae"
+]
+
+# Map currency codes to symbols
+CURRENCY_SYMBOLS = {
+    'USD': '$', 'EUR': '€', 'GBP': '£', 'JPY': '¥',
+    'CAD': 'C$', 'AUD': 'A$', 'INR': '₹', 'CNY': '¥',
+    'MXN': 'Mex$', 'BRL': 'R$', 'SGD': 'S$'
+}
+
+# One pattern finds every field name of interest in a script body; the value
+# after the colon is then matched in place with the field's own pattern
+SCRIPT_KEY = re.compile(r'"(price|currencyCode|ratingValue|description)"\s*:\s*')
+SCRIPT_VALUES = {
+    'price': re.compile(r'["\']?([\d.,]+)'),
+    'currencyCode': re.compile(r'["\']?([A-Z]{3})'),
+    'ratingValue': re.compile(r'["\']?([\d.]+)'),
+    'description': re.compile(r'["\']([^"\']+)["\']'),
+}
+SCRIPT_FIELDS = ('price', 'ratingValue', 'description')
+
+# Parser backend for product pages: auto, selectolax, lxml or bs4
+PRODUCT_PARSER = os.getenv("PRODUCT_PARSER", "auto")
+# Bump when a change here or in product_parsers alters what parse_product_page returns
+PARSER_VERSION = 1
+
+# Title lookups, tried in order
+TITLE_SELECTORS = [
+    'span#productTitle',
+    'h1[data-testid="product-title"]',
+    'h1.a-size-large',
+    'h1.a-spacing-small',
+    'h1.a-spacing-none',
+]
+
+# Set headers to mimic a browser
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+    'Accept-Encoding': 'gzip, deflate',
+    'DNT': '1',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1',
+}
+
+
+def site_domain(url):
+    """Return the URL's host without www, or None if it is not a supported Amazon site."""
+    domain = urlparse(url).netloc.lower()
+
+    # Remove www if present
+    if domain.startswith('www.'):
+        domain = domain[4:]
+
+    # Check if site is supported
+    if not any(supported in domain for supported in SUPPORTED_SITES):
+        return None
+    return domain
+
+
+def parse_product_page(url, content, domain=None, parser=None):
+    """Extract product data from a downloaded page."""
+    page = get_parser(parser or PRODUCT_PARSER)(content)
+
+    # Initialize product data with the URL
+    product_data = {
+        "url": url,
+        "name": "",
+        "description": "",
+        "price": "",
+        "rating": ""
+    }
+
+    # Extract product information
+    product_data.update(extract_amazon(page, domain or site_domain(url)))
+
+    return product_data
+
+
+def parser_version(parser=None):
+    """Identifies the code and cleanup rules behind parse_product_page, for the product cache."""
+    with open(DEFAULT_RULES_PATH, 'rb') as f:
+        rules = hashlib.sha256(f.read()).hexdigest()[:16]
+    return f"{PARSER_VERSION}:{get_parser(parser or PRODUCT_PARSER).__name__}:rules={rules}"
+
+
+# Function to extract product info from URL
+def extract_product_info(url, session=None):
+    try:
+        domain = site_domain(url)
+        if domain is None:
+            return {"error": f"Unsupported site: {urlparse(url).netloc.lower()}. Please use one of the supported Amazon sites."}
+
+        # Get the page content
+        http = session or requests
+        response = http.get(url, headers=HEADERS, timeout=15)
+        response.raise_for_status()
+
+        return parse_product_page(url, response.content, domain)
+
+    except Exception as e:
+        return {"error": f"Error extracting product info: {str(e)}"}
+
+def scan_scripts(script_texts):
+    """
+    Find price, currency, rating and description in a single pass over scripts.
+
+    Gives the same answers as searching every script once per field: each
+    field comes from the first script that contains it, and the currency is
+    taken from the same script as the price.
+    """
+    found = {}
+    for text in script_texts:
+        wanted = {field for field in SCRIPT_FIELDS if field not in found}
+        if not wanted:
+            break
+        if 'price' in wanted:
+            wanted.add('currencyCode')
+
+        values = {}
+        for match in SCRIPT_KEY.finditer(text):
+            field = match.group(1)
+            if field not in wanted or field in values:
+                continue
+            value = SCRIPT_VALUES[field].match(text, match.end())
+            if value:
+                values[field] = value.group(1)
+                if len(values) == len(wanted):
+                    break
+
+        if 'price' in values:
+            found['price'] = values['price']
+            found['currencyCode'] = values.get('currencyCode')
+        for field in ('ratingValue', 'description'):
+            if field in values:
+                found[field] = values[field]
+    return found
+
+
+def parse_json_ld(json_texts):
+    """Price, currency, rating and description from schema.org JSON-LD blocks."""
+    found = {}
+    pending = []
+    for text in json_texts:
+        try:
+            pending.append(json.loads(text))
+        except ValueError:
+            continue
+
+    while pending:
+        item = pending.pop(0)
+        if isinstance(item, list):
+            pending.extend(item)
+            continue
+        if not isinstance(item, dict):
+            continue
+        pending.extend(item.get('@graph', []))
+
+        offers = item.get('offers')
+        if isinstance(offers, list) and offers:
+            offers = offers[0]
+        if isinstance(offers, dict) and 'price' not in found and offers.get('price') is not None:
+            found['price'] = str(offers['price'])
+            found['currencyCode'] = offers.get('priceCurrency')
+
+        rating = item.get('aggregateRating')
+        if isinstance(rating, dict) and 'ratingValue' not in found and rating.get('ratingValue') is not None:
+            found['ratingValue'] = str(rating['ratingValue'])
+
+        if 'description' not in found and isinstance(item.get('description'), str) and item['description'].strip():
+            found['description'] = item['description'].strip()[:500]
+    return found
+
+
+def format_price(value, currency_code):
+    if currency_code:
+        return f"{CURRENCY_SYMBOLS.get(currency_code, currency_code)}{value}"
+    return value
+
+
+# Amazon-specific extraction function
+def extract_amazon(page, domain):
+    """Extract name, price, rating and description from a parsed page (or BeautifulSoup)."""
+    if not hasattr(page, 'first'):
+        page = SoupPage(page)
+    data = {}
+
+    # Product name - Try multiple selectors
+    title_elem = None
+    for selector in TITLE_SELECTORS:
+        title_elem = page.first(selector)
+        if title_elem is not None:
+            break
+    data['name'] = page.text(title_elem) if title_elem is not None else "Not found"
+
+    # Walk the script tags once: inline JavaScript is scanned for JSON-ish
+    # fields, JSON-LD blocks are parsed properly and only fill the gaps
+    script_texts = []
+    json_ld_texts = []
+    for script_type, text in page.scripts():
+        if script_type == 'text/javascript':
+            script_texts.append(text)
+        elif script_type == 'application/ld+json':
+            json_ld_texts.append(text)
+    scripted = scan_scripts(script_texts)
+    structured = parse_json_ld(json_ld_texts) if json_ld_texts else {}
+
+    # PRICE EXTRACTION - Look in script tags for JSON data first
+    price = "Not found"
+    for source in (scripted, structured):
+        if 'price' in source:
+            price = format_price(source['price'], source.get('currencyCode'))
+            break
+
+    # If not found in scripts, try visible HTML elements
+    if price == "Not found":
+        # Look for price in structured data
+        price_elem = page.first('span.a-offscreen')
+        if price_elem is not None:
+            price_text = page.text(price_elem)
+            # Extract currency and amount
+            currency_match = re.search(r'[^\d.,\s]', price_text)
+            amount_match = re.search(r'[\d.,]+', price_text)
+
+            currency = currency_match.group() if currency_match else ''
+            amount = amount_match.group() if amount_match else price_text
+
+            price = f"{currency}{amount}"
+
+    # If still not found, try other elements
+    if price == "Not found":
+        price_selectors = [
+            'span.a-price-whole',
+            'span.apexPriceToPay',
+            'span[data-cy="price-recipe"]',
+            'span.a-price',
+            'span.priceBlockBuyingPriceString'
+        ]
+        for selector in price_selectors:
+            price_elem = page.first(selector)
+            if price_elem is not None:
+                price = page.text(price_elem)
+                break
+
+    data['price'] = price
+
+    # RATING EXTRACTION - Look in script tags for JSON data first
+    rating = scripted.get('ratingValue') or structured.get('ratingValue') or "Not found"
+
+    # If not found in scripts, try visible HTML elements
+    if rating == "Not found":
+        rating_elem = page.first('span.a-icon-alt')
+        if rating_elem is not None:
+            rating_text = page.text(rating_elem, strip=False)
+            rating_match = re.search(r'(\d+\.?\d*)', rating_text)
+            rating = rating_match.group(1) if rating_match else "Not found"
+
+    data['rating'] = rating
+
+    # DESCRIPTION EXTRACTION - Look for product description in script tags first
+    description = "No description available"
+
+    # Try to find description in script data
+    description = scripted.get('description') or structured.get('description') or description
+
+    # If not found in scripts, try visible HTML elements
+    if description == "No description available":
+        # Look for the main product description
+        desc_elem = page.first('div#productDescription')
+        if desc_elem is not None:
+            # Get all text content and clean it
+            desc_text = page.text(desc_elem)
+            # Remove common Amazon metadata and delivery information
+            desc_text = clean_text(desc_text, "description")
+
+            # Limit to 500 characters
+            description = desc_text[:500] if len(desc_text) > 500 else desc_text
+
+    # If still no description, try feature bullets
+    if description == "No description available":
+        feature_bullets = page.first('div#feature-bullets')
+        if feature_bullets is not None:
+            desc_text = page.text(feature_bullets)
+            # Remove common Amazon metadata and delivery information
+            desc_text = clean_text(desc_text, "feature_bullets")
+
+            description = desc_text[:500] if len(desc_text) > 500 else desc_text
+
+    # If still no description, try other places
+    if description == "No description available":
+        desc_elems = page.all('div.a-spacing-base')
+        for elem in desc_elems:
+            elem_text = page.text(elem)
+            # Check if this element contains actual product info (not Amazon metadata)
+            if len(elem_text) > 50 and not any(phrase in elem_text.lower() for phrase in
+                ['dispatches from', 'payment', 'secure transaction', 'amazon', 'returns', 'delivery']):
+                description = elem_text[:500]
+                break
+
+    data['description'] = description
+
+    return data
@@ -0,0 +1,195 @@
+"""
+Pluggable HTML parser backends for product page extraction.
+
+Amazon product pages are often 1-2 MB, and parsing them into a
+BeautifulSoup tree with the pure-Python html.parser dominated extraction
+time. extract_amazon only needs a few lookups (first/all elements matching
+a CSS selector, element text and the script tags), so those are wrapped in a
+small page interface implemented by:
+
+  selectolax  Lexbor C parser with its own CSS engine (fastest)
+  lxml        libxml2 tree with precompiled cssselect selectors
+  bs4         BeautifulSoup with html.parser, the original behaviour
+
+Element text is joined the way BeautifulSoup's get_text does it, without the
+contents of <script> and <style>, so every backend returns the same strings.
+Force a backend with PRODUCT_PARSER=selectolax|lxml|bs4.
+"""
+
+import functools
+import importlib.util
+import re
+
+# Text inside these tags is not part of an element's visible text
+SKIP_TEXT = ("script", "style", "template")
+CHARSET = re.compile(rb'<meta[^>]+charset=["\']?([\w-]+)', re.I)
+
+
+def detect_charset(content):
+    """Charset from a BOM or <meta> tag near the top of the page (default utf-8)."""
+    if content.startswith(b"\xef\xbb\xbf"):
+        return "utf-8"
+    match = CHARSET.search(content, 0, 4096)
+    if match:
+        charset = match.group(1).decode("ascii").lower()
+        try:
+            "".encode(charset)
+            return charset
+        except LookupError:
+            pass
+    return "utf-8"
+
+
+def _joined(strings, strip):
+    if strip:
+        return "".join(s.strip() for s in strings if s.strip())
+    return "".join(strings)
+
+
+class SoupPage:
+    """BeautifulSoup tree built with html.parser."""
+
+    name = "bs4"
+
+    def __init__(self, content):
+        from bs4 import BeautifulSoup
+
+        self.soup = content if isinstance(content, BeautifulSoup) else BeautifulSoup(content, 'html.parser')
+
+    def first(self, selector):
+        return self.soup.select_one(selector)
+
+    def all(self, selector):
+        return self.soup.select(selector)
+
+    def text(self, node, strip=True):
+        return node.get_text(strip=strip)
+
+    def scripts(self):
+        return [(script.get('type'), str(script.string)) for script in self.soup.find_all('script') if script.string]
+
+
+class SelectolaxPage:
+    """Lexbor tree from selectolax."""
+
+    name = "selectolax"
+
+    def __init__(self, content):
+        from selectolax.lexbor import LexborHTMLParser
+
+        if isinstance(content, bytes):
+            content = content.decode(detect_charset(content), errors="replace")
+        self.tree = LexborHTMLParser(content)
+
+    def first(self, selector):
+        return self.tree.css_first(selector)
+
+    def all(self, selector):
+        return self.tree.css(selector)
+
+    def text(self, node, strip=True):
+        # node.text() would include script/style bodies, so walk the text nodes
+        strings = []
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            if current.tag == "-text":
+                strings.append(current.text_content or "")
+                continue
+            if current.tag == "_comment" or (current is not node and current.tag in SKIP_TEXT):
+                continue
+            children = []
+            child = current.child
+            while child is not None:
+                children.append(child)
+                child = child.next
+            stack.extend(reversed(children))
+        return _joined(strings, strip)
+
+    def scripts(self):
+        scripts = []
+        for node in self.tree.css('script'):
+            text = node.text()
+            if text:
+                scripts.append((node.attributes.get('type'), text))
+        return scripts
+
+
+@functools.lru_cache(maxsize=None)
+def _css(selector):
+    from lxml.cssselect import CSSSelector
+
+    return CSSSelector(selector)
+
+
+class LxmlPage:
+    """libxml2 tree from lxml, queried with compiled CSS selectors."""
+
+    name = "lxml"
+
+    def __init__(self, content):
+        from lxml import etree, html
+
+        if isinstance(content, str):
+            content = content.encode("utf-8")
+        parser = html.HTMLParser(encoding=detect_charset(content))
+        try:
+            self.root = html.document_fromstring(content, parser=parser)
+        except etree.ParserError:
+            # Empty document
+            self.root = html.document_fromstring(b"<html></html>")
+
+    def first(self, selector):
+        matches = _css(selector)(self.root)
+        return matches[0] if matches else None
+
+    def all(self, selector):
+        return _css(selector)(self.root)
+
+    def text(self, node, strip=True):
+        return _joined(list(_lxml_strings(node, top=True)), strip)
+
+    def scripts(self):
+        return [(node.get('type'), node.text) for node in _css('script')(self.root) if node.text]
+
+
+def _lxml_strings(element, top=False):
+    if isinstance(element.tag, str) and (top or element.tag not in SKIP_TEXT):
+        if element.text:
+            yield element.text
+        for child in element:
+            yield from _lxml_strings(child)
+            if child.tail:
+                yield child.tail
+
+
+BACKENDS = {
+    "selectolax": SelectolaxPage,
+    "lxml": LxmlPage,
+    "bs4": SoupPage,
+}
+
+# Preference order for "auto"
+AUTO_ORDER = ("selectolax", "lxml", "bs4")
+BACKEND_MODULES = {"selectolax": ("selectolax",), "lxml": ("lxml", "cssselect"), "bs4": ("bs4",)}
+
+
+def available_backends():
+    """Names of backends whose parser libraries are installed."""
+    return [
+        name for name in BACKENDS
+        if all(importlib.util.find_spec(module) is not None for module in BACKEND_MODULES[name])
+    ]
+
+
+def get_parser(name="auto"):
+    """Return the page class for the named backend (or the fastest available)."""
+    if name == "auto":
+        installed = available_backends()
+        for candidate in AUTO_ORDER:
+            if candidate in installed:
+                return BACKENDS[candidate]
+        raise ImportError("No HTML parser installed: pip install selectolax (or lxml cssselect / beautifulsoup4)")
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown parser backend: {name}. Choose from {', '.join(BACKENDS)}")
+    return BACKENDS[name]
@@ -0,0 +1,93 @@
+"""
+Linear-time removal of Amazon boilerplate from scraped description text.
+
+Rules come from cleanup_rules.json. A rule is a list of literal markers and
+removes the shortest span that starts with the first marker and contains the
+others in order without crossing a newline -- what the original
+re.sub(r'A.*?B.*?C', '', text) patterns did, but without a backtracking regex.
+
+Rules are applied one after the other in file order, each to the output of
+the previous one, exactly like the original chain of re.sub calls. Within a
+rule, every marker lookup is a str.find that starts where the previous one
+ended, and a first marker with no complete match after it ends the rule's
+pass over the line (a later start can only see fewer markers), so each rule
+scans the text about once per marker: the cost is linear in the text length
+for a fixed rule file.
+"""
+
+import json
+import os
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cleanup_rules.json")
+
+
+class CleanupRules:
+    """A compiled set of marker rules, grouped by section."""
+
+    def __init__(self, rules):
+        self.rules = rules
+        self._sections = {}
+
+    @classmethod
+    def from_file(cls, path=DEFAULT_RULES_PATH):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        rules = []
+        for rule in data["rules"]:
+            markers = tuple(rule["markers"])
+            if not markers or not all(markers):
+                raise ValueError(f"Cleanup rule {rule.get('name', '?')} needs non-empty markers")
+            rules.append((rule.get("name", markers[0]), markers, frozenset(rule.get("sections", ()))))
+        return cls(rules)
+
+    def for_section(self, section):
+        """Marker tuples that apply to a section, in file order."""
+        if section not in self._sections:
+            self._sections[section] = [markers for _, markers, sections in self.rules
+                                       if not sections or section in sections]
+        return self._sections[section]
+
+    def clean(self, text, section="description"):
+        for markers in self.for_section(section):
+            # Most descriptions hold little or no boilerplate: skip absent rules with one scan
+            if markers[0] not in text:
+                continue
+            if "\n" not in text:
+                text = _remove(text, markers)
+            else:
+                text = "\n".join(_remove(line, markers) for line in text.split("\n"))
+        return text
+
+
+def _remove(line, markers):
+    """Delete every shortest span matching markers in order, left to right (re.sub semantics)."""
+    pieces = []
+    pos = 0
+    while True:
+        start = line.find(markers[0], pos)
+        if start == -1:
+            break
+        end = start + len(markers[0])
+        for marker in markers[1:]:
+            hit = line.find(marker, end)
+            if hit == -1:
+                break
+            end = hit + len(marker)
+        else:
+            pieces.append(line[pos:start])
+            pos = end
+            continue
+        break
+    pieces.append(line[pos:])
+    return "".join(pieces)
+
+
+_default_rules = None
+
+
+def clean_text(text, section="description"):
+    """Clean text with the rules from cleanup_rules.json (loaded once)."""
+    global _default_rules
+    if _default_rules is None:
+        _default_rules = CleanupRules.from_file()
+    return _default_rules.clean(text, section)
@@ -13,25 +13,166 @@ import requests
 import csv
 from urllib.parse import urlparse
 import mimetypes
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
 import openai
 
+from chunking import MESSAGE_OVERHEAD, MapReduce, Tokenizer, split_text
+from crawl import Crawler, page_text
+from manifest import Manifest, expand_inputs, watch
+from extract_cache import DEFAULT_CACHE_DIR, ExtractionCache, file_digest
+from pdf_extract import AUTO_ORDER, backend_version, iter_pdf_pages, parse_pages, resolve_backend
+from response_cache import ResponseCache, request_key
+from vector_index import VectorIndex
+
 # Try to import required libraries
 try:
     import markdown
+    import docx
     from docx import Document
-    import PyPDF2
 except ImportError as e:
     print(f"Missing required library: {e}")
     sys.exit(1)
 
+# Extracting these is CPU-bound: run them in worker processes
+CPU_BOUND_SUFFIXES = {'.pdf', '.docx'}
+# Bump when extraction output changes, so cached text is extracted again
+EXTRACTOR_VERSION = 1
+# Characters of combined content kept in memory before spilling to a temporary file
+SPOOL_MEMORY = 64 * 1024 * 1024
+# Per-input spool when inputs are extracted concurrently
+SOURCE_SPOOL_MEMORY = 8 * 1024 * 1024
+READ_CHUNK = 1024 * 1024
+ROWS_PER_CHUNK = 1000
+
+
+def is_url(source):
+    return urlparse(source).scheme in ('http', 'https')
+
+
+def extract_file(file_path, pdf_backend="auto", pages=None):
+    """Extract one file; module level so worker processes can run it."""
+    # Already in a worker process: no page-parallel pool of its own
+    return InputProcessor(pdf_backend=pdf_backend, pages=pages, pdf_workers=1).process_file(file_path)
+
+
+def extractor_version(suffix, pdf_backend="auto", pages=None):
+    """Identifies the code that extracts a file type, for the extraction cache."""
+    if suffix == '.pdf':
+        selection = ",".join(f"{first}-{'' if last is None else last}" for first, last in pages or ())
+        return f"{EXTRACTOR_VERSION}:pdf:{backend_version(resolve_backend(pdf_backend))}:pages={selection}"
+    if suffix == '.docx':
+        return f"{EXTRACTOR_VERSION}:docx:python-docx-{docx.__version__}"
+    return f"{EXTRACTOR_VERSION}:{suffix}"
+
+
+def stripped(chunks):
+    """The chunks of ''.join(chunks).strip(), without joining them."""
+    started = False
+    pending = ""
+    for chunk in chunks:
+        if not started:
+            chunk = chunk.lstrip()
+            if not chunk:
+                continue
+            started = True
+        body = chunk.rstrip()
+        if not body:
+            # Whitespace only: keep it unless nothing else follows
+            pending += chunk
+            continue
+        if pending:
+            yield pending
+        yield body
+        pending = chunk[len(body):]
+
+
+def _batched_lines(lines):
+    """'\n'.join(lines) in chunks of ROWS_PER_CHUNK lines."""
+    batch = []
+    first = True
+    for line in lines:
+        batch.append(line)
+        if len(batch) == ROWS_PER_CHUNK:
+            yield ('' if first else '\n') + '\n'.join(batch)
+            batch = []
+            first = False
+    if batch or first:
+        yield ('' if first else '\n') + '\n'.join(batch)
+
+
+class ContentBuffer:
+    """
+    Text accumulated from the inputs, in memory up to max_memory characters
+    and in a temporary file beyond that.
+    """
+
+    def __init__(self, max_memory=SPOOL_MEMORY):
+        self._file = tempfile.SpooledTemporaryFile(max_size=max_memory, mode='w+', encoding='utf-8', newline='')
+        self.length = 0
+
+    def write(self, text):
+        self._file.write(text)
+        self.length += len(text)
+
+    def chunks(self, size=READ_CHUNK):
+        """Read the content back in chunks. Do not write while iterating."""
+        self._file.seek(0)
+        try:
+            while True:
+                chunk = self._file.read(size)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            self._file.seek(0, os.SEEK_END)
+
+    def getvalue(self):
+        return ''.join(self.chunks())
+
+    def close(self):
+        self._file.close()
+
+    def __len__(self):
+        return self.length
+
+
 class InputProcessor:
     """Process different input sources and extract text content."""
 
-    def __init__(self):
-        self.content = ""
+    def __init__(self, max_memory=SPOOL_MEMORY, cache=None, pdf_backend="auto", pages=None, pdf_workers=1,
+                 crawl_depth=0, max_pages=100, crawl_concurrency=8, crawl_delay=0.0):
+        self.buffer = ContentBuffer(max_memory)
+        # ExtractionCache for PDF and DOCX text, or None
+        self.cache = cache
+        # PDF library ("auto" for the fastest installed), parse_pages() selection, processes per large PDF
+        self.pdf_backend = pdf_backend
+        self.pages = pages
+        self.pdf_workers = pdf_workers
+        # URL inputs: links followed from each (0 fetches just the page), pages per site, fetches at once,
+        # seconds between requests to one host
+        self.crawl_depth = crawl_depth
+        self.max_pages = max_pages
+        self.crawl_concurrency = crawl_concurrency
+        self.crawl_delay = crawl_delay
+        # One connection pool for every URL, shared by the download threads
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=16, pool_maxsize=32)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    @property
+    def content(self):
+        """All content added so far, as one string."""
+        return self.buffer.getvalue()
 
     def process_file(self, file_path):
         """Process a single file based on its extension."""
+        return ''.join(self.iter_file(file_path))
+
+    def iter_file(self, file_path):
+        """Text chunks of a single file, chosen by its extension."""
         file_path = Path(file_path)
         if not file_path.exists():
             raise FileNotFoundError(f"File not found: {file_path}")
@@ -54,46 +195,33 @@ class InputProcessor:
     def _process_text_file(self, file_path):
         """Process text files."""
         with open(file_path, 'r', encoding='utf-8') as f:
-            return f.read()
+            while True:
+                chunk = f.read(READ_CHUNK)
+                if not chunk:
+                    break
+                yield chunk
 
     def _process_csv_file(self, file_path):
         """Process CSV files."""
-        content = []
         with open(file_path, 'r', encoding='utf-8') as f:
             reader = csv.DictReader(f)
-            for row in reader:
-                content.append(' '.join(row.values()))
-        return '\n'.join(content)
+            yield from _batched_lines(' '.join(row.values()) for row in reader)
 
     def _process_docx_file(self, file_path):
         """Process DOCX files."""
         doc = Document(file_path)
-        return '\n'.join([para.text for para in doc.paragraphs])
+        yield from _batched_lines(para.text for para in doc.paragraphs)
 
     def _process_pdf_file(self, file_path):
-        """Process PDF files."""
-        content = []
-        try:
-            with open(file_path, 'rb') as f:
-                pdf_reader = PyPDF2.PdfReader(f)
-                for page in pdf_reader.pages:
-                    content.append(page.extract_text())
-        except Exception as e:
-            # Fallback for newer PyPDF2 versions or other issues
-            try:
-                import pypdf
-                with open(file_path, 'rb') as f:
-                    pdf_reader = pypdf.PdfReader(f)
-                    for page in pdf_reader.pages:
-                        content.append(page.extract_text())
-            except ImportError:
-                raise ImportError("PyPDF2 failed, please install pypdf: pip install pypdf")
-        return '\n'.join(content)
+        """Process PDF files page by page."""
+        pages = iter_pdf_pages(file_path, self.pages, self.pdf_backend, self.pdf_workers)
+        for done, text in enumerate(pages):
+            yield text if done == 0 else '\n' + text
 
     def process_url(self, url):
         """Process a URL (HTML page)."""
         try:
-            response = requests.get(url, timeout=10)
+            response = self.session.get(url, timeout=10)
             response.raise_for_status()
 
             # Simple HTML to text extraction
@@ -102,49 +230,312 @@ class InputProcessor:
             except ImportError:
                 raise ImportError("Please install beautifulsoup4: pip install beautifulsoup4")
 
-            soup = BeautifulSoup(response.content, 'html.parser')
-
-            # Remove script and style elements
-            for script in soup(["script", "style"]):
-                script.decompose()
-
-            # Get text and clean it up
-            text = soup.get_text()
-            lines = (line.strip() for line in text.splitlines())
-            chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-            text = ' '.join(chunk for chunk in chunks if chunk)
-
-            return text
+            return page_text(BeautifulSoup(response.content, 'html.parser'))
         except Exception as e:
             raise Exception(f"Error processing URL {url}: {str(e)}")
 
+    def iter_crawl(self, url):
+        """Text of the pages of the site at url, page by page, as the crawl reaches them."""
+        crawler = Crawler(self.session, max_depth=self.crawl_depth, max_pages=self.max_pages,
+                          concurrency=self.crawl_concurrency, delay=self.crawl_delay)
+        try:
+            for n, (_, text) in enumerate(crawler.crawl(url)):
+                yield text if n == 0 else '\n\n' + text
+        except Exception as e:
+            raise Exception(f"Error crawling {url}: {str(e)}")
+
+    def _cache_key(self, source):
+        if self.cache is None or is_url(source):
+            return None
+        suffix = Path(source).suffix.lower()
+        if suffix not in CPU_BOUND_SUFFIXES or not os.path.isfile(source):
+            return None
+        return self.cache.key(source, extractor_version(suffix, self.pdf_backend, self.pages))
+
+    def iter_source(self, source):
+        """Text chunks of a file path or URL."""
+        if is_url(source):
+            if self.crawl_depth > 0:
+                return self.iter_crawl(source)
+            return iter((self.process_url(source),))
+        key = self._cache_key(source)
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+            return self.cache.store(key, self.iter_file(source))
+        return self.iter_file(source)
+
+    def process_source(self, source):
+        """Process a file path or URL."""
+        return ''.join(self.iter_source(source))
+
+    def _spool(self, source):
+        spool = ContentBuffer(SOURCE_SPOOL_MEMORY)
+        for chunk in self.iter_source(source):
+            spool.write(chunk)
+        return spool
+
+    def _extract_in_process(self, source, processes):
+        key = self._cache_key(source)
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+        text = processes.submit(extract_file, source, self.pdf_backend, self.pages).result()
+        if key is not None:
+            self.cache.put(key, text)
+        return text
+
+    def iter_sources(self, sources, jobs=1):
+        """
+        Yield the text of every source as an iterator of chunks, in input order.
+
+        With jobs > 1, PDF and DOCX files are extracted in a pool of worker
+        processes (at most one per CPU) while URLs and plain files are
+        handled by a thread pool, each into its own spooled buffer.
+        Consume each source's chunks before asking for the next one.
+        The first failing source (in input order) raises its error.
+        """
+        if jobs <= 1 or len(sources) <= 1:
+            for source in sources:
+                yield self.iter_source(source)
+            return
+
+        heavy = {i for i, source in enumerate(sources)
+                 if not is_url(source) and Path(source).suffix.lower() in CPU_BOUND_SUFFIXES}
+        futures = [None] * len(sources)
+        workers = min(jobs, len(heavy), os.cpu_count() or 1)
+        processes = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+        try:
+            if processes is not None:
+                # Start the workers now, before the threads: with the fork start method the pool
+                # forks them all on its first submit(), and forking from one of the threads below
+                # would copy locks (requests, sqlite, gzip) that the others may hold
+                processes.submit(int).result()
+            with ThreadPoolExecutor(max_workers=jobs) as threads:
+                for i, source in enumerate(sources):
+                    if processes is not None and i in heavy:
+                        # Cache lookups happen in the thread; only misses go to a worker process
+                        futures[i] = threads.submit(self._extract_in_process, source, processes)
+                    else:
+                        futures[i] = threads.submit(self._spool, source)
+                for future in futures:
+                    result = future.result()
+                    if isinstance(result, str):
+                        yield iter((result,))
+                    elif isinstance(result, ContentBuffer):
+                        yield result.chunks()
+                        result.close()
+                    else:
+                        yield result
+        finally:
+            if processes is not None:
+                processes.shutdown(cancel_futures=True)
+
+    def process_sources(self, sources, jobs=1):
+        """Extract every source and return the texts in input order."""
+        return [''.join(chunks) for chunks in self.iter_sources(sources, jobs)]
+
     def add_content(self, content):
         """Add content to the processor."""
-        self.content += content + "\n\n"
-
-def call_llm_api(prompt, model):
-    """Call the OpenAI API to get a response."""
+        self.add_chunks((content,))
+
+    def add_chunks(self, chunks):
+        """Add one input's content, chunk by chunk."""
+        for chunk in chunks:
+            self.buffer.write(chunk)
+        self.buffer.write("\n\n")
+
+    def content_chunks(self):
+        """The stripped content, lazily."""
+        return stripped(self.buffer.chunks())
+
+    def preview(self, length):
+        """The first `length` characters of the stripped content (plus one more if there is more)."""
+        head = []
+        size = 0
+        for chunk in self.content_chunks():
+            head.append(chunk[:length + 1 - size])
+            size += len(head[-1])
+            if size > length:
+                break
+        return ''.join(head)
+
+    def prompt_chunks(self, query):
+        """The prompt (query, blank line, content), lazily."""
+        yield query
+        yield "\n\n"
+        yield from self.content_chunks()
+
+@lru_cache(maxsize=None)
+def _openai_client(api_key, base_url):
+    # One client (and connection pool) shared by concurrent requests
+    return openai.OpenAI(api_key=api_key, base_url=base_url)
+
+
+def call_llm_api(prompt, model, max_tokens=1000, temperature=0.7, cache=None, force_cache=False):
+    """
+    Call the OpenAI API to get a response.
+
+    With a ResponseCache, deterministic requests (temperature 0, or any
+    temperature with force_cache) are answered from the cache when possible.
+    """
     try:
         # Check if API key is set
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
             raise EnvironmentError("OPENAI_API_KEY environment variable not set")
 
-        openai.api_key = api_key
+        messages = [
+            {"role": "user", "content": prompt}
+        ]
+
+        def request():
+            if not hasattr(openai, "OpenAI"):
+                # openai < 1.0
+                openai.api_key = api_key
+                if os.getenv("OPENAI_API_BASE"):
+                    openai.api_base = os.getenv("OPENAI_API_BASE")
+                response = openai.ChatCompletion.create(
+                    model=model,
+                    messages=messages,
+                    max_tokens=max_tokens,
+                    temperature=temperature
+                )
+            else:
+                response = _openai_client(api_key, os.getenv("OPENAI_BASE_URL")).chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    max_tokens=max_tokens,
+                    temperature=temperature
+                )
+            usage = getattr(response, "usage", None)
+            return (response.choices[0].message.content.strip(),
+                    getattr(usage, "prompt_tokens", 0) or 0, getattr(usage, "completion_tokens", 0) or 0)
+
+        if cache is None or (temperature > 0 and not force_cache):
+            return request()[0]
+        key = request_key(model, messages, {"max_tokens": max_tokens, "temperature": temperature})
+        return cache.fetch(key, model, request)
+    except Exception as e:
+        raise Exception(f"Error calling LLM API: {str(e)}")
 
-        response = openai.ChatCompletion.create(
-            model=model,
-            messages=[
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=1000,
-            temperature=0.7
-        )
 
-        return response.choices[0].message.content.strip()
+def stream_llm_api(prompt, model, max_tokens=1000, temperature=0.7, cache=None, force_cache=False):
+    """Like call_llm_api, but yield the answer in pieces as the API streams it."""
+    try:
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            raise EnvironmentError("OPENAI_API_KEY environment variable not set")
+
+        messages = [
+            {"role": "user", "content": prompt}
+        ]
+
+        key = None
+        if cache is not None and (temperature <= 0 or force_cache):
+            key = request_key(model, messages, {"max_tokens": max_tokens, "temperature": temperature})
+            cached = cache.get(key)
+            if cached is not None:
+                yield cached
+                return
+
+        start = time.perf_counter()
+        if not hasattr(openai, "OpenAI"):
+            # openai < 1.0
+            openai.api_key = api_key
+            if os.getenv("OPENAI_API_BASE"):
+                openai.api_base = os.getenv("OPENAI_API_BASE")
+            response = openai.ChatCompletion.create(
+                model=model,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                stream=True
+            )
+            deltas = (chunk["choices"][0]["delta"].get("content") for chunk in response if chunk["choices"])
+        else:
+            response = _openai_client(api_key, os.getenv("OPENAI_BASE_URL")).chat.completions.create(
+                model=model,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                stream=True
+            )
+            deltas = (chunk.choices[0].delta.content for chunk in response if chunk.choices)
+
+        pieces = []
+        for piece in stripped(delta for delta in deltas if delta):
+            pieces.append(piece)
+            yield piece
+
+        if key is not None:
+            # The stream reports no usage: count the tokens for the cache statistics
+            tokenizer = Tokenizer(model)
+            content = ''.join(pieces)
+            cache.put(key, model, content, tokenizer.count(prompt) + MESSAGE_OVERHEAD, tokenizer.count(content),
+                      time.perf_counter() - start)
     except Exception as e:
         raise Exception(f"Error calling LLM API: {str(e)}")
 
+
+def print_estimate(mapper, estimate):
+    tokens = "tokens" if estimate["exact"] else "tokens (estimated, tiktoken encoding not available)"
+    print(f"\n=== Estimate ===")
+    print(f"{estimate['chunks']} chunk(s) of up to {mapper.chunk_tokens} tokens, {estimate['requests']} request(s)")
+    print(f"~{estimate['input_tokens']:,} input + up to {estimate['output_tokens']:,} output {tokens}")
+    if estimate["cost"] is not None:
+        print(f"Cost: up to ${estimate['cost']:.4f}")
+
+
+def page_ranges(spec):
+    """argparse type for --pages."""
+    try:
+        return parse_pages(spec)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def write_stream(pieces, output_path, tokenizer):
+    """
+    Print the answer as it arrives, writing it to a text output file at the
+    same time (a .docx file is saved at the end). Returns the full answer.
+    """
+    output_path = Path(output_path) if output_path else None
+    # A .docx file can only be written whole
+    output = None
+    if output_path is not None and output_path.suffix.lower() != '.docx':
+        output = open(output_path, 'w', encoding='utf-8')
+    text = []
+    first = None
+    start = time.perf_counter()
+    try:
+        for piece in pieces:
+            if first is None:
+                first = time.perf_counter() - start
+            text.append(piece)
+            sys.stdout.write(piece)
+            sys.stdout.flush()
+            if output is not None:
+                output.write(piece)
+                output.flush()
+    finally:
+        if output is not None:
+            output.close()
+    elapsed = time.perf_counter() - start
+    result = ''.join(text)
+    if output_path is not None and output is None:
+        save_result(result, output_path)
+
+    tokens = tokenizer.count(result)
+    rate = tokens / (elapsed - first) if first is not None and elapsed > first else 0.0
+    ttft = f"{first:.2f}s" if first is not None else "-"
+    estimated = "" if tokenizer.exact else " (estimated)"
+    print(f"\n\n{tokens} tokens{estimated} in {elapsed:.2f}s: first token after {ttft}, {rate:.1f} tokens/s")
+    return result
+
+
 def save_result(result, output_path):
     """Save the result to the specified output file."""
     output_path = Path(output_path)
@@ -160,6 +551,136 @@ def save_result(result, output_path):
         with open(output_path, 'w', encoding='utf-8') as f:
             f.write(result)
 
+def index_sources(index, processor, sources, args):
+    """Bring the vector index up to date with the sources; returns (indexed, chunks added, removed)."""
+    def digest(source):
+        if is_url(source):
+            return None
+        if processor.cache is not None:
+            return processor.cache.digest(source)
+        return file_digest(source)
+
+    removed = index.prune(sources)
+    stale = index.stale(sources, digest)
+    tokenizer = Tokenizer(args.model)
+    added = 0
+    for (source, source_digest), chunks in zip(stale, processor.iter_sources([s for s, _ in stale], jobs=args.jobs)):
+        pieces = split_text(stripped(chunks), tokenizer, args.index_chunk_tokens, args.index_chunk_tokens // 8)
+        added += index.add(source, source_digest, (text for text, _ in pieces))
+    return len(stale), added, removed
+
+
+def run(args, sources, cache=None, responses=None):
+    """Extract the sources and query the model; False if there was no content."""
+
+    def ask(prompt, max_tokens):
+        return call_llm_api(prompt, args.model, max_tokens, temperature=args.temperature,
+                            cache=responses, force_cache=args.force_cache)
+
+    def stream(prompt, max_tokens):
+        return stream_llm_api(prompt, args.model, max_tokens, temperature=args.temperature,
+                              cache=responses, force_cache=args.force_cache)
+
+    processor = InputProcessor(cache=cache, pdf_backend=args.pdf_backend, pages=args.pages,
+                               pdf_workers=args.pdf_workers, crawl_depth=args.crawl_depth,
+                               max_pages=args.max_pages, crawl_concurrency=args.crawl_concurrency,
+                               crawl_delay=args.crawl_delay)
+    try:
+        if args.index:
+            # Only the chunks most relevant to the query go into the prompt
+            index = VectorIndex(args.index, embedder=args.embedder, ann=args.ann)
+            try:
+                start = time.perf_counter()
+                indexed, added, removed = index_sources(index, processor, sources, args)
+                # Replaced chunks are only marked deleted: rewrite the index once they pile up
+                compacted = index.compact()
+                if args.ann == 'hnsw':
+                    index.build_ann()
+                print(f"Index {args.index} ({index.embedder.name}): {indexed} input(s) indexed, {added} chunks added, "
+                      f"{removed} removed" + (f", {compacted} deleted chunks compacted" if compacted else "")
+                      + f" in {time.perf_counter() - start:.1f}s")
+                start = time.perf_counter()
+                hits = index.search(args.query, args.top_k)
+                print(f"Retrieved {len(hits)} of {len(index)} chunks in {(time.perf_counter() - start) * 1000:.1f} ms")
+            finally:
+                index.close()
+            for score, source, position, text in hits:
+                processor.add_content(f"[{source}, part {position + 1}]\n{text}")
+        else:
+            for chunks in processor.iter_sources(sources, jobs=args.jobs):
+                processor.add_chunks(chunks)
+
+        # The content is read back lazily: only the request below needs it as one string
+        preview = processor.preview(500)
+
+        if not preview:
+            print("No content to process")
+            return False
+
+        print("=== Input Content ===")
+        print(preview[:500] + ("..." if len(preview) > 500 else ""))
+
+        # Content that does not fit in the model context is queried chunk by chunk
+        mapper = MapReduce(
+            ask,
+            args.model, args.query, max_tokens=args.max_tokens, chunk_tokens=args.chunk_tokens,
+            overlap=args.overlap, concurrency=args.concurrency
+        )
+        chunk_sizes = mapper.plan(processor.content_chunks())
+        print_estimate(mapper, mapper.estimate(chunk_sizes))
+
+        if len(chunk_sizes) <= 1:
+            print("\n=== Query Prompt ===")
+            for chunk in processor.prompt_chunks(args.query):
+                sys.stdout.write(chunk)
+            print()
+
+            # Format the prompt
+            prompt = ''.join(processor.prompt_chunks(args.query))
+
+            # Call the LLM API
+            print(f"\nCalling {args.model} API...")
+            if args.stream:
+                print("\n=== LLM Response ===")
+                response = write_stream(stream(prompt, args.max_tokens), args.output, mapper.tokenizer)
+            else:
+                response = ask(prompt, args.max_tokens)
+        else:
+            print(f"\n=== Query Prompt ===\n{args.query}")
+            print(f"\nCalling {args.model} API for {len(chunk_sizes)} chunks, {mapper.concurrency} at a time...")
+
+            def stream_final(prompt):
+                # Map answers are collected; the combined answer is streamed
+                print("\n=== LLM Response ===")
+                return write_stream(stream(prompt, args.max_tokens), args.output, mapper.tokenizer)
+
+            response = mapper.run(
+                processor.content_chunks(), len(chunk_sizes),
+                progress=lambda stage, done, total: print(f"  {stage}: {done}/{total}", file=sys.stderr),
+                final=stream_final if args.stream else None
+            )
+
+        if responses is not None and (responses.stats.hits or responses.stats.deduplicated):
+            stats = responses.stats
+            saved = f", ${stats.saved_cost:.4f}" if stats.saved_cost else ""
+            print(f"\nResponse cache: {stats.hits} hit(s), {stats.deduplicated} duplicate request(s) skipped, "
+                  f"saved ~{stats.saved_seconds:.1f}s and {stats.saved_tokens:,} tokens{saved}")
+
+        # Output result
+        if args.stream:
+            if args.output:
+                print(f"\nResult written to: {args.output}")
+        elif args.output:
+            save_result(response, args.output)
+            print(f"\nResult written to: {args.output}")
+        else:
+            print("\n=== LLM Response ===")
+            print(response)
+        return True
+    finally:
+        processor.buffer.close()
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="LLM Input Processor - Process various input sources using LLMs",
@@ -170,13 +691,15 @@ Examples:
   %(prog)s file1.txt file2.pdf --query "Explain the key points"
   %(prog)s https://example.com/page.html   --output result.txt
   %(prog)s data.csv docx_file.docx --query "Summarize the content"
+  %(prog)s reports/ "notes/**/*.md" --watch
+  %(prog)s manuals/ --index manuals.index --query "How do I reset the device?"
         """
     )
 
     parser.add_argument(
         'inputs',
         nargs='+',
-        help='Input sources (files or URLs)'
+        help='Input sources (files, directories, glob patterns such as "docs/**/*.md", or URLs)'
     )
 
     parser.add_argument(
@@ -199,6 +722,174 @@ Examples:
         help='LLM model to use (default: gpt-3.5-turbo)'
     )
 
+    parser.add_argument(
+        '--jobs',
+        '-j',
+        type=int,
+        default=min(32, (os.cpu_count() or 1) + 4),
+        help='Inputs to process concurrently (default: CPUs + 4, at most 32; 1 processes them one by one)'
+    )
+
+    parser.add_argument(
+        '--max-tokens',
+        type=int,
+        default=1000,
+        help='Maximum tokens per answer (default: 1000)'
+    )
+
+    parser.add_argument(
+        '--chunk-tokens',
+        type=int,
+        help='Split content larger than this many tokens into chunks (default: what fits in the model context)'
+    )
+
+    parser.add_argument(
+        '--overlap',
+        type=int,
+        default=200,
+        help='Tokens repeated between consecutive chunks (default: 200)'
+    )
+
+    parser.add_argument(
+        '--concurrency',
+        type=int,
+        default=4,
+        help='Chunk requests sent at once (default: 4)'
+    )
+
+    parser.add_argument(
+        '--stream',
+        action='store_true',
+        help='Print the answer (and write a text --output file) as it is generated'
+    )
+
+    parser.add_argument(
+        '--cache-dir',
+        default=DEFAULT_CACHE_DIR,
+        help=f'Directory for cached PDF/DOCX text and LLM responses (default: {DEFAULT_CACHE_DIR})'
+    )
+
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Extract every file and send every request again, without reading or writing the caches'
+    )
+
+    parser.add_argument(
+        '--temperature',
+        type=float,
+        default=0.7,
+        help='Sampling temperature (default: 0.7); responses are cached only at 0 unless --force-cache'
+    )
+
+    parser.add_argument(
+        '--force-cache',
+        action='store_true',
+        help='Cache and reuse responses even when the temperature is above 0'
+    )
+
+    parser.add_argument(
+        '--cache-ttl',
+        type=float,
+        default=7 * 24,
+        help='Hours a cached response stays valid (default: 168)'
+    )
+
+    parser.add_argument(
+        '--index',
+        metavar='DIR',
+        help='Keep a vector index of the inputs in DIR and send only the chunks most relevant to --query'
+    )
+
+    parser.add_argument(
+        '--top-k',
+        type=int,
+        default=8,
+        help='Chunks retrieved from the index (default: 8)'
+    )
+
+    parser.add_argument(
+        '--index-chunk-tokens',
+        type=int,
+        default=256,
+        help='Tokens per indexed chunk (default: 256)'
+    )
+
+    parser.add_argument(
+        '--embedder',
+        default='auto',
+        help='Embedding model for --index: a sentence-transformers model name, "hashing" (built in), '
+             'or auto (default: all-MiniLM-L6-v2 if available, else hashing)'
+    )
+
+    parser.add_argument(
+        '--ann',
+        default='exact',
+        choices=('exact', 'hnsw'),
+        help='Index search: exact, or an approximate HNSW graph (needs faiss-cpu) (default: exact)'
+    )
+
+    parser.add_argument(
+        '--watch',
+        action='store_true',
+        help='After the first run, poll the inputs and run again whenever a file changes'
+    )
+
+    parser.add_argument(
+        '--watch-interval',
+        type=float,
+        default=2.0,
+        help='Seconds between checks for changes with --watch (default: 2)'
+    )
+
+    parser.add_argument(
+        '--crawl-depth',
+        type=int,
+        default=0,
+        help='Follow links on URL inputs this many clicks deep, staying on the same site (default: 0, the page only)'
+    )
+
+    parser.add_argument(
+        '--max-pages',
+        type=int,
+        default=100,
+        help='Pages to crawl per URL input at most (default: 100)'
+    )
+
+    parser.add_argument(
+        '--crawl-concurrency',
+        type=int,
+        default=8,
+        help='Pages fetched at once while crawling (default: 8)'
+    )
+
+    parser.add_argument(
+        '--crawl-delay',
+        type=float,
+        default=0.0,
+        help='Seconds between requests to the same host while crawling (default: 0, or robots.txt Crawl-delay)'
+    )
+
+    parser.add_argument(
+        '--pages',
+        type=page_ranges,
+        help='PDF pages to extract, 1-based, e.g. "1-10,15,40-" (default: all)'
+    )
+
+    parser.add_argument(
+        '--pdf-backend',
+        default='auto',
+        choices=('auto',) + AUTO_ORDER,
+        help='PDF library (default: auto, the fastest installed of ' + ', '.join(AUTO_ORDER) + ')'
+    )
+
+    parser.add_argument(
+        '--pdf-workers',
+        type=int,
+        default=os.cpu_count() or 1,
+        help='Processes extracting the pages of one large PDF (default: CPUs)'
+    )
+
     args = parser.parse_args()
 
     # Validate inputs
@@ -207,47 +898,59 @@ Examples:
         sys.exit(1)
 
     try:
-        processor = InputProcessor()
+        cache = None if args.no_cache else ExtractionCache(args.cache_dir)
+        responses = None if args.no_cache else ResponseCache(args.cache_dir, ttl=args.cache_ttl * 3600)
 
-        # Process all inputs
-        for input_source in args.inputs:
-            # Check if it's a URL
-            parsed_url = urlparse(input_source)
-            if parsed_url.scheme in ('http', 'https'):
+        # Directories and glob patterns stand for the files they hold
+        sources, groups = expand_inputs(args.inputs)
+        for input_source, kind, count in groups:
+            if kind == "url":
                 print(f"Processing URL: {input_source}")
-                content = processor.process_url(input_source)
-            else:
+            elif kind == "file":
                 print(f"Processing file: {input_source}")
-                content = processor.process_file(input_source)
-
-            processor.add_content(content)
-
-        # Get the final content
-        full_content = processor.content.strip()
-
-        if not full_content:
-            print("No content to process")
+            else:
+                print(f"Processing {kind}: {input_source} ({count} files)")
+        if not sources:
+            print("No input files found")
             sys.exit(1)
 
-        # Format the prompt
-        prompt = f"{args.query}\n\n{full_content}"
+        manifest = None if cache is None else Manifest.for_inputs(args.cache_dir, args.inputs)
+        if manifest is not None:
+            changes = manifest.update(sources, cache.digest)
+            print(f"Since the last run: {changes.summary()}")
 
-        print("=== Input Content ===")
-        print(full_content[:500] + ("..." if len(full_content) > 500 else ""))
-        print("\n=== Query Prompt ===")
-        print(prompt)
-
-        # Call the LLM API
-        print(f"\nCalling {args.model} API...")
-        response = call_llm_api(prompt, args.model)
+        if not run(args, sources, cache, responses) and not args.watch:
+            sys.exit(1)
+        if manifest is not None:
+            manifest.save()
+
+        if args.watch:
+            print(f"\nWatching for changes every {args.watch_interval:g}s (Ctrl+C to stop)...")
+
+            def rerun(sources):
+                print()
+                if manifest is not None:
+                    changes = manifest.update(sources, cache.digest)
+                    print(f"Inputs changed: {changes.summary()}")
+                    if not changes:
+                        # Only touched: same contents, same answer
+                        manifest.save()
+                        return
+                else:
+                    print("Inputs changed")
+                try:
+                    run(args, sources, cache, responses)
+                    if manifest is not None:
+                        manifest.save()
+                except Exception as e:
+                    # Keep watching: the next change may fix it
+                    print(f"Error: {str(e)}", file=sys.stderr)
+                print(f"\nWatching for changes every {args.watch_interval:g}s (Ctrl+C to stop)...")
 
-        # Output result
-        if args.output:
-            save_result(response, args.output)
-            print(f"\nResult written to: {args.output}")
-        else:
-            print("\n=== LLM Response ===")
-            print(response)
+            try:
+                watch(args.inputs, rerun, interval=args.watch_interval)
+            except KeyboardInterrupt:
+                print("\nStopped watching")
 
     except Exception as e:
         print(f"Error: {str(e)}", file=sys.stderr)
@@ -0,0 +1,936 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the LLM Input Processor.
+
+Usage:
+  python bench_inputs.py ingest --synthetic 40 --urls 10 --jobs 8
+  python bench_inputs.py ingest --dir sample_docs/ --jobs 8
+  python bench_inputs.py memory --size-mb 1024
+  python bench_inputs.py mapreduce --size-mb 4 --concurrency 8
+  python bench_inputs.py cache --pdfs 200
+  python bench_inputs.py pdf --pages 1000 --workers 4
+  python bench_inputs.py responses --requests 400 --distinct 80 --concurrency 8
+  python bench_inputs.py stream --answer-tokens 400
+  python bench_inputs.py crawl --site-pages 300 --depth 3
+  python bench_inputs.py incremental --files 10000 --changed 0.01
+  python bench_inputs.py index --chunks 100000 --queries 200
+
+LLM requests go to a local stand-in for the OpenAI chat completions API,
+which rejects prompts over the model's context window like the real one.
+
+Synthetic inputs are PDFs, DOCX and text files of generated prose, written
+to a temporary directory (fpdf2 is needed to write the PDFs:
+pip install fpdf2). URLs are served by a local stand-in web server with a
+fixed latency per request.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from assignement_4 import InputProcessor
+
+WORDS = ("data model report system analysis result method process value market customer "
+         "design energy network quality growth policy research service product structure").split()
+INPUT_SUFFIXES = {'.txt', '.md', '.csv', '.docx', '.pdf'}
+
+
+def synthetic_paragraphs(rng, count, sentences=6):
+    paragraphs = []
+    for _ in range(count):
+        sentence_list = []
+        for _ in range(sentences):
+            words = rng.choices(WORDS, k=rng.randint(8, 18))
+            sentence_list.append(" ".join(words).capitalize() + ".")
+        paragraphs.append(" ".join(sentence_list))
+    return paragraphs
+
+
+def write_pdf(path, paragraphs):
+    from fpdf import FPDF
+
+    pdf = FPDF()
+    pdf.set_font("Helvetica", size=10)
+    pdf.add_page()
+    for paragraph in paragraphs:
+        pdf.multi_cell(0, 5, paragraph)
+        pdf.ln(3)
+    pdf.output(str(path))
+
+
+def write_docx(path, paragraphs):
+    from docx import Document
+
+    doc = Document()
+    for paragraph in paragraphs:
+        doc.add_paragraph(paragraph)
+    doc.save(path)
+
+
+def make_documents(directory, count, seed=0, pdf_paragraphs=120):
+    """Write a mix of PDF (half), DOCX and text documents; returns their paths."""
+    rng = random.Random(seed)
+    paths = []
+    for i in range(count):
+        kind = ('pdf', 'pdf', 'docx', 'txt')[i % 4]
+        path = Path(directory) / f"doc_{i:04d}.{kind}"
+        paragraphs = synthetic_paragraphs(rng, pdf_paragraphs if kind == 'pdf' else pdf_paragraphs // 2)
+        if kind == 'pdf':
+            write_pdf(path, paragraphs)
+        elif kind == 'docx':
+            write_docx(path, paragraphs)
+        else:
+            path.write_text("\n\n".join(paragraphs), encoding='utf-8')
+        paths.append(str(path))
+    return paths
+
+
+def document_paths(directory):
+    return sorted(str(path) for path in Path(directory).rglob('*') if path.suffix.lower() in INPUT_SUFFIXES)
+
+
+class StandInSite(BaseHTTPRequestHandler):
+    """Serves generated HTML pages at /page/N after a fixed delay (the query string is ignored)."""
+
+    pages = {}
+    latency = 0.2
+    requests = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        with self.lock:
+            type(self).requests += 1
+        path = self.path.split("?", 1)[0]
+        body = self.pages.get(path)
+        if body is None:
+            self.send_response(404)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain" if path.endswith(".txt") else "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_site(pages, latency):
+    """Serve {path: html bytes}; returns (server, base URL)."""
+    handler = type("Site", (StandInSite,), {"pages": pages, "latency": latency, "requests": 0})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    server.handler = handler
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def html_page(rng, title, paragraphs=30):
+    body = "".join(f"<p>{paragraph}</p>" for paragraph in synthetic_paragraphs(rng, paragraphs))
+    return (f"<html><head><title>{title}</title><script>var x = 1;</script></head>"
+            f"<body><h1>{title}</h1>{body}</body></html>").encode("utf-8")
+
+
+def crawl_site(rng, count, links=8, paragraphs=10):
+    """
+    A site of `count` pages linking to each other, with the aliases a crawl
+    has to see through: fragments, tracking parameters, dot segments, an
+    upper case host, print versions with <link rel="canonical">, plus links
+    to pages robots.txt forbids and to another site.
+    """
+    aliases = ("/page/{}", "/page/{}#comments", "/page/{}?utm_source=feed", "/archive/../page/{}",
+               "HTTP://127.0.0.1:{port}/page/{}", "/print/{}")
+    pages = {"/robots.txt": b"User-agent: *\nDisallow: /private/\n"}
+    for i in range(count):
+        targets = rng.sample(range(count), links)
+        anchors = [rng.choice(aliases).format(j, port="{port}") for j in targets]
+        anchors += [f"/private/{i}", "https://elsewhere.invalid/"]
+        nav = "".join(f'<a href="{href}">link</a> ' for href in anchors)
+        body = "".join(f"<p>{paragraph}</p>" for paragraph in synthetic_paragraphs(rng, paragraphs))
+        page = f"<html><head><title>Page {i}</title></head><body><nav>{nav}</nav>{body}</body></html>"
+        pages[f"/page/{i}"] = page
+        pages[f"/print/{i}"] = page.replace("<head>", f'<head><link rel="canonical" href="/page/{i}">')
+        pages[f"/private/{i}"] = f"<html><body>Private {i}</body></html>"
+    return pages
+
+
+def bench_crawl(args):
+    from crawl import Crawler
+
+    pages = crawl_site(random.Random(args.seed), args.site_pages)
+    server, base = start_site({}, args.latency)
+    port = server.server_port
+    server.handler.pages = {path: body.replace("{port}", str(port)).encode("utf-8") if isinstance(body, str)
+                            else body for path, body in pages.items()}
+    print(f"stand-in site: {args.site_pages} pages, {args.latency * 1000:.0f} ms per request, depth {args.depth}")
+
+    runs = [("concurrency 1", 1, 0.0), (f"concurrency {args.concurrency}", args.concurrency, 0.0),
+            (f"concurrency {args.concurrency}, {args.delay}s per host", args.concurrency, args.delay)]
+    texts = {}
+    for label, concurrency, delay in runs:
+        # A fresh connection pool per run
+        crawler = Crawler(InputProcessor().session, max_depth=args.depth, max_pages=args.max_pages,
+                          concurrency=concurrency, delay=delay)
+        server.handler.requests = 0
+        start = time.perf_counter()
+        results = list(crawler.crawl(base + "/page/0"))
+        elapsed = time.perf_counter() - start
+        texts[label] = [text for _, text in results]
+        skipped = ", ".join(f"{count} {reason}" for reason, count in crawler.skipped.items() if count)
+        print(f"{label:<34} {elapsed:6.2f}s  {len(results)} pages  {len(results) / elapsed:6.1f} pages/s  "
+              f"{server.handler.requests} requests; skipped: {skipped}")
+    print(f"same pages in the same order: {len({tuple(value) for value in texts.values()}) == 1}")
+
+    # Through the processor, streamed into its buffer
+    processor = InputProcessor(crawl_depth=args.depth, max_pages=args.max_pages, crawl_concurrency=args.concurrency)
+    start = time.perf_counter()
+    for chunks in processor.iter_sources([base + "/page/0"]):
+        processor.add_chunks(chunks)
+    elapsed = time.perf_counter() - start
+    same = processor.content.strip() == "\n\n".join(texts[runs[1][0]])
+    print(f"InputProcessor --crawl-depth {args.depth}: {len(processor.buffer) / 1e6:.1f} MB of text in {elapsed:.2f}s; "
+          f"same text as the crawl: {same}")
+    server.shutdown()
+
+
+def write_tree(directory, count, rng, rich=0.1):
+    """
+    A tree of `count` small documents in nested directories: mostly text and
+    Markdown, with a `rich` share of PDF and DOCX files.
+    """
+    paths = []
+    for i in range(count):
+        if rng.random() < rich:
+            kind = rng.choice(('pdf', 'docx'))
+        else:
+            kind = rng.choice(('txt', 'md'))
+        path = Path(directory) / f"team_{i % 20:02d}" / f"project_{i % 7}" / f"note_{i:05d}.{kind}"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        write_tree_file(path, rng)
+        paths.append(str(path))
+    return paths
+
+
+def write_tree_file(path, rng):
+    paragraphs = synthetic_paragraphs(rng, 4)
+    if path.suffix == '.pdf':
+        write_pdf(path, paragraphs)
+    elif path.suffix == '.docx':
+        write_docx(path, paragraphs)
+    else:
+        path.write_text("\n\n".join(paragraphs), encoding='utf-8')
+
+
+def bench_incremental(args):
+    from extract_cache import ExtractionCache
+    from manifest import Manifest, expand_inputs
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        tree = os.path.join(tmp, "tree")
+        start = time.perf_counter()
+        paths = write_tree(tree, args.files, rng)
+        print(f"wrote {len(paths)} files in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+        cache_dir = os.path.join(tmp, "cache")
+
+        def ingest(label, cached):
+            start = time.perf_counter()
+            sources, _ = expand_inputs([tree])
+            detail = ""
+            cache = None
+            if cached:
+                cache = ExtractionCache(cache_dir)
+                manifest = Manifest.for_inputs(cache_dir, [tree])
+                changes = manifest.update(sources, cache.digest)
+                detail = f"  {changes.summary()}"
+            texts = InputProcessor(cache=cache).process_sources(sources, jobs=args.jobs)
+            if cached:
+                manifest.save()
+                detail += f"; {cache.stats.misses} extracted, {cache.stats.hits} from the cache"
+            elapsed = time.perf_counter() - start
+            print(f"{label:<30} {elapsed:7.2f}s{detail}")
+            return texts
+
+        ingest("full run, no manifest", False)
+        ingest("first run with manifest", True)
+        ingest("re-run, nothing changed", True)
+
+        changed = rng.sample(paths, max(1, int(len(paths) * args.changed)))
+        for path in changed:
+            write_tree_file(Path(path), rng)
+        print(f"rewrote {len(changed)} files ({sum(p.endswith(('.pdf', '.docx')) for p in changed)} PDF/DOCX)")
+        incremental = ingest(f"re-run, {args.changed:.0%} changed", True)
+        full = ingest("full run, no manifest", False)
+        print(f"incremental text matches a full run: {incremental == full}")
+
+
+def needle(rng):
+    """A made-up fact with words found nowhere else, and the question it answers."""
+    name = "".join(rng.choice(("ka", "lo", "mer", "tu", "vin", "zor", "pa", "rel")) for _ in range(3))
+    code = rng.randint(1000, 9999)
+    return f"The maintenance code for the {name} turbine is {code}.", f"What is the maintenance code for the {name} turbine?"
+
+
+def zipf_text(rng, vocabulary, weights, words):
+    """Sentences of words drawn with the skewed frequencies of natural text."""
+    drawn = rng.choices(vocabulary, cum_weights=weights, k=words)
+    sentences = [" ".join(drawn[i:i + 15]).capitalize() + "." for i in range(0, words, 15)]
+    return " ".join(sentences)
+
+
+def write_corpus(directory, chunks, rng, queries, chunks_per_file=100, vocabulary_size=20000):
+    """
+    Text files of about `chunks` index chunks with a Zipf-distributed
+    vocabulary, and `queries` needles hidden in them.
+    """
+    syllables = ("ka", "lo", "mer", "tu", "vin", "zor", "pa", "rel", "an", "es", "ti", "mo", "ber", "gal", "un", "sa")
+    vocabulary = sorted({"".join(rng.choices(syllables, k=rng.randint(1, 4))) for _ in range(vocabulary_size)})
+    rng.shuffle(vocabulary)
+    weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(vocabulary))))
+    files = max(1, chunks // chunks_per_file)
+    placement = {}
+    for _ in range(queries):
+        placement.setdefault(rng.randrange(files), []).append(needle(rng))
+    questions = []
+    for i in range(files):
+        # A paragraph of 100 words makes about one chunk of 256 tokens
+        paragraphs = [zipf_text(rng, vocabulary, weights, 100) for _ in range(chunks_per_file)]
+        for fact, question in placement.get(i, ()):
+            n = rng.randrange(len(paragraphs))
+            paragraphs[n] += " " + fact
+            questions.append((question, f"note_{i:05d}.txt", fact))
+        Path(directory, f"note_{i:05d}.txt").write_text("\n\n".join(paragraphs), encoding="utf-8")
+    return questions
+
+
+def bench_index(args):
+    from chunking import Tokenizer
+    from vector_index import VectorIndex
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus = os.path.join(tmp, "corpus")
+        os.mkdir(corpus)
+        start = time.perf_counter()
+        questions = write_corpus(corpus, args.chunks, rng, args.queries)
+        sources = document_paths(corpus)
+        size = sum(os.path.getsize(source) for source in sources)
+        print(f"wrote {len(sources)} files ({size / 1e6:.0f} MB) in {time.perf_counter() - start:.1f}s",
+              file=sys.stderr)
+
+        from assignement_4 import index_sources
+        settings = argparse.Namespace(model=args.model, jobs=1, index_chunk_tokens=args.chunk_tokens)
+        index_dir = os.path.join(tmp, "index")
+        index = VectorIndex(index_dir, embedder=args.embedder)
+        start = time.perf_counter()
+        _, added, _ = index_sources(index, InputProcessor(), sources, settings)
+        elapsed = time.perf_counter() - start
+        print(f"build ({index.embedder.name}): {added:,} chunks in {elapsed:.1f}s ({added / elapsed:,.0f} chunks/s), "
+              f"vectors {os.path.getsize(index._vectors_path) / 1e6:.0f} MB")
+
+        start = time.perf_counter()
+        _, again, _ = index_sources(index, InputProcessor(), sources, settings)
+        print(f"re-run, nothing changed: {again} chunks embedded in {time.perf_counter() - start:.2f}s")
+
+        # Edited files leave their old chunks behind as deleted rows until compact() drops them
+        for source in rng.sample(sources, len(sources) * 3 // 10):
+            with open(source, "a", encoding="utf-8") as f:
+                f.write("\n\nEdited.\n")
+        start = time.perf_counter()
+        _, replaced, _ = index_sources(index, InputProcessor(), sources, settings)
+        elapsed = time.perf_counter() - start
+        deleted = len(index._deleted())
+        size = os.path.getsize(index._vectors_path)
+        start = time.perf_counter()
+        compacted = index.compact()
+        print(f"edit 30% of files: {replaced:,} chunks re-embedded in {elapsed:.1f}s, {deleted:,} deleted; "
+              f"compacted {compacted:,} in {time.perf_counter() - start:.1f}s, "
+              f"vectors {size / 1e6:.0f} -> {os.path.getsize(index._vectors_path) / 1e6:.0f} MB")
+        index.close()
+
+        tokenizer = Tokenizer(args.model)
+        full_tokens = sum(tokenizer.count(Path(source).read_text(encoding="utf-8")) for source in sources)
+        modes = ["exact"]
+        try:
+            import faiss  # noqa: F401
+            modes.append("hnsw")
+        except ImportError:
+            print("faiss not installed: skipping HNSW (pip install faiss-cpu)")
+        for mode in modes:
+            start = time.perf_counter()
+            index = VectorIndex(index_dir, ann=mode)
+            if mode == "hnsw":
+                index.build_ann()
+            opened = time.perf_counter() - start
+            latencies = []
+            found = 0
+            prompt_tokens = 0
+            for question, source, fact in questions:
+                start = time.perf_counter()
+                hits = index.search(question, args.top_k)
+                latencies.append(time.perf_counter() - start)
+                found += any(fact in text for _, _, _, text in hits)
+                prompt_tokens += sum(tokenizer.count(text) for _, _, _, text in hits)
+            latencies.sort()
+            p50 = latencies[len(latencies) // 2] * 1000
+            p95 = latencies[int(len(latencies) * 0.95)] * 1000
+            label = "open" if mode == "exact" else "open + build HNSW"
+            print(f"{mode:<6} {label} {opened:6.2f}s  query p50 {p50:6.2f} ms  p95 {p95:6.2f} ms  "
+                  f"recall@{args.top_k} {found / len(questions):.0%}")
+            index.close()
+        print(f"prompt: ~{prompt_tokens // len(questions):,} tokens of retrieved chunks instead of "
+              f"~{full_tokens:,} for all the content")
+
+
+def bench_ingest(args):
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.dir:
+            sources = document_paths(args.dir)
+        else:
+            start = time.perf_counter()
+            sources = make_documents(tmp, args.synthetic, args.seed, args.paragraphs)
+            print(f"wrote {len(sources)} documents in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+        server = None
+        if args.urls:
+            pages = {f"/page/{i}": html_page(rng, f"Page {i}") for i in range(args.urls)}
+            server, base = start_site(pages, args.latency)
+            # Interleave URLs with the files, as on a real command line
+            urls = [base + path for path in pages]
+            step = max(1, len(sources) // len(urls))
+            for n, url in enumerate(urls):
+                sources.insert(min(len(sources), n * (step + 1)), url)
+
+        size = sum(os.path.getsize(source) for source in sources if os.path.exists(source))
+        print(f"{len(sources)} inputs ({args.urls} URLs, {size / 1e6:.1f} MB of files)")
+        results = {}
+        for jobs in (1, args.jobs):
+            start = time.perf_counter()
+            results[jobs] = InputProcessor().process_sources(sources, jobs=jobs)
+            elapsed = time.perf_counter() - start
+            print(f"jobs={jobs:<3} {elapsed:6.2f}s  {len(sources) / elapsed:6.1f} inputs/s")
+        same = results[1] == results[args.jobs]
+        print(f"same text in the same order: {same}")
+        if server is not None:
+            server.shutdown()
+
+
+def write_text_file(path, size_mb, seed=0):
+    """A text file of about size_mb MB of prose, written 1 MB at a time."""
+    block = "\n\n".join(synthetic_paragraphs(random.Random(seed), 1500))
+    block = (block * (1 + (1 << 20) // len(block)))[:1 << 20]
+    with open(path, 'w', encoding='utf-8') as f:
+        for _ in range(size_mb):
+            f.write(block)
+
+
+def memory_run(mode, path, query):
+    """Run one input through the processor as main() does, up to the API call."""
+    import assignement_4
+
+    with open(os.devnull, 'w') as devnull:
+        if mode == "legacy":
+            # The original code: read() the file, += it onto the content, strip, format the prompt
+            with open(path, 'r', encoding='utf-8') as f:
+                text = f.read()
+            content = ""
+            content += text + "\n\n"
+            del text
+            full_content = content.strip()
+            del content
+            devnull.write(full_content[:500])
+            prompt = f"{query}\n\n{full_content}"
+            devnull.write(prompt)
+        else:
+            processor = assignement_4.InputProcessor()
+            for chunks in processor.iter_sources([path]):
+                processor.add_chunks(chunks)
+            devnull.write(processor.preview(500))
+            for chunk in processor.prompt_chunks(query):
+                devnull.write(chunk)
+            if mode == "request":
+                prompt = ''.join(processor.prompt_chunks(query))
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def bench_memory(args):
+    if args.run:
+        start = time.perf_counter()
+        peak = memory_run(args.run, args.file, args.query)
+        print(json.dumps({"peak": peak, "seconds": time.perf_counter() - start}))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.file
+        if path is None:
+            path = os.path.join(tmp, "large.txt")
+            write_text_file(path, args.size_mb, args.seed)
+        size = os.path.getsize(path)
+        print(f"input: {size / 2**20:.0f} MB text file")
+        labels = {
+            "legacy": "original (read, +=, strip, f-string)",
+            "streaming": "streaming, prompt printed",
+            "request": "streaming + one prompt string for the request",
+        }
+        for mode, label in labels.items():
+            # A fresh interpreter per mode, so each peak is its own
+            output = subprocess.run(
+                [sys.executable, __file__, "memory", "--run", mode, "--file", path],
+                capture_output=True, text=True
+            )
+            if output.returncode != 0:
+                print(f"{label:<48} failed: {output.stderr.strip().splitlines()[-1:]}")
+                continue
+            result = json.loads(output.stdout)
+            print(f"{label:<48} peak RSS {result['peak'] / 2**20:7.0f} MB "
+                  f"({result['peak'] / size:4.1f}x input)  {result['seconds']:6.1f}s")
+
+
+class StandInOpenAI(BaseHTTPRequestHandler):
+    """
+    OpenAI-compatible POST /v1/chat/completions. Tokens are counted as
+    characters / 4; prompts over the model's context are rejected with 400.
+    Answers take `latency` seconds plus `per_1k` seconds per 1000 prompt tokens,
+    then `token_delay` seconds per answer token; with "stream": true the
+    tokens are sent as server-sent events as they are "generated".
+    """
+
+    latency = 0.5
+    per_1k = 0.05
+    answer_tokens = 150
+    token_delay = 0.0
+    requests = 0
+    # Usage of the answered requests
+    prompt_tokens = 0
+    completion_tokens = 0
+    lock = threading.Lock()
+
+    def do_POST(self):
+        from chunking import model_info
+
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        with self.lock:
+            type(self).requests += 1
+        prompt_tokens = sum(len(message["content"]) for message in body["messages"]) // 4 + 8
+        max_tokens = body.get("max_tokens") or 1000
+        context = model_info(body["model"])["context"]
+        if prompt_tokens + max_tokens > context:
+            self._reply(400, {"error": {
+                "message": f"This model's maximum context length is {context} tokens. However, you requested "
+                           f"{prompt_tokens + max_tokens} tokens. Please reduce the length of the messages.",
+                "type": "invalid_request_error", "code": "context_length_exceeded"}})
+            return
+        time.sleep(self.latency + self.per_1k * prompt_tokens / 1000)
+        completion_tokens = min(max_tokens, self.answer_tokens)
+        with self.lock:
+            type(self).prompt_tokens += prompt_tokens
+            type(self).completion_tokens += completion_tokens
+        content = f"Answer for {prompt_tokens} prompt tokens. " + "Finding. " * (completion_tokens - 6)
+        if body.get("stream"):
+            self._stream(body["model"], content)
+            return
+        time.sleep(self.token_delay * completion_tokens)
+        self._reply(200, {
+            "id": "chatcmpl-standin", "object": "chat.completion", "created": int(time.time()), "model": body["model"],
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens},
+        })
+
+    def _stream(self, model, content):
+        """Server-sent events, one chunk per word, `token_delay` seconds apart."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        pieces = [{"role": "assistant", "content": ""}] + [{"content": word} for word in content.split(" ") if word]
+        pieces[2:] = [{"content": " " + piece["content"]} for piece in pieces[2:]]
+        for index, delta in enumerate(pieces + [{}]):
+            chunk = {"id": "chatcmpl-standin", "object": "chat.completion.chunk", "created": int(time.time()),
+                     "model": model, "choices": [{"index": 0, "delta": delta,
+                                                  "finish_reason": None if delta else "stop"}]}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+            if 0 < index < len(pieces):
+                time.sleep(self.token_delay)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def _reply(self, status, payload):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_openai(latency, per_1k, token_delay=0.0):
+    """Start the stand-in API and point call_llm_api at it; returns (server, handler class)."""
+    handler = type("OpenAI", (StandInOpenAI,), {"latency": latency, "per_1k": per_1k, "token_delay": token_delay,
+                                                "requests": 0})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ["OPENAI_API_KEY"] = "stand-in"
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{server.server_port}/v1"
+    os.environ["OPENAI_API_BASE"] = os.environ["OPENAI_BASE_URL"]
+    return server, handler
+
+
+def bench_mapreduce(args):
+    from assignement_4 import call_llm_api, print_estimate
+    from chunking import MapReduce
+
+    server, handler = start_openai(args.latency, args.per_1k)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "large.txt")
+        write_text_file(path, args.size_mb, args.seed)
+        processor = InputProcessor()
+        for chunks in processor.iter_sources([path]):
+            processor.add_chunks(chunks)
+        print(f"input: {args.size_mb} MB of text, model {args.model}")
+
+        # The original code: the whole content in one request
+        start = time.perf_counter()
+        try:
+            call_llm_api(''.join(processor.prompt_chunks(args.query)), args.model)
+            print(f"single request: answered in {time.perf_counter() - start:.1f}s")
+        except Exception as e:
+            print(f"single request: {str(e)[:110]}...")
+
+        for concurrency in (1, args.concurrency):
+            mapper = MapReduce(lambda prompt, max_tokens: call_llm_api(prompt, args.model, max_tokens),
+                               args.model, args.query, max_tokens=args.max_tokens, concurrency=concurrency)
+            start = time.perf_counter()
+            sizes = mapper.plan(processor.content_chunks())
+            plan_s = time.perf_counter() - start
+            if concurrency == 1:
+                print_estimate(mapper, mapper.estimate(sizes))
+                print(f"(planned in {plan_s:.2f}s)\n")
+            handler.requests = 0
+            start = time.perf_counter()
+            answer = mapper.run(processor.content_chunks(), len(sizes))
+            elapsed = time.perf_counter() - start
+            print(f"map-reduce, concurrency {concurrency:<3} {elapsed:6.1f}s  {handler.requests} requests  "
+                  f"{len(sizes) / elapsed:5.1f} chunks/s  answer: {answer[:40]!r}")
+    server.shutdown()
+
+
+def bench_cache(args):
+    from extract_cache import ExtractionCache
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.dir:
+            sources = [path for path in document_paths(args.dir) if path.lower().endswith(('.pdf', '.docx'))]
+        else:
+            start = time.perf_counter()
+            rng = random.Random(args.seed)
+            sources = []
+            for i in range(args.pdfs):
+                path = os.path.join(tmp, f"report_{i:04d}.pdf")
+                write_pdf(path, synthetic_paragraphs(rng, args.paragraphs))
+                sources.append(path)
+            print(f"wrote {len(sources)} PDFs in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+        size = sum(os.path.getsize(source) for source in sources)
+        print(f"{len(sources)} documents, {size / 1e6:.1f} MB")
+
+        cache_dir = os.path.join(tmp, "cache")
+        runs = [("no cache", None), ("first run (extract + store)", "cold"),
+                ("second run (size+mtime match)", "warm"), ("after touching every file (hash)", "touched")]
+        texts = {}
+        for label, mode in runs:
+            if mode == "touched":
+                for source in sources:
+                    os.utime(source)
+            cache = ExtractionCache(cache_dir) if mode else None
+            start = time.perf_counter()
+            texts[label] = InputProcessor(cache=cache).process_sources(sources, jobs=args.jobs)
+            elapsed = time.perf_counter() - start
+            detail = ""
+            if cache is not None:
+                detail = f"  {cache.stats.hits} hits, {cache.stats.misses} misses, {cache.stats.hashed} hashed"
+            print(f"{label:<34} {elapsed:7.2f}s  {len(sources) / elapsed:8.1f} docs/s{detail}")
+        same = all(result == texts["no cache"] for result in texts.values())
+        print(f"same text every run: {same}")
+
+
+def write_large_pdf(path, pages, seed=0):
+    """A PDF of `pages` pages: one generated section of 50 pages, repeated (needs pypdf)."""
+    from pypdf import PdfReader, PdfWriter
+
+    section = Path(path).with_suffix(".section.pdf")
+    # About 5 paragraphs per page
+    write_pdf(section, synthetic_paragraphs(random.Random(seed), 250))
+    reader = PdfReader(section)
+    writer = PdfWriter()
+    while len(writer.pages) < pages:
+        for page in reader.pages[:pages - len(writer.pages)]:
+            writer.add_page(page)
+    with open(path, "wb") as f:
+        writer.write(f)
+    section.unlink()
+
+
+def legacy_pdf_text(path):
+    """PDF extraction before page-parallel backends: PyPDF2, one page after another."""
+    import PyPDF2
+
+    with open(path, 'rb') as f:
+        return '\n'.join(page.extract_text() for page in PyPDF2.PdfReader(f).pages)
+
+
+def bench_pdf(args):
+    from pdf_extract import available_backends, iter_pdf_pages, parse_pages
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.file
+        if path is None:
+            path = os.path.join(tmp, "large.pdf")
+            start = time.perf_counter()
+            write_large_pdf(path, args.pages, args.seed)
+            print(f"wrote a {args.pages}-page PDF in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+        print(f"{path}: {os.path.getsize(path) / 1e6:.1f} MB, {os.cpu_count()} CPU(s)")
+
+        def run(label, extract):
+            start = time.perf_counter()
+            text = extract()
+            elapsed = time.perf_counter() - start
+            print(f"{label:<34} {elapsed:7.2f}s  {len(text.split()):>9,} words")
+            return elapsed
+
+        baseline = run("legacy PyPDF2, sequential", lambda: legacy_pdf_text(path))
+        for backend in available_backends():
+            for workers in sorted({1, args.workers}):
+                elapsed = run(f"{backend}, {workers} worker(s)",
+                              lambda: '\n'.join(iter_pdf_pages(path, backend=backend, workers=workers)))
+                print(f"{'':<34} {baseline / elapsed:6.1f}x legacy")
+        selection = parse_pages(args.select)
+        run(f"auto, --pages {args.select}", lambda: '\n'.join(iter_pdf_pages(path, selection, workers=args.workers)))
+
+
+def replay_workload(rng, requests, distinct, paragraphs):
+    """
+    Prompts as a pipeline sends them: `distinct` different (query, content)
+    pairs, repeated with a skewed popularity to `requests` in total.
+    """
+    queries = ["Summarize the following text:", "List the key points:", "Extract every number mentioned:"]
+    prompts = [f"{rng.choice(queries)}\n\n" + "\n\n".join(synthetic_paragraphs(rng, paragraphs))
+               for _ in range(distinct)]
+    weights = [1 / (rank + 1) for rank in range(distinct)]
+    return prompts + rng.choices(prompts, weights=weights, k=requests - distinct)
+
+
+def bench_responses(args):
+    from assignement_4 import call_llm_api
+    from chunking import request_cost
+    from concurrent.futures import ThreadPoolExecutor
+    from response_cache import ResponseCache
+
+    rng = random.Random(args.seed)
+    workload = replay_workload(rng, args.requests, args.distinct, args.paragraphs)
+    rng.shuffle(workload)
+    server, handler = start_openai(args.latency, args.per_1k)
+    print(f"{len(workload)} requests, {len(set(workload))} distinct, {args.concurrency} at a time, "
+          f"model {args.model}, temperature {args.temperature}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        runs = [("no cache", None), ("first run (empty cache)", "cold"), ("replay (warm cache)", "warm"),
+                (f"replay at temperature {args.temperature or 0.7} (bypassed)", "sampled")]
+        answers = {}
+        for label, mode in runs:
+            cache = ResponseCache(tmp) if mode else None
+            temperature = (args.temperature or 0.7) if mode == "sampled" else args.temperature
+            handler.requests = handler.prompt_tokens = handler.completion_tokens = 0
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+                answers[label] = list(executor.map(
+                    lambda prompt: call_llm_api(prompt, args.model, args.max_tokens, temperature, cache=cache),
+                    workload))
+            elapsed = time.perf_counter() - start
+            cost = request_cost(args.model, handler.prompt_tokens, handler.completion_tokens) or 0.0
+            detail = ""
+            if cache is not None:
+                detail = f"  {cache.stats.hits} hits, {cache.stats.deduplicated} deduplicated"
+            print(f"{label:<44} {elapsed:6.1f}s  {handler.requests:4d} API requests  ${cost:.4f}{detail}")
+        same = answers["no cache"] == answers["first run (empty cache)"] == answers["replay (warm cache)"]
+        print(f"same answers with and without the cache: {same}")
+    server.shutdown()
+
+
+def bench_stream(args):
+    from assignement_4 import call_llm_api, stream_llm_api
+
+    server, handler = start_openai(args.latency, 0.0, args.token_delay)
+    handler.answer_tokens = args.answer_tokens
+    prompt = "Summarize the following text:\n\n" + "\n\n".join(synthetic_paragraphs(random.Random(args.seed), 20))
+    print(f"stand-in API: {args.latency}s before the first token, then {args.token_delay * 1000:.0f} ms per token, "
+          f"{args.answer_tokens} tokens")
+
+    start = time.perf_counter()
+    answer = call_llm_api(prompt, args.model, args.max_tokens)
+    elapsed = time.perf_counter() - start
+    print(f"{'call_llm_api (whole answer)':<30} first output {elapsed:6.2f}s  done {elapsed:6.2f}s")
+
+    start = time.perf_counter()
+    first = None
+    pieces = []
+    for piece in stream_llm_api(prompt, args.model, args.max_tokens):
+        if first is None:
+            first = time.perf_counter() - start
+        pieces.append(piece)
+    elapsed = time.perf_counter() - start
+    print(f"{'stream_llm_api':<30} first output {first:6.2f}s  done {elapsed:6.2f}s  {len(pieces)} pieces")
+    print(f"same answer: {''.join(pieces) == answer}")
+
+    # The command line tool, watching the output file grow while it runs
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "input.txt")
+        Path(source).write_text(prompt, encoding="utf-8")
+        for output in ("answer.txt", "answer.docx"):
+            output = os.path.join(tmp, output)
+            start = time.perf_counter()
+            process = subprocess.Popen(
+                [sys.executable, str(Path(__file__).with_name("assignement_4.py")), source, "--stream",
+                 "--output", output, "--model", args.model, "--no-cache"],
+                stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+            )
+            first_write = None
+            while process.poll() is None:
+                if first_write is None and os.path.exists(output) and os.path.getsize(output) > 0:
+                    first_write = time.perf_counter() - start
+                time.sleep(0.01)
+            elapsed = time.perf_counter() - start
+            stdout, stderr = process.communicate()
+            if process.returncode != 0:
+                print(f"{Path(output).name}: failed: {stderr.strip()}")
+                continue
+            report = [line for line in stdout.splitlines() if "first token after" in line]
+            first_write = f"{first_write:.2f}s" if first_write is not None else "at the end"
+            print(f"--stream --output {Path(output).name:<12} {elapsed:6.2f}s, output file first written "
+                  f"{first_write}; {report[0] if report else ''}")
+    server.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Input processor benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    ingest = sub.add_parser("ingest", help="Sequential vs concurrent extraction of many inputs")
+    source = ingest.add_mutually_exclusive_group(required=True)
+    source.add_argument("--dir", help="Directory of sample documents (.pdf, .docx, .txt, .md, .csv)")
+    source.add_argument("--synthetic", type=int, help="Generate this many documents")
+    ingest.add_argument("--paragraphs", type=int, default=120, help="Paragraphs per synthetic PDF")
+    ingest.add_argument("--urls", type=int, default=0, help="Also fetch this many pages from a local server")
+    ingest.add_argument("--latency", type=float, default=0.2, help="Seconds per page request")
+    ingest.add_argument("--jobs", type=int, default=8)
+    ingest.add_argument("--seed", type=int, default=0)
+    ingest.set_defaults(func=bench_ingest)
+
+    memory = sub.add_parser("memory", help="Peak memory for one large text input, before and after")
+    memory.add_argument("--size-mb", type=int, default=1024)
+    memory.add_argument("--file", help="Use this text file instead of generating one")
+    memory.add_argument("--query", default="Summarize the following text:")
+    memory.add_argument("--run", choices=["legacy", "streaming", "request"], help=argparse.SUPPRESS)
+    memory.add_argument("--seed", type=int, default=0)
+    memory.set_defaults(func=bench_memory)
+
+    mapreduce = sub.add_parser("mapreduce", help="Chunked map-reduce querying against a stand-in OpenAI API")
+    mapreduce.add_argument("--size-mb", type=int, default=4)
+    mapreduce.add_argument("--model", default="gpt-3.5-turbo")
+    mapreduce.add_argument("--query", default="Summarize the following text:")
+    mapreduce.add_argument("--max-tokens", type=int, default=1000)
+    mapreduce.add_argument("--concurrency", type=int, default=8)
+    mapreduce.add_argument("--latency", type=float, default=0.5, help="Seconds per request")
+    mapreduce.add_argument("--per-1k", type=float, default=0.05, help="Extra seconds per 1000 prompt tokens")
+    mapreduce.add_argument("--seed", type=int, default=0)
+    mapreduce.set_defaults(func=bench_mapreduce)
+
+    cache = sub.add_parser("cache", help="Extraction cache: first vs repeated runs over many PDFs")
+    source = cache.add_mutually_exclusive_group()
+    source.add_argument("--dir", help="Directory of sample PDF/DOCX documents")
+    source.add_argument("--pdfs", type=int, default=200, help="Generate this many PDFs")
+    cache.add_argument("--paragraphs", type=int, default=40, help="Paragraphs per generated PDF")
+    cache.add_argument("--jobs", type=int, default=1)
+    cache.add_argument("--seed", type=int, default=0)
+    cache.set_defaults(func=bench_cache)
+
+    pdf = sub.add_parser("pdf", help="PDF backends and page-parallel extraction on one large PDF")
+    pdf.add_argument("--file", help="Use this PDF instead of generating one")
+    pdf.add_argument("--pages", type=int, default=1000, help="Pages of the generated PDF")
+    pdf.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    pdf.add_argument("--select", default="1-50,500-", help="Page selection for the --pages run")
+    pdf.add_argument("--seed", type=int, default=0)
+    pdf.set_defaults(func=bench_pdf)
+
+    responses = sub.add_parser("responses", help="LLM response cache over a replayed workload")
+    responses.add_argument("--requests", type=int, default=400)
+    responses.add_argument("--distinct", type=int, default=80, help="Different prompts in the workload")
+    responses.add_argument("--paragraphs", type=int, default=20, help="Paragraphs of content per prompt")
+    responses.add_argument("--model", default="gpt-4o")
+    responses.add_argument("--max-tokens", type=int, default=500)
+    responses.add_argument("--temperature", type=float, default=0.0)
+    responses.add_argument("--concurrency", type=int, default=8)
+    responses.add_argument("--latency", type=float, default=0.5, help="Seconds per request")
+    responses.add_argument("--per-1k", type=float, default=0.05, help="Extra seconds per 1000 prompt tokens")
+    responses.add_argument("--seed", type=int, default=0)
+    responses.set_defaults(func=bench_responses)
+
+    stream = sub.add_parser("stream", help="Streamed vs whole answers from a stand-in SSE API")
+    stream.add_argument("--model", default="gpt-4o")
+    stream.add_argument("--max-tokens", type=int, default=1000)
+    stream.add_argument("--answer-tokens", type=int, default=400)
+    stream.add_argument("--latency", type=float, default=0.5, help="Seconds before the first token")
+    stream.add_argument("--token-delay", type=float, default=0.02, help="Seconds per answer token")
+    stream.add_argument("--seed", type=int, default=0)
+    stream.set_defaults(func=bench_stream)
+
+    crawl = sub.add_parser("crawl", help="Crawl a local stand-in site: pages/s by concurrency and delay")
+    crawl.add_argument("--site-pages", type=int, default=300)
+    crawl.add_argument("--depth", type=int, default=3)
+    crawl.add_argument("--max-pages", type=int, default=1000)
+    crawl.add_argument("--concurrency", type=int, default=8)
+    crawl.add_argument("--delay", type=float, default=0.05, help="Seconds between requests for the throttled run")
+    crawl.add_argument("--latency", type=float, default=0.1, help="Seconds per request")
+    crawl.add_argument("--seed", type=int, default=0)
+    crawl.set_defaults(func=bench_crawl)
+
+    incremental = sub.add_parser("incremental", help="Directory input re-runs with the manifest after a few changes")
+    incremental.add_argument("--files", type=int, default=10000)
+    incremental.add_argument("--changed", type=float, default=0.01, help="Share of files rewritten")
+    incremental.add_argument("--jobs", type=int, default=1)
+    incremental.add_argument("--seed", type=int, default=0)
+    incremental.set_defaults(func=bench_incremental)
+
+    index = sub.add_parser("index", help="Vector index build time and query latency")
+    index.add_argument("--chunks", type=int, default=100000, help="About this many chunks of generated text")
+    index.add_argument("--queries", type=int, default=200, help="Questions, each answered by one hidden fact")
+    index.add_argument("--chunk-tokens", type=int, default=256)
+    index.add_argument("--top-k", type=int, default=8)
+    index.add_argument("--embedder", default="auto")
+    index.add_argument("--model", default="gpt-3.5-turbo", help="Model whose tokenizer sizes the chunks")
+    index.add_argument("--seed", type=int, default=0)
+    index.set_defaults(func=bench_index)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
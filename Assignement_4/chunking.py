@@ -0,0 +1,293 @@
+"""
+Token-aware chunking and map-reduce querying for inputs larger than the
+model's context window.
+
+The content is split on paragraph boundaries, then sentences, then raw
+tokens, into chunks of at most `chunk_tokens` tokens. Consecutive chunks
+share up to `overlap` tokens of trailing paragraphs/sentences. The query
+runs on every chunk concurrently (map), and the partial answers are
+combined by further requests (reduce), in several rounds if they do not fit
+in one.
+
+Token counts come from tiktoken when the model's encoding is available. If
+tiktoken is missing, or its encoding files cannot be downloaded, counts are
+estimated from the text length (about 4 characters per token), which is
+close for English prose.
+"""
+
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Context window and USD price per 1M input/output tokens
+MODELS = {
+    "gpt-3.5-turbo": {"context": 16385, "input": 0.50, "output": 1.50},
+    "gpt-4": {"context": 8192, "input": 30.00, "output": 60.00},
+    "gpt-4-turbo": {"context": 128000, "input": 10.00, "output": 30.00},
+    "gpt-4o": {"context": 128000, "input": 2.50, "output": 10.00},
+    "gpt-4o-mini": {"context": 128000, "input": 0.15, "output": 0.60},
+}
+DEFAULT_CONTEXT = 4096
+CHARS_PER_TOKEN = 4
+# Tokens per message the chat format adds around the content
+MESSAGE_OVERHEAD = 8
+
+MAP_TEMPLATE = """{query}
+
+The input is too long for one request, so it is given in {total} parts. This is part {index}. Answer from this part only; say so briefly if it holds nothing relevant.
+
+{chunk}"""
+REDUCE_TEMPLATE = """{query}
+
+The input was too long for one request. Below are the answers for each of its parts, in order. Combine them into one complete answer, removing repetition.
+
+{answers}"""
+
+PARAGRAPH_BREAK = re.compile(r"\n[ \t]*\n\s*")
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+# A paragraph longer than this is cut at a sentence end (or space) while reading
+MAX_PARAGRAPH_CHARS = 64 * 1024
+
+
+def model_info(model):
+    """Context size and prices for a model name, matching dated variants by prefix."""
+    for name in sorted(MODELS, key=len, reverse=True):
+        if model == name or model.startswith(name + "-"):
+            return MODELS[name]
+    return {"context": DEFAULT_CONTEXT, "input": None, "output": None}
+
+
+class Tokenizer:
+    """Token counting with tiktoken, or an estimate from the text length."""
+
+    def __init__(self, model):
+        self.encoding = None
+        try:
+            import tiktoken
+            try:
+                self.encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                self.encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            # Not installed, or the encoding could not be downloaded
+            self.encoding = None
+
+    @property
+    def exact(self):
+        return self.encoding is not None
+
+    def count(self, text):
+        if self.encoding is not None:
+            return len(self.encoding.encode(text, disallowed_special=()))
+        return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+    def split(self, text, max_tokens):
+        """Cut text into pieces of at most max_tokens tokens, ignoring sentence boundaries."""
+        if self.encoding is not None:
+            tokens = self.encoding.encode(text, disallowed_special=())
+            return [self.encoding.decode(tokens[i:i + max_tokens]) for i in range(0, len(tokens), max_tokens)]
+        size = max_tokens * CHARS_PER_TOKEN
+        return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def paragraphs(chunks):
+    """Paragraphs from a stream of text chunks, without holding more than one paragraph."""
+    carry = ""
+    for chunk in chunks:
+        parts = PARAGRAPH_BREAK.split(carry + chunk)
+        carry = parts.pop()
+        for part in parts:
+            if part.strip():
+                yield part
+        while len(carry) > MAX_PARAGRAPH_CHARS:
+            # No paragraph break in sight: cut at the last sentence end, else the last space
+            head = carry[:MAX_PARAGRAPH_CHARS]
+            cut = max((m.end() for m in SENTENCE_END.finditer(head)), default=0) or head.rfind(" ") + 1
+            cut = cut or MAX_PARAGRAPH_CHARS
+            yield carry[:cut]
+            carry = carry[cut:]
+    if carry.strip():
+        yield carry
+
+
+def _pieces(paragraph, tokenizer, max_tokens):
+    """(separator, text, tokens) pieces of one paragraph, none over max_tokens."""
+    tokens = tokenizer.count(paragraph)
+    if tokens <= max_tokens:
+        return [("\n\n", paragraph, tokens)]
+    pieces = []
+    for sentence in SENTENCE_END.split(paragraph):
+        if not sentence:
+            continue
+        sep = "\n\n" if not pieces else " "
+        tokens = tokenizer.count(sentence)
+        if tokens <= max_tokens:
+            pieces.append((sep, sentence, tokens))
+            continue
+        for i, part in enumerate(tokenizer.split(sentence, max_tokens)):
+            pieces.append((sep if i == 0 else "", part, tokenizer.count(part)))
+    return pieces
+
+
+def split_text(chunks, tokenizer, chunk_tokens, overlap=0):
+    """
+    Yield (text, tokens) chunks of at most chunk_tokens tokens from a stream
+    of text, breaking at paragraphs, then sentences. Each chunk starts with
+    up to `overlap` tokens of the end of the previous one.
+    """
+    current = []
+    size = 0
+    for paragraph in paragraphs(chunks):
+        for piece in _pieces(paragraph, tokenizer, chunk_tokens):
+            if current and size + piece[2] + 1 > chunk_tokens:
+                yield _join(current), size
+                current = _overlap(current, tokenizer, min(overlap, chunk_tokens - piece[2] - 2))
+                size = sum(tokens + 1 for _, _, tokens in current) - 1 if current else 0
+            current.append(piece)
+            size += piece[2] + (1 if len(current) > 1 else 0)
+    if current:
+        yield _join(current), size
+
+
+def _overlap(pieces, tokenizer, budget):
+    """The trailing pieces (or sentences of the last one that does not fit) within budget tokens."""
+    kept = []
+    used = 0
+    for sep, text, tokens in reversed(pieces):
+        if used + tokens + 1 <= budget:
+            kept.insert(0, (sep, text, tokens))
+            used += tokens + 1
+            continue
+        # Take the closing sentences of this piece instead
+        sentences = SENTENCE_END.split(text)
+        tail = []
+        for sentence in reversed(sentences[1:]):
+            sentence_tokens = tokenizer.count(sentence)
+            if used + sentence_tokens + 1 > budget:
+                break
+            tail.insert(0, (" ", sentence, sentence_tokens))
+            used += sentence_tokens + 1
+        if tail:
+            tail[0] = ("\n\n", tail[0][1], tail[0][2])
+        kept[:0] = tail
+        break
+    return kept
+
+
+def _join(pieces):
+    return pieces[0][1] + "".join(sep + text for sep, text, _ in pieces[1:])
+
+
+def request_cost(model, input_tokens, output_tokens):
+    """USD for one request, or None for models without known prices."""
+    info = model_info(model)
+    if info["input"] is None:
+        return None
+    return (input_tokens * info["input"] + output_tokens * info["output"]) / 1e6
+
+
+class MapReduce:
+    """
+    Run a query over content that does not fit in one request.
+
+    `call(prompt, max_tokens)` sends one prompt and returns the answer text;
+    it is called from `concurrency` threads at once.
+    """
+
+    def __init__(self, call, model, query, max_tokens=1000, chunk_tokens=None, overlap=200, concurrency=4):
+        self.call = call
+        self.model = model
+        self.query = query
+        self.max_tokens = max_tokens
+        self.concurrency = max(1, concurrency)
+        self.tokenizer = Tokenizer(model)
+        self.context = model_info(model)["context"]
+        self.query_tokens = self.tokenizer.count(MAP_TEMPLATE.format(query=query, total=0, index=0, chunk=""))
+        if chunk_tokens is None:
+            # Whatever the context leaves after the instructions and the answer, less 5% for estimate error
+            chunk_tokens = int((self.context - self.max_tokens - self.query_tokens - MESSAGE_OVERHEAD) * 0.95)
+        if chunk_tokens < 100:
+            raise ValueError(f"No room for content: context {self.context}, max_tokens {max_tokens}")
+        self.chunk_tokens = chunk_tokens
+        self.overlap = min(overlap, chunk_tokens // 4)
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def chunks(self, content_chunks):
+        return split_text(content_chunks, self.tokenizer, self.chunk_tokens, self.overlap)
+
+    def plan(self, content_chunks):
+        """Token counts of the chunks the content splits into (the text is not kept)."""
+        return [tokens for _, tokens in self.chunks(content_chunks)]
+
+    def estimate(self, chunk_sizes):
+        """Requests, tokens and cost (USD, or None for unknown models) at most max_tokens per answer."""
+        total = len(chunk_sizes)
+        if total <= 1:
+            input_tokens = sum(chunk_sizes) + self.tokenizer.count(self.query) + 1 + MESSAGE_OVERHEAD
+            return {"chunks": total, "requests": 1, "input_tokens": input_tokens, "output_tokens": self.max_tokens,
+                    "cost": request_cost(self.model, input_tokens, self.max_tokens), "exact": self.tokenizer.exact}
+        input_tokens = sum(chunk_sizes) + total * (self.query_tokens + MESSAGE_OVERHEAD)
+        requests = total
+        answers = total
+        while answers > 1:
+            groups = -(-answers // self._reduce_fan_in())
+            input_tokens += answers * (self.max_tokens + 8) + groups * (self.query_tokens + MESSAGE_OVERHEAD)
+            requests += groups
+            answers = groups
+        output_tokens = requests * self.max_tokens
+        return {"chunks": total, "requests": requests, "input_tokens": input_tokens, "output_tokens": output_tokens,
+                "cost": request_cost(self.model, input_tokens, output_tokens), "exact": self.tokenizer.exact}
+
+    def _reduce_fan_in(self):
+        # Answers of up to max_tokens each that fit in one reduce request
+        return max(2, (self.context - self.max_tokens - self.query_tokens - MESSAGE_OVERHEAD)
+                   // (self.max_tokens + 8))
+
+    def run(self, content_chunks, total, progress=None, final=None):
+        """
+        Map the query over the chunks of the content, then reduce the answers
+        to one. `total` is the number of chunks from plan(); content that fits
+        in one chunk should be sent as a single ordinary request instead.
+        `final(prompt)`, if given, sends the last reduce request instead of
+        `call` (e.g. to stream the answer) and returns its answer.
+        """
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            futures = []
+            for index, (chunk, _) in enumerate(self.chunks(content_chunks), start=1):
+                prompt = MAP_TEMPLATE.format(query=self.query, total=total, index=index, chunk=chunk)
+                futures.append(executor.submit(self._call, prompt))
+                # Keep a bounded number of chunk texts queued
+                if len(futures) - self.concurrency * 2 > 0:
+                    futures[-self.concurrency * 2 - 1].result()
+            answers = []
+            for future in futures:
+                answers.append(future.result())
+                if progress:
+                    progress("map", len(answers), len(futures))
+            return self._reduce(executor, answers, progress, final)
+
+    def _call(self, prompt):
+        with self._lock:
+            self.requests += 1
+        return self.call(prompt, self.max_tokens)
+
+    def _reduce(self, executor, answers, progress=None, final=None):
+        while len(answers) > 1:
+            fan_in = self._reduce_fan_in()
+            groups = [answers[i:i + fan_in] for i in range(0, len(answers), fan_in)]
+            prompts = [
+                REDUCE_TEMPLATE.format(
+                    query=self.query,
+                    answers="\n\n".join(f"Part {start + n + 1}:\n{answer}" for n, answer in enumerate(group)),
+                )
+                for start, group in zip(range(0, len(answers), fan_in), groups)
+            ]
+            if final is not None and len(prompts) == 1:
+                with self._lock:
+                    self.requests += 1
+                return final(prompts[0])
+            answers = list(executor.map(self._call, prompts))
+            if progress:
+                progress("reduce", len(groups), len(groups))
+        return answers[0]
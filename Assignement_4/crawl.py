@@ -0,0 +1,226 @@
+"""
+Crawl a site from a start URL and extract the text of its pages.
+
+Links are followed breadth first up to `max_depth` clicks from the start
+page, staying on the host the start page ends up on after redirects.
+Pages are fetched by a pool of threads sharing the processor's connection
+pool, at most one request per `delay` seconds per host (or the robots.txt
+Crawl-delay, if longer), and only where robots.txt allows. URLs are compared in canonical form (lower
+case host, no default port, fragment or tracking parameters, sorted query)
+and a page's <link rel="canonical"> counts too, so each page is extracted
+once.
+
+Text is yielded page by page in the order the pages were discovered while
+the following pages are still being fetched.
+"""
+
+import posixpath
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+from urllib.robotparser import RobotFileParser
+
+USER_AGENT = "LLMInputProcessor/1.0 (+crawl)"
+DEFAULT_PORTS = {"http": 80, "https": 443}
+TRACKING_PARAMS = ("utm_", "fbclid", "gclid")
+SKIPPED_SUFFIXES = (".pdf", ".zip", ".gz", ".png", ".jpg", ".jpeg", ".gif", ".svg", ".css", ".js", ".mp4", ".mp3")
+
+
+def canonical_url(url):
+    """A normalized form of url for deduplication, or None if it is not http(s)."""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    if scheme not in DEFAULT_PORTS or not parts.hostname:
+        return None
+    host = parts.hostname.lower()
+    if parts.port and parts.port != DEFAULT_PORTS[scheme]:
+        host = f"{host}:{parts.port}"
+    path = parts.path or "/"
+    trailing = path.endswith("/")
+    path = posixpath.normpath(path)
+    if path.startswith("//"):
+        path = "/" + path.lstrip("/")
+    if trailing and path != "/":
+        path += "/"
+    query = urlencode(sorted((key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+                             if not key.lower().startswith(TRACKING_PARAMS)))
+    return urlunsplit((scheme, host, path, query, ""))
+
+
+def page_text(soup):
+    """The visible text of a parsed HTML page, whitespace collapsed."""
+    # Remove script and style elements
+    for script in soup(["script", "style"]):
+        script.decompose()
+
+    # Get text and clean it up
+    text = soup.get_text()
+    lines = (line.strip() for line in text.splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    return ' '.join(chunk for chunk in chunks if chunk)
+
+
+class HostThrottle:
+    """Spaces requests to the same host at least `delay` seconds apart."""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self._next = {}
+        self._lock = threading.Lock()
+
+    def wait(self, host, delay=None):
+        delay = self.delay if delay is None else max(self.delay, delay)
+        if delay <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next.get(host, now))
+            self._next[host] = start + delay
+        if start > now:
+            time.sleep(start - now)
+
+
+class Crawler:
+    """Breadth-first crawl of one site with a shared requests session."""
+
+    def __init__(self, session, max_depth=1, max_pages=100, concurrency=8, delay=0.0,
+                 respect_robots=True, user_agent=USER_AGENT, timeout=10):
+        self.session = session
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.concurrency = max(1, concurrency)
+        self.throttle = HostThrottle(delay)
+        self.respect_robots = respect_robots
+        self.user_agent = user_agent
+        self.timeout = timeout
+        self._robots = {}
+        self._robots_lock = threading.Lock()
+        self.fetched = 0
+        self.skipped = {"robots": 0, "duplicate": 0, "off site": 0, "error": 0, "not html": 0}
+
+    def _host(self, url):
+        return urlsplit(url).netloc
+
+    def robots(self, url):
+        """The robots.txt rules for url's host (fetched once per host), or None."""
+        if not self.respect_robots:
+            return None
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        with self._robots_lock:
+            if origin not in self._robots:
+                parser = RobotFileParser(origin + "/robots.txt")
+                try:
+                    response = self.session.get(parser.url, timeout=self.timeout,
+                                                headers={"User-Agent": self.user_agent})
+                    if response.status_code in (401, 403):
+                        parser.disallow_all = True
+                    elif response.status_code >= 400:
+                        parser.allow_all = True
+                    else:
+                        parser.parse(response.text.splitlines())
+                except Exception:
+                    # Unreachable robots.txt: nothing is forbidden
+                    parser.allow_all = True
+                self._robots[origin] = parser
+            return self._robots[origin]
+
+    def allowed(self, url):
+        robots = self.robots(url)
+        return robots is None or robots.can_fetch(self.user_agent, url)
+
+    def fetch(self, url, depth):
+        """(canonical URL, text, links) of one page; text None if it is skipped."""
+        from bs4 import BeautifulSoup
+
+        robots = self.robots(url)
+        self.throttle.wait(self._host(url), robots.crawl_delay(self.user_agent) if robots is not None else None)
+        response = self.session.get(url, timeout=self.timeout, headers={"User-Agent": self.user_agent})
+        response.raise_for_status()
+        if "html" not in response.headers.get("Content-Type", "text/html"):
+            return canonical_url(response.url), None, []
+
+        soup = BeautifulSoup(response.content, 'html.parser')
+        canonical = canonical_url(response.url)
+        link = soup.find("link", rel="canonical", href=True)
+        if link is not None:
+            declared = canonical_url(urljoin(response.url, link["href"]))
+            if declared and self._host(declared) == self._host(canonical):
+                canonical = declared
+        links = []
+        if depth < self.max_depth:
+            for anchor in soup.find_all("a", href=True):
+                href = anchor["href"]
+                if anchor.get("rel") and "nofollow" in anchor["rel"]:
+                    continue
+                target = canonical_url(urljoin(response.url, href))
+                if target and not urlsplit(target).path.lower().endswith(SKIPPED_SUFFIXES):
+                    links.append(target)
+        return canonical, page_text(soup), links
+
+    def crawl(self, start_url):
+        """Yield (url, text) for each page reached from start_url, in discovery order."""
+        start = canonical_url(start_url)
+        if start is None:
+            raise ValueError(f"Not an http(s) URL: {start_url}")
+        # The start page's final host, once it is fetched (example.com may redirect to www.example.com)
+        site = None
+        seen = {start}
+        done = set()
+        queued = 0
+
+        executor = ThreadPoolExecutor(max_workers=self.concurrency)
+        pending = deque()
+
+        def enqueue(url, depth):
+            nonlocal queued
+            if queued >= self.max_pages:
+                return
+            if not self.allowed(url):
+                self.skipped["robots"] += 1
+                return
+            queued += 1
+            pending.append((url, executor.submit(self.fetch, url, depth), depth))
+
+        try:
+            enqueue(start, 0)
+            if not pending:
+                raise ValueError(f"robots.txt does not allow crawling {start_url}")
+            while pending:
+                url, future, depth = pending.popleft()
+                try:
+                    canonical, text, links = future.result()
+                except Exception:
+                    self.skipped["error"] += 1
+                    if url == start:
+                        raise
+                    continue
+                self.fetched += 1
+                if url == start:
+                    if canonical is None:
+                        raise ValueError(f"{start_url} redirects to a page that is not http(s)")
+                    if text is None:
+                        raise ValueError(f"{start_url} is not an HTML page")
+                    site = self._host(canonical)
+                if canonical is None or self._host(canonical) != site:
+                    self.skipped["off site"] += 1
+                    continue
+                if canonical in done:
+                    # An alias of a page already extracted
+                    self.skipped["duplicate"] += 1
+                    continue
+                done.add(canonical)
+                seen.add(canonical)
+                for link in links:
+                    if link not in seen and self._host(link) == site:
+                        seen.add(link)
+                        enqueue(link, depth + 1)
+                if text is None:
+                    self.skipped["not html"] += 1
+                    continue
+                yield canonical, text
+        finally:
+            # Stopped early: do not fetch the rest
+            executor.shutdown(wait=False, cancel_futures=True)
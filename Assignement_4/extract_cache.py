@@ -0,0 +1,177 @@
+"""
+Persistent cache of extracted text for documents that are slow to parse
+(PDF, DOCX).
+
+Entries are keyed by the SHA-256 of the file's bytes plus the extractor
+version, so a renamed or copied file is still a hit and an upgraded parser
+re-extracts. Hashing a large PDF takes time too: the index remembers each
+path's size, mtime and hash, and an unchanged size+mtime reuses the stored
+hash without reading the file.
+
+Text is stored gzip-compressed, one file per entry, in the cache directory
+(default ~/.cache/llm_input_processor, or LLM_INPUT_CACHE_DIR). The index is
+a SQLite database in the same directory. Least recently used entries are
+deleted once the directory holds more than max_bytes.
+"""
+
+import gzip
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+DEFAULT_CACHE_DIR = os.getenv(
+    "LLM_INPUT_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "llm_input_processor")
+)
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+HASH_BLOCK = 1024 * 1024
+READ_CHUNK = 1024 * 1024
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            block = f.read(HASH_BLOCK)
+            if not block:
+                break
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class CacheStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.hashed = 0
+        self.evictions = 0
+
+
+class ExtractionCache:
+    """Extracted text by (file content hash, extractor version)."""
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.directory / "index.sqlite3", check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                digest TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                bytes INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_entries_last_access ON entries(last_access);
+        """)
+        self._conn.commit()
+
+    def digest(self, path):
+        """SHA-256 of a file, reusing the stored one while size and mtime are unchanged."""
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        with self._lock:
+            row = self._conn.execute("SELECT size, mtime_ns, digest FROM files WHERE path = ?", (path,)).fetchone()
+        if row is not None and row[0] == stat.st_size and row[1] == stat.st_mtime_ns:
+            return row[2]
+        digest = file_digest(path)
+        with self._lock:
+            self.stats.hashed += 1
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files (path, size, mtime_ns, digest) VALUES (?, ?, ?, ?)",
+                (path, stat.st_size, stat.st_mtime_ns, digest)
+            )
+            self._conn.commit()
+        return digest
+
+    def key(self, path, version):
+        return f"{self.digest(path)}-{hashlib.sha256(version.encode('utf-8')).hexdigest()[:16]}"
+
+    def _entry_path(self, key):
+        return self.directory / key[:2] / f"{key}.txt.gz"
+
+    def get(self, key):
+        """The cached text as an iterator of chunks, or None on a miss."""
+        entry = self._entry_path(key)
+        with self._lock:
+            row = self._conn.execute("SELECT bytes FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None or not entry.exists():
+                self.stats.misses += 1
+                return None
+            self.stats.hits += 1
+            self._conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+        return self._read(entry)
+
+    def _read(self, entry):
+        with gzip.open(entry, 'rt', encoding='utf-8', newline='') as f:
+            while True:
+                chunk = f.read(READ_CHUNK)
+                if not chunk:
+                    break
+                yield chunk
+
+    def store(self, key, chunks):
+        """
+        Pass chunks through while writing them to the cache. The entry is
+        only kept if the iteration completes.
+        """
+        entry = self._entry_path(key)
+        entry.parent.mkdir(exist_ok=True)
+        partial = entry.with_name(f"{entry.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        complete = False
+        try:
+            with gzip.open(partial, 'wt', encoding='utf-8', newline='', compresslevel=6) as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    yield chunk
+            complete = True
+        finally:
+            if complete:
+                os.replace(partial, entry)
+                self._added(key, entry.stat().st_size)
+            else:
+                partial.unlink(missing_ok=True)
+
+    def put(self, key, text):
+        for _ in self.store(key, (text,)):
+            pass
+
+    def _added(self, key, size):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, bytes, last_access) VALUES (?, ?, ?)",
+                (key, size, time.time())
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        doomed = []
+        for key, size in self._conn.execute("SELECT key, bytes FROM entries ORDER BY last_access"):
+            if total <= self.max_bytes:
+                break
+            doomed.append(key)
+            total -= size
+        for key in doomed:
+            self._entry_path(key).unlink(missing_ok=True)
+        self._conn.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key in doomed])
+        self.stats.evictions += len(doomed)
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
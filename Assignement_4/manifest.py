@@ -0,0 +1,179 @@
+"""
+Directory and glob inputs, and a manifest of the files they held.
+
+A directory input stands for every supported file below it (hidden files
+and directories skipped), a pattern such as "notes/**/*.md" for the files
+it matches. Both are expanded in sorted order.
+
+The manifest records each file's size, mtime and SHA-256 from the last run
+over the same inputs (a JSON file in the cache directory), so a run can
+tell which files were added, changed or removed. Files whose size and
+mtime are unchanged are not read; touched files with the same contents
+count as unchanged. Unchanged PDF and DOCX files are then served from the
+extraction cache.
+
+watch() polls the inputs' sizes and mtimes and calls back when they change.
+"""
+
+import glob
+import hashlib
+import json
+import mimetypes
+import os
+import time
+from pathlib import Path
+from urllib.parse import urlparse
+
+from extract_cache import file_digest
+
+# File types picked up from directories (text/* types are too)
+SUPPORTED_SUFFIXES = {'.txt', '.md', '.csv', '.docx', '.pdf'}
+PATTERN_CHARS = set("*?[")
+
+
+def is_pattern(source):
+    return bool(PATTERN_CHARS & set(source)) and not os.path.exists(source)
+
+
+def supported(path):
+    suffix = os.path.splitext(path)[1].lower()
+    if suffix in SUPPORTED_SUFFIXES:
+        return True
+    mime_type, _ = mimetypes.guess_type(path)
+    return bool(mime_type and mime_type.startswith('text/'))
+
+
+def walk(directory):
+    """Supported files below directory, sorted, skipping hidden entries."""
+    files = []
+    for root, dirs, names in os.walk(directory):
+        dirs[:] = [name for name in dirs if not name.startswith('.')]
+        files.extend(os.path.join(root, name) for name in names if not name.startswith('.') and supported(name))
+    return sorted(files)
+
+
+def expand_inputs(inputs):
+    """
+    The sources for the command line inputs: directories and glob patterns
+    replaced by their files, URLs and plain files kept. Returns (sources,
+    groups) where groups lists (input, kind, number of sources).
+    """
+    sources = []
+    groups = []
+    for source in inputs:
+        if urlparse(source).scheme in ('http', 'https'):
+            found, kind = [source], "url"
+        elif os.path.isdir(source):
+            found, kind = walk(source), "directory"
+        elif is_pattern(source):
+            found = sorted(path for path in glob.glob(source, recursive=True)
+                           if os.path.isfile(path) and supported(path))
+            kind = "pattern"
+        else:
+            found, kind = [source], "file"
+        sources.extend(found)
+        groups.append((source, kind, len(found)))
+    return sources, groups
+
+
+def scan(sources):
+    """(size, mtime_ns) of every local file among sources."""
+    state = {}
+    for source in sources:
+        try:
+            stat = os.stat(source)
+        except OSError:
+            continue
+        state[os.path.abspath(source)] = (stat.st_size, stat.st_mtime_ns)
+    return state
+
+
+class Changes:
+    def __init__(self):
+        self.added = []
+        self.changed = []
+        self.removed = []
+        self.unchanged = 0
+        self.hashed = 0
+
+    def __bool__(self):
+        return bool(self.added or self.changed or self.removed)
+
+    def summary(self):
+        return (f"{len(self.added)} added, {len(self.changed)} changed, {len(self.removed)} removed, "
+                f"{self.unchanged} unchanged ({self.hashed} hashed)")
+
+
+class Manifest:
+    """path -> [size, mtime_ns, sha256] of the files of one set of inputs."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                self.files = json.load(f)
+        except (OSError, ValueError):
+            self.files = {}
+
+    @classmethod
+    def for_inputs(cls, directory, inputs):
+        """The manifest kept in directory for these command line inputs."""
+        names = sorted(source if urlparse(source).scheme else os.path.abspath(source) for source in inputs)
+        name = hashlib.sha256(json.dumps(names).encode('utf-8')).hexdigest()[:16]
+        return cls(Path(directory) / "manifests" / f"{name}.json")
+
+    def update(self, sources, digest=file_digest):
+        """
+        Record the current state of the local files among sources and return
+        the Changes since the last update. `digest(path)` hashes a file whose
+        size or mtime differ (ExtractionCache.digest shares its hashes with
+        the extraction cache).
+        """
+        changes = Changes()
+        current = {}
+        for path, (size, mtime_ns) in scan(sources).items():
+            old = self.files.get(path)
+            if old is not None and old[0] == size and old[1] == mtime_ns:
+                current[path] = old
+                changes.unchanged += 1
+                continue
+            sha = digest(path)
+            changes.hashed += 1
+            current[path] = [size, mtime_ns, sha]
+            if old is None:
+                changes.added.append(path)
+            elif old[2] != sha:
+                changes.changed.append(path)
+            else:
+                changes.unchanged += 1
+        changes.removed = sorted(set(self.files) - set(current))
+        self.files = current
+        return changes
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        partial = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        with open(partial, 'w', encoding='utf-8') as f:
+            json.dump(self.files, f)
+        os.replace(partial, self.path)
+
+
+def watch(inputs, callback, interval=2.0, settle=0.5):
+    """
+    Poll the inputs every `interval` seconds and call callback(sources) with
+    the expanded inputs whenever a file is added, changed or removed (once
+    the change has held for `settle` seconds). Runs until interrupted.
+    """
+    sources, _ = expand_inputs(inputs)
+    state = scan(sources)
+    while True:
+        time.sleep(interval)
+        sources, _ = expand_inputs(inputs)
+        current = scan(sources)
+        if current == state:
+            continue
+        # Let writers finish before reading the files
+        time.sleep(settle)
+        sources, _ = expand_inputs(inputs)
+        state = scan(sources)
+        callback(sources)
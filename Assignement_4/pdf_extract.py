@@ -0,0 +1,227 @@
+"""
+PDF text extraction with interchangeable backends, page-range selection and
+page-parallel workers.
+
+Backends, fastest first: PyMuPDF, pypdfium2, pypdf, PyPDF2. "auto" picks the
+fastest one installed. A page that fails in the chosen backend is retried in
+the next installed ones, so one damaged page no longer costs the whole
+document.
+
+Large documents are cut into batches of pages that worker processes extract
+independently (each opens the file itself). Results come back in page order.
+"""
+
+import importlib
+import importlib.metadata
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+AUTO_ORDER = ("pymupdf", "pypdfium2", "pypdf", "pypdf2")
+# Backend name -> (module to import, distribution name for the version)
+BACKEND_MODULES = {
+    "pymupdf": ("pymupdf", "pymupdf"),
+    "pypdfium2": ("pypdfium2", "pypdfium2"),
+    "pypdf": ("pypdf", "pypdf"),
+    "pypdf2": ("PyPDF2", "PyPDF2"),
+}
+# Documents with fewer pages than this are not worth a process pool
+MIN_PARALLEL_PAGES = 32
+PAGES_PER_TASK = 16
+
+
+def parse_pages(spec):
+    """
+    Parse a page selection such as "1-10,15,40-" (1-based, inclusive) into a
+    list of (first, last) pairs, last None for "to the end".
+    """
+    ranges = []
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        first, dash, last = part.partition('-')
+        try:
+            first = int(first) if first.strip() else 1
+            last = (int(last) if last.strip() else None) if dash else first
+        except ValueError:
+            raise ValueError(f"Invalid page range: {part!r} (use e.g. 1-10,15,40-)") from None
+        if first < 1 or (last is not None and last < first):
+            raise ValueError(f"Invalid page range: {part!r}")
+        ranges.append((first, last))
+    if not ranges:
+        raise ValueError("Empty page selection")
+    return ranges
+
+
+def select_pages(ranges, page_count):
+    """0-based page indexes selected by parse_pages() ranges, in order, without repeats."""
+    if ranges is None:
+        return list(range(page_count))
+    selected = set()
+    for first, last in ranges:
+        selected.update(range(first - 1, min(page_count, last if last is not None else page_count)))
+    return sorted(selected)
+
+
+class _PyMuPDF:
+    def __init__(self, module, path):
+        self.doc = module.open(path)
+
+    def page_count(self):
+        return self.doc.page_count
+
+    def page_text(self, index):
+        return self.doc[index].get_text()
+
+    def close(self):
+        self.doc.close()
+
+
+class _Pdfium:
+    def __init__(self, module, path):
+        self.doc = module.PdfDocument(path)
+
+    def page_count(self):
+        return len(self.doc)
+
+    def page_text(self, index):
+        page = self.doc[index]
+        textpage = page.get_textpage()
+        try:
+            return textpage.get_text_range()
+        finally:
+            textpage.close()
+            page.close()
+
+    def close(self):
+        self.doc.close()
+
+
+class _PdfReader:
+    """pypdf and PyPDF2 share an API."""
+
+    def __init__(self, module, path):
+        self.file = open(path, 'rb')
+        self.reader = module.PdfReader(self.file)
+
+    def page_count(self):
+        return len(self.reader.pages)
+
+    def page_text(self, index):
+        return self.reader.pages[index].extract_text()
+
+    def close(self):
+        self.file.close()
+
+
+BACKEND_CLASSES = {"pymupdf": _PyMuPDF, "pypdfium2": _Pdfium, "pypdf": _PdfReader, "pypdf2": _PdfReader}
+
+
+def available_backends():
+    """Installed backends, fastest first."""
+    names = []
+    for name in AUTO_ORDER:
+        try:
+            importlib.import_module(BACKEND_MODULES[name][0])
+        except ImportError:
+            continue
+        names.append(name)
+    return names
+
+
+def resolve_backend(name="auto"):
+    installed = available_backends()
+    if not installed:
+        raise ImportError("No PDF library found, please install one: pip install pymupdf (or pypdfium2, pypdf)")
+    if name == "auto":
+        return installed[0]
+    if name not in BACKEND_MODULES:
+        raise ValueError(f"Unknown PDF backend: {name}. Choose auto, {', '.join(AUTO_ORDER)}")
+    if name not in installed:
+        raise ImportError(f"PDF backend {name} is not installed: pip install {BACKEND_MODULES[name][1]}")
+    return name
+
+
+def backend_version(name):
+    return f"{name}-{importlib.metadata.version(BACKEND_MODULES[name][1])}"
+
+
+def open_document(name, path):
+    module = importlib.import_module(BACKEND_MODULES[name][0])
+    return BACKEND_CLASSES[name](module, path)
+
+
+class _Extractor:
+    """Pages of one document, falling back to other backends page by page."""
+
+    def __init__(self, path, backend):
+        self.path = path
+        self.order = [backend] + [name for name in available_backends() if name != backend]
+        self.docs = {}
+
+    def _doc(self, name):
+        if name not in self.docs:
+            self.docs[name] = open_document(name, self.path)
+        return self.docs[name]
+
+    def page_count(self):
+        for name in self.order:
+            try:
+                return self._doc(name).page_count()
+            except Exception:
+                continue
+        raise ValueError(f"Could not open PDF: {self.path}")
+
+    def page_text(self, index):
+        error = None
+        for name in self.order:
+            try:
+                return self._doc(name).page_text(index) or ''
+            except Exception as e:
+                error = e
+        raise ValueError(f"Could not extract page {index + 1} of {self.path}: {error}")
+
+    def close(self):
+        for doc in self.docs.values():
+            try:
+                doc.close()
+            except Exception:
+                pass
+
+
+def extract_pages(path, indexes, backend):
+    """Text of the given pages; module level so worker processes can run it."""
+    extractor = _Extractor(path, backend)
+    try:
+        return [extractor.page_text(index) for index in indexes]
+    finally:
+        extractor.close()
+
+
+def iter_pdf_pages(path, pages=None, backend="auto", workers=1):
+    """
+    Yield the text of the selected pages of a PDF, in order.
+
+    `pages` is a parse_pages() selection (None for all). With workers > 1,
+    documents of MIN_PARALLEL_PAGES or more are split into batches of
+    pages extracted in that many processes. Called from any thread but the
+    main one (e.g. InputProcessor.iter_sources' thread pool), it extracts
+    inline: forking while other threads hold locks can deadlock the child.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        workers = 1
+    backend = resolve_backend(backend)
+    extractor = _Extractor(path, backend)
+    try:
+        indexes = select_pages(pages, extractor.page_count())
+        if workers <= 1 or len(indexes) < MIN_PARALLEL_PAGES:
+            for index in indexes:
+                yield extractor.page_text(index)
+            return
+    finally:
+        extractor.close()
+
+    batches = [indexes[i:i + PAGES_PER_TASK] for i in range(0, len(indexes), PAGES_PER_TASK)]
+    with ProcessPoolExecutor(max_workers=min(workers, len(batches))) as executor:
+        for texts in executor.map(extract_pages, [path] * len(batches), batches, [backend] * len(batches)):
+            yield from texts
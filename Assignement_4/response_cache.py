@@ -0,0 +1,168 @@
+"""
+Persistent cache of LLM responses, with deduplication of identical
+requests in flight.
+
+Entries are keyed by the SHA-256 of the model, the messages and the
+sampling parameters, so the same query over the same content is answered
+from the cache on the next run. Sampled answers (temperature > 0) are
+expected to differ between calls: the caller decides whether to use the
+cache for them.
+
+Responses are stored in a SQLite database in the cache directory
+(responses.sqlite3), together with their token usage and how long the
+request took, which the statistics report as saved. Entries expire after
+`ttl` seconds; least recently used entries are deleted once the stored
+responses exceed max_bytes.
+
+While a request is running, other threads asking for the same key wait for
+its answer instead of sending their own.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+
+from chunking import request_cost
+from extract_cache import DEFAULT_CACHE_DIR
+
+DEFAULT_TTL = 7 * 24 * 3600
+DEFAULT_MAX_BYTES = 100 * 1024 * 1024
+
+
+def request_key(model, messages, params):
+    """Hash of everything that determines an answer."""
+    payload = json.dumps({"model": model, "messages": messages, "params": params},
+                         sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.deduplicated = 0
+        self.evictions = 0
+        # What the hits would have cost as requests
+        self.saved_seconds = 0.0
+        self.saved_tokens = 0
+        self.saved_cost = 0.0
+
+
+class ResponseCache:
+    """LLM answers by request_key(), with a TTL and a size bound."""
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.stats = ResponseStats()
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+        self._conn = sqlite3.connect(self.directory / "responses.sqlite3", check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                content TEXT NOT NULL,
+                prompt_tokens INTEGER NOT NULL,
+                completion_tokens INTEGER NOT NULL,
+                seconds REAL NOT NULL,
+                bytes INTEGER NOT NULL,
+                created REAL NOT NULL,
+                last_access REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses(last_access);
+        """)
+        self._conn.execute("DELETE FROM responses WHERE created < ?", (time.time() - self.ttl,))
+        self._conn.commit()
+
+    def get(self, key):
+        """The cached answer, or None if there is none or it expired."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT model, content, prompt_tokens, completion_tokens, seconds, created FROM responses WHERE key = ?",
+                (key,)
+            ).fetchone()
+            if row is None or row[5] < now - self.ttl:
+                if row is not None:
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._conn.commit()
+                self.stats.misses += 1
+                return None
+            model, content, prompt_tokens, completion_tokens, seconds, _ = row
+            self.stats.hits += 1
+            self.stats.saved_seconds += seconds
+            self.stats.saved_tokens += prompt_tokens + completion_tokens
+            self.stats.saved_cost += request_cost(model, prompt_tokens, completion_tokens) or 0.0
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+        return content
+
+    def put(self, key, model, content, prompt_tokens=0, completion_tokens=0, seconds=0.0):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, content, prompt_tokens, completion_tokens, seconds, "
+                "bytes, created, last_access) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, model, content, prompt_tokens, completion_tokens, seconds,
+                 len(content.encode("utf-8")), now, now)
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        doomed = []
+        for key, size in self._conn.execute("SELECT key, bytes FROM responses ORDER BY last_access"):
+            if total <= self.max_bytes:
+                break
+            doomed.append(key)
+            total -= size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", [(key,) for key in doomed])
+        self.stats.evictions += len(doomed)
+
+    def fetch(self, key, model, request):
+        """
+        The answer for key: from the cache, from an identical request already
+        running in another thread, or from request(), which returns
+        (content, prompt_tokens, completion_tokens) and is then cached.
+        """
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                cached = self.get(key)
+                if cached is not None:
+                    return cached
+                future = self._inflight[key] = Future()
+        if not owner:
+            with self._lock:
+                self.stats.deduplicated += 1
+            return future.result()
+
+        try:
+            start = time.perf_counter()
+            content, prompt_tokens, completion_tokens = request()
+            self.put(key, model, content, prompt_tokens, completion_tokens, time.perf_counter() - start)
+            future.set_result(content)
+            return content
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                del self._inflight[key]
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
@@ -0,0 +1,377 @@
+"""
+Local vector index of the inputs, for answering a query from the most
+relevant chunks instead of the whole content.
+
+Each input's text is split into chunks of about `chunk_tokens` tokens
+(chunking.split_text), embedded on the CPU and appended to a float32
+matrix file that searches read memory-mapped. Chunk texts and their
+sources are kept in a SQLite database next to it. An input whose contents
+are unchanged since it was indexed is not extracted or embedded again;
+chunks of changed or dropped inputs are marked deleted and skipped, and
+compact() rewrites the files without them once they pile up.
+
+Embedders:
+  sentence-transformers models (e.g. all-MiniLM-L6-v2), when the package
+  and the model are available;
+  "hashing", a built-in bag of words and word pairs hashed into 1024
+  dimensions. It needs nothing but NumPy and no download, and finds
+  chunks sharing the query's words rather than its meaning.
+"auto" picks the first that works and the index remembers its choice.
+
+Search is exact (one matrix product over the memory-mapped vectors) or,
+with ann="hnsw" and faiss installed, an HNSW graph kept in hnsw.faiss.
+"""
+
+import json
+import os
+import re
+import sqlite3
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+DEFAULT_MODEL = "all-MiniLM-L6-v2"
+HASHING_DIM = 1024
+EMBED_BATCH = 256
+# Rows multiplied at once by an exact search
+SEARCH_BLOCK = 65536
+HNSW_NEIGHBORS = 32
+# Candidates an HNSW search visits: fewer miss neighbours of sparse hashed vectors
+HNSW_EF_SEARCH = 256
+# Share of deleted chunks above which compact() rewrites the index
+COMPACT_FRACTION = 0.2
+WORD = re.compile(r"\w+")
+INDEX_VERSION = 1
+
+
+class HashingEmbedder:
+    """Signed feature hashing of words and word pairs, log-scaled and normalized."""
+
+    def __init__(self, dim=HASHING_DIM):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+        self._hashes = {}
+
+    def _hash(self, word):
+        value = self._hashes.get(word)
+        if value is None:
+            value = self._hashes[word] = zlib.crc32(word.encode("utf-8"))
+        return value
+
+    def embed(self, texts):
+        texts = list(texts)
+        rows = []
+        hashes = []
+        for row, text in enumerate(texts):
+            words = WORD.findall(text.lower())
+            hashes.append(np.fromiter((self._hash(word) for word in words), dtype=np.uint64, count=len(words)))
+            rows.append(np.full(len(words), row, dtype=np.int64))
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        words = np.concatenate(hashes)
+        row_ids = np.concatenate(rows)
+        # Pairs of neighbouring words within the same text
+        same = row_ids[1:] == row_ids[:-1]
+        pairs = ((words[:-1][same] * np.uint64(0x9E3779B1) + words[1:][same]) & np.uint64(0xFFFFFFFF))
+        features = np.concatenate([words, pairs])
+        feature_rows = np.concatenate([row_ids, row_ids[1:][same]])
+        buckets = (features % np.uint64(self.dim)).astype(np.int64)
+        signs = np.where((features >> np.uint64(31)) & np.uint64(1), -1.0, 1.0)
+        counts = np.bincount(feature_rows * self.dim + buckets, weights=signs,
+                             minlength=len(texts) * self.dim).reshape(len(texts), self.dim)
+        vectors = (np.sign(counts) * np.log1p(np.abs(counts))).astype(np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        np.divide(vectors, norms, out=vectors, where=norms > 0)
+        return vectors
+
+
+class SentenceEmbedder:
+    """A sentence-transformers model, run on the CPU."""
+
+    def __init__(self, model=DEFAULT_MODEL):
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(model, device="cpu")
+        self.dim = self.model.get_sentence_embedding_dimension()
+        self.name = f"sentence-transformers:{model}"
+
+    def embed(self, texts):
+        return self.model.encode(list(texts), batch_size=64, normalize_embeddings=True,
+                                 convert_to_numpy=True).astype(np.float32)
+
+
+def embedder_name(name):
+    """The name an embedder built from `name` records in the index ("auto" matches any)."""
+    if name == "auto" or name.startswith("sentence-transformers:"):
+        return name
+    if name.startswith("hashing"):
+        return f"hashing-{name.partition('-')[2] or HASHING_DIM}"
+    return f"sentence-transformers:{name}"
+
+
+def load_embedder(name="auto"):
+    """An embedder by name: "auto", "hashing[-DIM]" or a sentence-transformers model."""
+    if name.startswith("hashing"):
+        dim = name.partition("-")[2]
+        return HashingEmbedder(int(dim) if dim else HASHING_DIM)
+    model = name.partition(":")[2] if name.startswith("sentence-transformers:") else name
+    if name == "auto":
+        try:
+            return SentenceEmbedder(DEFAULT_MODEL)
+        except Exception:
+            # Not installed, or the model cannot be loaded (e.g. offline)
+            return HashingEmbedder()
+    try:
+        return SentenceEmbedder(model)
+    except ImportError:
+        raise ImportError("Please install sentence-transformers: pip install sentence-transformers "
+                          "(or use --embedder hashing)")
+
+
+class VectorIndex:
+    """Chunk vectors and texts of a set of inputs, stored in a directory."""
+
+    def __init__(self, directory, embedder="auto", ann="exact"):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.ann = ann
+        self._meta_path = self.directory / "meta.json"
+        meta = {}
+        if self._meta_path.exists():
+            meta = json.loads(self._meta_path.read_text(encoding="utf-8"))
+        if meta and meta.get("version") == INDEX_VERSION and embedder_name(embedder) in ("auto", meta["embedder"]):
+            # Vectors must be compared with the same embedder
+            embedder = meta["embedder"]
+        elif meta:
+            raise ValueError(f"{self.directory} holds an index built with {meta.get('embedder')}; "
+                             f"use that embedder or another directory")
+        self.embedder = load_embedder(embedder)
+        self.dim = self.embedder.dim
+        self._hnsw = None
+        self._deleted_ids = self._deleted_set = None
+        self._conn = sqlite3.connect(self.directory / "chunks.sqlite3")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS chunks (
+                id INTEGER PRIMARY KEY,
+                source TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                text TEXT NOT NULL,
+                deleted INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS idx_chunks_source ON chunks(source);
+            CREATE TABLE IF NOT EXISTS sources (
+                source TEXT PRIMARY KEY,
+                digest TEXT
+            );
+            CREATE TABLE IF NOT EXISTS state (
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+        """)
+        row = self._conn.execute("SELECT value FROM state WHERE key = 'generation'").fetchone()
+        self._use_generation(row[0] if row else 0)
+        # Committed chunks; vectors past them were appended by an interrupted add()
+        self.count = self._conn.execute("SELECT COALESCE(MAX(id) + 1, 0) FROM chunks").fetchone()[0]
+        for path in list(self.directory.glob("vectors*.f32")) + list(self.directory.glob("hnsw*.faiss")):
+            if path not in (self._vectors_path, self._hnsw_path):
+                # Left by an interrupted or finished compact()
+                path.unlink()
+        self._save_meta()
+
+    def _use_generation(self, generation):
+        # compact() writes each rewrite of the vectors to new files, switched to when the rows are committed
+        self.generation = generation
+        suffix = f".{generation}" if generation else ""
+        self._vectors_path = self.directory / f"vectors{suffix}.f32"
+        self._hnsw_path = self.directory / f"hnsw{suffix}.faiss"
+
+    def _save_meta(self):
+        self._meta_path.write_text(json.dumps({
+            "version": INDEX_VERSION, "embedder": self.embedder.name, "dim": self.dim, "count": self.count,
+        }), encoding="utf-8")
+
+    def digest_of(self, source):
+        row = self._conn.execute("SELECT digest FROM sources WHERE source = ?", (source,)).fetchone()
+        return row[0] if row else None
+
+    def stale(self, sources, digest):
+        """
+        (source, digest) of the sources not indexed with their current
+        digest(source); a digest of None means always index again.
+        """
+        stale = []
+        for source in sources:
+            current = digest(source)
+            if current is None or current != self.digest_of(source):
+                stale.append((source, current))
+        return stale
+
+    def _drop(self, sources):
+        self._deleted_ids = self._deleted_set = None
+        self._conn.executemany("UPDATE chunks SET deleted = 1 WHERE source = ?", [(s,) for s in sources])
+        self._conn.executemany("DELETE FROM sources WHERE source = ?", [(s,) for s in sources])
+
+    def prune(self, keep):
+        """Drop the chunks of sources not in keep; returns how many sources were dropped."""
+        keep = set(keep)
+        gone = [row[0] for row in self._conn.execute("SELECT source FROM sources") if row[0] not in keep]
+        self._drop(gone)
+        self._conn.commit()
+        return len(gone)
+
+    def add(self, source, digest, chunks):
+        """Index one source's chunk texts, replacing what was indexed for it. Returns the chunk count."""
+        self._drop([source])
+        added = 0
+        batch = []
+        if self._vectors_path.exists() and self._vectors_path.stat().st_size > self.count * self.dim * 4:
+            # Vectors of an interrupted add(), never committed
+            os.truncate(self._vectors_path, self.count * self.dim * 4)
+        with open(self._vectors_path, "ab") as vectors:
+            for text in chunks:
+                batch.append(text)
+                if len(batch) == EMBED_BATCH:
+                    added += self._append(vectors, source, added, batch)
+                    batch = []
+            if batch:
+                added += self._append(vectors, source, added, batch)
+        self._conn.execute("INSERT OR REPLACE INTO sources (source, digest) VALUES (?, ?)", (source, digest))
+        self._conn.commit()
+        self._save_meta()
+        return added
+
+    def _append(self, vectors, source, position, texts):
+        matrix = self.embedder.embed(texts)
+        vectors.write(np.ascontiguousarray(matrix, dtype=np.float32).tobytes())
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO chunks (id, source, position, text) VALUES (?, ?, ?, ?)",
+            [(self.count + i, source, position + i, text) for i, text in enumerate(texts)]
+        )
+        self.count += len(texts)
+        return len(texts)
+
+    def matrix(self):
+        """All vectors (deleted ones included), memory-mapped."""
+        if self.count == 0:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(self.count, self.dim))
+
+    def _deleted(self):
+        if self._deleted_ids is None:
+            self._deleted_ids = np.fromiter(
+                (row[0] for row in self._conn.execute("SELECT id FROM chunks WHERE deleted = 1")), dtype=np.int64
+            )
+        return self._deleted_ids
+
+    def _is_deleted(self, i):
+        if self._deleted_set is None:
+            self._deleted_set = set(self._deleted().tolist())
+        return i in self._deleted_set
+
+    def compact(self, fraction=COMPACT_FRACTION):
+        """
+        Rewrite the vectors and rows without the deleted chunks once they are
+        more than `fraction` of all chunks (0 forces it). Returns how many
+        chunks were dropped.
+        """
+        deleted = self._deleted()
+        if not len(deleted) or len(deleted) <= fraction * self.count:
+            return 0
+        live = np.setdiff1d(np.arange(self.count, dtype=np.int64), deleted)
+        generation = self.generation + 1
+        old_vectors, old_hnsw = self._vectors_path, self._hnsw_path
+        matrix = self.matrix()
+        self._use_generation(generation)
+        try:
+            with open(self._vectors_path, "wb") as vectors:
+                for start in range(0, len(live), SEARCH_BLOCK):
+                    vectors.write(np.ascontiguousarray(matrix[live[start:start + SEARCH_BLOCK]]).tobytes())
+                vectors.flush()
+                os.fsync(vectors.fileno())
+            # Ids stay in order, so renumbering in ascending order never collides
+            self._conn.execute("DELETE FROM chunks WHERE deleted = 1")
+            self._conn.executemany("UPDATE chunks SET id = ? WHERE id = ?",
+                                   ((new, int(old)) for new, old in enumerate(live) if new != old))
+            self._conn.execute("INSERT OR REPLACE INTO state (key, value) VALUES ('generation', ?)", (generation,))
+            self._conn.commit()
+        except BaseException:
+            self._conn.rollback()
+            self._vectors_path.unlink(missing_ok=True)
+            self._use_generation(generation - 1)
+            raise
+        del matrix
+        self.count = len(live)
+        self._deleted_ids = self._deleted_set = None
+        self._hnsw = None
+        for path in (old_vectors, old_hnsw):
+            if path.exists():
+                path.unlink()
+        self._save_meta()
+        return len(deleted)
+
+    def build_ann(self):
+        """Bring the HNSW graph up to date with the vectors (needs faiss)."""
+        try:
+            import faiss
+        except ImportError:
+            raise ImportError("HNSW search needs faiss: pip install faiss-cpu")
+        index = None
+        if self._hnsw_path.exists():
+            index = faiss.read_index(str(self._hnsw_path))
+            if index.d != self.dim or index.ntotal > self.count:
+                index = None
+        if index is None:
+            index = faiss.IndexHNSWFlat(self.dim, HNSW_NEIGHBORS, faiss.METRIC_INNER_PRODUCT)
+        matrix = self.matrix()
+        for start in range(index.ntotal, self.count, SEARCH_BLOCK):
+            index.add(np.ascontiguousarray(matrix[start:start + SEARCH_BLOCK]))
+        faiss.write_index(index, str(self._hnsw_path))
+        self._hnsw = index
+        return index
+
+    def search(self, query, k=8):
+        """The k chunks most similar to query: (score, source, position, text), best first."""
+        if self.count == 0:
+            return []
+        vector = self.embedder.embed([query])[0]
+        deleted = self._deleted()
+        if self.ann == "hnsw":
+            if self._hnsw is None or self._hnsw.ntotal != self.count:
+                self.build_ann()
+            # Ask for enough neighbours to leave k live ones at the share of deleted chunks, more if short
+            wanted = min(self.count, k + -(-k * len(deleted) // max(self.count - len(deleted), 1)))
+            while True:
+                self._hnsw.hnsw.efSearch = max(HNSW_EF_SEARCH, wanted)
+                scores, ids = self._hnsw.search(vector[None, :], wanted)
+                hits = [(float(score), int(i)) for score, i in zip(scores[0], ids[0])
+                        if i >= 0 and not self._is_deleted(int(i))]
+                if len(hits) >= k or wanted >= self.count:
+                    break
+                wanted = min(self.count, wanted * 2)
+            hits = hits[:k]
+        else:
+            matrix = self.matrix()
+            scores = np.empty(self.count, dtype=np.float32)
+            for start in range(0, self.count, SEARCH_BLOCK):
+                scores[start:start + SEARCH_BLOCK] = matrix[start:start + SEARCH_BLOCK] @ vector
+            # Deleted chunks sort last, so the k best are live unless fewer than k are
+            scores[deleted] = -np.inf
+            wanted = min(self.count, k)
+            top = np.argpartition(-scores, wanted - 1)[:wanted] if wanted < self.count else np.arange(self.count)
+            hits = sorted(((float(scores[i]), int(i)) for i in top if scores[i] != -np.inf), reverse=True)[:k]
+        if not hits:
+            return []
+        rows = {}
+        for i, source, position, text in self._conn.execute(
+                f"SELECT id, source, position, text FROM chunks WHERE id IN ({','.join('?' * len(hits))})",
+                [i for _, i in hits]):
+            rows[i] = (source, position, text)
+        return [(score,) + rows[i] for score, i in hits if i in rows]
+
+    def __len__(self):
+        """Chunks that searches can return."""
+        return self._conn.execute("SELECT COUNT(*) FROM chunks WHERE deleted = 0").fetchone()[0]
+
+    def close(self):
+        self._conn.close()